@@ -2,7 +2,7 @@ from __future__ import annotations
 import logging
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from typing import Dict, Any, List, Tuple, Generator
+from typing import Dict, Any, List, Optional, Tuple, Generator
 from urllib.parse import urlparse
 from enum import Enum
 
@@ -10,13 +10,16 @@ from semver import Version
 
 from ah import config, __version__
 from ah.vendors.blizzardapi import BlizzardApi
+from ah.vendors.blizzardapi.wow.wow_game_data_aio_api import AsyncWowGameDataApi
 from ah.models import Namespace
-from ah.cache import bound_cache, BoundCacheMixin, Cache
+from ah.cache import bound_cache, async_bound_cache, BoundCacheMixin, Cache
+from ah.jsonstream import iter_json_array
 from ah.defs import SECONDS_IN
 from ah.utils import get_release_file_name
 
 __all__ = (
     "BNAPI",
+    "AsyncBNAPI",
     "GHAPI",
     "UpdateEnum",
 )
@@ -50,21 +53,150 @@ class BNAPI(BoundCacheMixin):
         namespace: Namespace,
         connected_realm_id: int,
         auction_house_id: int = None,
+        if_modified_since: int = None,
     ) -> Any:
-        return self._api.wow.game_data.get_auctions(
+        """returns `None` if not modified since `if_modified_since`, see
+        `set_last_modified`.
+        """
+        return self.set_last_modified(
+            *self._api.wow.game_data.get_modified_auctions(
+                namespace.region,
+                namespace.get_locale(),
+                namespace.to_str(),
+                connected_realm_id,
+                auction_house_id=auction_house_id,
+                if_modified_since=if_modified_since,
+            )
+        )
+
+    @bound_cache(SECONDS_IN.HOUR)
+    def get_commodities(
+        self, namespace: Namespace, if_modified_since: int = None
+    ) -> Any:
+        """returns `None` if not modified since `if_modified_since`, see
+        `set_last_modified`.
+        """
+        return self.set_last_modified(
+            *self._api.wow.game_data.get_modified_commodities(
+                namespace.region,
+                namespace.get_locale(),
+                namespace.to_str(),
+                if_modified_since=if_modified_since,
+            )
+        )
+
+    def stream_commodities(
+        self, namespace: Namespace, if_modified_since: int = None
+    ) -> Optional[Dict[str, Any]]:
+        """like `get_commodities`, but commodities are decoded from the response
+        body one by one, as it downloads. returns
+        `{"auctions": <iterator of commodity dicts>, "timestamp": ...}`,
+        "auctions" can only be iterated once, so it's not cached.
+        """
+        body, last_modified = self._api.wow.game_data.stream_modified_commodities(
             namespace.region,
             namespace.get_locale(),
             namespace.to_str(),
-            connected_realm_id,
-            auction_house_id=auction_house_id,
+            if_modified_since=if_modified_since,
         )
+        if body is None:
+            return None
 
-    @bound_cache(SECONDS_IN.HOUR)
-    def get_commodities(self, namespace: Namespace) -> Any:
-        return self._api.wow.game_data.get_commodities(
+        return self.set_last_modified(
+            {"auctions": iter_json_array(body, "auctions")}, last_modified
+        )
+
+    @classmethod
+    def set_last_modified(cls, resp: Any, last_modified: int = None) -> Any:
+        """auctions are snapshots taken by the server, "Last-Modified" is when
+        the snapshot was taken, use it as the response's `timestamp`.
+        """
+        if resp is not None and last_modified is not None:
+            resp["timestamp"] = last_modified
+
+        return resp
+
+
+class AsyncBNAPI(BoundCacheMixin):
+    """asyncio counterpart of `BNAPI`, shares cache entries with it. many requests
+    can be kept in flight from a single thread, e.g.
+
+    >>> async with AsyncBNAPI(client_id, client_secret, cache) as bn_api:
+            resps = await asyncio.gather(
+                *(bn_api.get_auctions(namespace, crid) for crid in crids)
+            )
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        cache: Cache,
+        *args,
+        max_connections: int = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, cache=cache, **kwargs)
+        self._api = AsyncWowGameDataApi(
+            client_id, client_secret, max_connections=max_connections
+        )
+
+    async def __aenter__(self) -> "AsyncBNAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._api.close()
+
+    @async_bound_cache(SECONDS_IN.WEEK)
+    async def get_connected_realms_index(self, namespace: Namespace) -> Any:
+        return await self._api.get_connected_realms_index(
+            namespace.region, namespace.get_locale(), namespace.to_str()
+        )
+
+    @async_bound_cache(SECONDS_IN.WEEK)
+    async def get_connected_realm(
+        self, namespace: Namespace, connected_realm_id: int
+    ) -> Any:
+        return await self._api.get_connected_realm(
             namespace.region,
             namespace.get_locale(),
             namespace.to_str(),
+            connected_realm_id,
+        )
+
+    @async_bound_cache(SECONDS_IN.HOUR)
+    async def get_auctions(
+        self,
+        namespace: Namespace,
+        connected_realm_id: int,
+        auction_house_id: int = None,
+        if_modified_since: int = None,
+    ) -> Any:
+        return BNAPI.set_last_modified(
+            *await self._api.get_modified_auctions(
+                namespace.region,
+                namespace.get_locale(),
+                namespace.to_str(),
+                connected_realm_id,
+                auction_house_id=auction_house_id,
+                if_modified_since=if_modified_since,
+            )
+        )
+
+    @async_bound_cache(SECONDS_IN.HOUR)
+    async def get_commodities(
+        self, namespace: Namespace, if_modified_since: int = None
+    ) -> Any:
+        return BNAPI.set_last_modified(
+            *await self._api.get_modified_commodities(
+                namespace.region,
+                namespace.get_locale(),
+                namespace.to_str(),
+                if_modified_since=if_modified_since,
+            )
         )
 
 
@@ -120,3 +120,30 @@ def bound_cache(expires: int) -> Callable:
         return inner
 
     return wrapper
+
+
+def async_bound_cache(expires: int) -> Callable:
+    """coroutine counterpart of `bound_cache`, keys are computed the same way so
+    both share cache entries of the same function name and arguments.
+    """
+
+    def wrapper(func: Callable) -> Callable:
+        @wraps(func)
+        async def inner(that: BoundCacheMixin, *args, **kwargs) -> Any:
+            key = {"fname": func.__name__, "args": args, "kwargs": kwargs}
+            if hasattr(that, "_cache"):
+                cache = that._cache.get(key, expires=expires)
+                if cache is None:
+                    value = await func(that, *args, **kwargs)
+                    that._cache.set(key, value)
+                else:
+                    value = cache
+
+            else:
+                value = await func(that, *args, **kwargs)
+
+            return value
+
+        return inner
+
+    return wrapper
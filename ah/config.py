@@ -13,9 +13,29 @@ DEFAULT_CACHE_PATH = os.path.join(get_temp_path(), "ah_cache")
 DEFAULT_CACHE_EXPIRES_IN = SECONDS_IN.WEEK
 DEFAULT_DB_PATH = "db"
 DEFAULT_DB_COMPRESS = True
+# save new db files in the packed columnar format instead of protobuf
+DEFAULT_DB_PACKED = False
+# codec of compressed db files, see `ah.storage.CODECS`, readers detect it
+DEFAULT_DB_CODEC = "gzip"
+# where db and meta files are kept, "files" under the db path, or "sqlite" for
+# one SQLite database there, see `ah.sqlitedb`
+DEFAULT_DB_BACKEND = "files"
+# threads compressing a db file, large files only, see `ah.storage.GzipCodec`
+DEFAULT_DB_COMPRESS_THREADS = 1
+# gzip level of packed db files, higher levels take much longer for little gain
+DEFAULT_DB_PACKED_COMPRESSLEVEL = 6
 # how often to take a snapshot of the system memory / cpu usage
 DEFAULT_SNAPSHOT_INTERVAL = 10
 MAX_SNAPSHOTS = 100
+# max connections kept per host, should be no less than updater's `--workers`
+BN_API_POOL_MAXSIZE = 32
+# max number of realms waiting between stages of the updater's `--pipeline`
+DEFAULT_PIPELINE_QUEUE_SIZE = 2
+# seconds, for the asyncio client, covers a whole request (connecting, sending
+# it and reading the response body)
+BN_API_TIMEOUT = 300
+# bytes, chunk size of streamed responses (e.g. `--stream_commodities`)
+BN_API_STREAM_CHUNK_SIZE = 1 << 16
 # /data/wow/connected-realm/index randomly encounters SSL errors
 VERIFY_SSL = False
 if not VERIFY_SSL:
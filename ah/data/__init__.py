@@ -1,15 +1,23 @@
 import os
 import json
-from typing import Dict
+import hashlib
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional
 import logging
 
-__all__ = ("map_bonuses",)
+import numpy as np
+
+__all__ = ("map_bonuses", "load_map_bonuses", "BonusesCurves")
 
 _logger = logging.getLogger("ah.data")
 
 
+def get_path(filename: str) -> str:
+    return os.path.join(os.path.dirname(__file__), filename)
+
+
 def load_json(filename: str) -> Dict:
-    path = os.path.join(os.path.dirname(__file__), filename)
+    path = get_path(filename)
     if not os.path.isfile(path):
         _logger.warning(f"File {path} not found.")
         return {}
@@ -22,5 +30,157 @@ def key_to_int(d: Dict) -> Dict:
     return {int(k): v for k, v in d.items()}
 
 
-map_bonuses = load_json("bonuses_curves.json")
-map_bonuses = key_to_int(map_bonuses)
+class BonusesCurves(Mapping):
+    """`bonus_id -> {"level", "base_level", "curveId", "points"}` (fields as in
+    `bonuses_curves.json`, all optional), loaded on first use.
+
+    loaded from the precompiled tables of `bin/preprocess_data.py` (numpy
+    arrays, one row per bonus, plus a flat table of curve points) unless they
+    were made from another json (by its digest, mtime isn't kept by git),
+    entries are only made into dicts when accessed.
+
+    >>> arrays:
+        ids:        bonus id, sorted
+        fields:     bit mask of fields present, see `FIELDS`
+        level, base_level, curve_id:    0 if absent
+        offsets:    curve points of row `i` are `points[offsets[i]:offsets[i+1]]`
+        points:     (player_level, item_level)
+        json_sha1:  sha1 hex digest of the json they were made from
+    """
+
+    JSON: str = "bonuses_curves.json"
+    NPZ: str = "bonuses_curves.npz"
+    # field -> (array, bit)
+    FIELDS: Dict[str, tuple] = {
+        "level": ("level", 1),
+        "base_level": ("base_level", 2),
+        "curveId": ("curve_id", 4),
+    }
+    POINTS_BIT: int = 8
+
+    def __init__(
+        self, json_path: Optional[str] = None, npz_path: Optional[str] = None
+    ) -> None:
+        self.json_path = json_path or get_path(self.JSON)
+        self.npz_path = npz_path or get_path(self.NPZ)
+        self._arrays = None
+        self._index = None
+        self._entries = {}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._index is not None
+
+    @classmethod
+    def to_arrays(cls, bonuses: Dict) -> Dict[str, np.ndarray]:
+        """precompile `bonuses` (keys as int or str)"""
+        ids = sorted(int(k) for k in bonuses)
+        bonuses = key_to_int(bonuses)
+        n = len(ids)
+        arrays = {"ids": np.array(ids, dtype="i4"), "fields": np.zeros(n, dtype="u1")}
+        for name, _ in cls.FIELDS.values():
+            arrays[name] = np.zeros(n, dtype="i4")
+
+        offsets = np.zeros(n + 1, dtype="i4")
+        points = []
+        for i, id in enumerate(ids):
+            entry = bonuses[id]
+            for field, (name, bit) in cls.FIELDS.items():
+                if field in entry:
+                    arrays["fields"][i] |= bit
+                    arrays[name][i] = entry[field]
+
+            if "points" in entry:
+                arrays["fields"][i] |= cls.POINTS_BIT
+                points.extend(entry["points"])
+
+            offsets[i + 1] = len(points)
+
+        arrays["offsets"] = offsets
+        arrays["points"] = np.array(points, dtype="i4").reshape(-1, 2)
+        return arrays
+
+    @classmethod
+    def get_json_digest(cls, json_path: str) -> str:
+        with open(json_path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    @classmethod
+    def save_arrays(cls, path: str, bonuses: Dict, json_path: str) -> None:
+        arrays = cls.to_arrays(bonuses)
+        arrays["json_sha1"] = np.array(cls.get_json_digest(json_path))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    def _load_npz(self) -> Optional[Dict[str, np.ndarray]]:
+        if not os.path.isfile(self.npz_path):
+            return None
+
+        with np.load(self.npz_path) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+
+        if os.path.isfile(self.json_path) and str(arrays.get("json_sha1")) != (
+            self.get_json_digest(self.json_path)
+        ):
+            return None
+
+        return arrays
+
+    def _load(self) -> None:
+        arrays = self._load_npz()
+        if arrays is None:
+            _logger.debug(f"{self.npz_path} missing or outdated, loading json.")
+            if os.path.isfile(self.json_path):
+                with open(self.json_path) as f:
+                    arrays = self.to_arrays(json.load(f))
+
+            else:
+                _logger.warning(f"File {self.json_path} not found.")
+                arrays = self.to_arrays({})
+
+        self._arrays = arrays
+        self._index = dict(zip(arrays["ids"].tolist(), range(len(arrays["ids"]))))
+
+    @property
+    def index(self) -> Dict[int, int]:
+        if self._index is None:
+            self._load()
+
+        return self._index
+
+    def _make_entry(self, i: int) -> Dict:
+        arrays = self._arrays
+        fields = int(arrays["fields"][i])
+        entry = {}
+        for field, (name, bit) in self.FIELDS.items():
+            if fields & bit:
+                entry[field] = int(arrays[name][i])
+
+        if fields & self.POINTS_BIT:
+            start, end = arrays["offsets"][i : i + 2]
+            entry["points"] = list(map(tuple, arrays["points"][start:end].tolist()))
+
+        return entry
+
+    def __getitem__(self, key: int) -> Dict:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = self._make_entry(self.index[key])
+
+        return entry
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+def load_map_bonuses() -> BonusesCurves:
+    return BonusesCurves()
+
+
+map_bonuses = load_map_bonuses()
@@ -2,16 +2,20 @@ from __future__ import annotations
 import re
 import os
 import logging
-from typing import TYPE_CHECKING, Dict, Optional
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
-from ah.storage import BinaryFile, TextFile, BaseFile
+from ah.storage import BinaryFile, TextFile, BaseFile, GzipCodec, get_codec
 from ah.models import (
     DBFileName,
     Namespace,
     DBExtEnum,
     DBTypeEnum,
     FactionEnum,
+    MapItemStringMarketValueRecords,
 )
+from ah.packfile import Packfile, PackMemberFile
+from ah.sqlitedb import SqliteDB, SqliteDBFile, SqliteMetaFile
 from ah.errors import DownloadError
 from ah import config
 
@@ -42,6 +46,9 @@ class GithubFileForker:
         self._logger = logging.getLogger(self.__class__.__name__)
         self._fork_repo = fork_repo
         self._gh_api = gh_api
+        # packfiles downloaded, by asset url, see `_pull_member`
+        self._packs: Dict[str, Packfile] = {}
+        self._packs_lock = threading.Lock()
 
     @classmethod
     # TODO: somewhere used this
@@ -62,20 +69,48 @@ class GithubFileForker:
     def _pull_asset(self, url) -> bytes:
         return self._gh_api.get_asset(url)
 
+    def _pull_member(self, assets: Dict[str, str], file_name: str) -> Optional[bytes]:
+        """`file_name` out of its region's packfile, if released, the packfile is
+        downloaded once and kept in memory for the rest of the files.
+        """
+        namespace = Packfile.get_namespace(file_name)
+        if namespace is None:
+            return None
+
+        url = assets.get(Packfile.get_file_name(namespace))
+        if url is None:
+            return None
+
+        with self._packs_lock:
+            if url not in self._packs:
+                self._packs[url] = Packfile(data=self._pull_asset(url))
+
+        pack = self._packs[url]
+        if file_name not in pack:
+            return None
+
+        return pack.read(file_name)
+
     def _fork_file(self, file: BaseFile) -> None:
         try:
             assets = self._pull_assets_url()
         except Exception as e:
             raise DownloadError("Failed to download asset map") from e
 
-        if file.file_name not in assets:
-            raise DownloadError("File not listed in assets")
-
-        asset_url = assets[file.file_name]
         try:
-            asset_data = self._pull_asset(asset_url)
+            asset_data = self._pull_member(assets, file.file_name)
         except Exception as e:
-            raise DownloadError("Failed to download asset") from e
+            raise DownloadError("Failed to download packfile") from e
+
+        if asset_data is None:
+            if file.file_name not in assets:
+                raise DownloadError("File not listed in assets")
+
+            asset_url = assets[file.file_name]
+            try:
+                asset_data = self._pull_asset(asset_url)
+            except Exception as e:
+                raise DownloadError("Failed to download asset") from e
 
         # we don't want it to be compressed multiple times
         # since we're essentially doing a copy here.
@@ -103,15 +138,62 @@ class GithubFileForker:
 
 class DBHelper:
     USE_COMPRESSION = config.DEFAULT_DB_COMPRESS
+    USE_PACKED = config.DEFAULT_DB_PACKED
+    PACKED_COMPRESSLEVEL = config.DEFAULT_DB_PACKED_COMPRESSLEVEL
+    CODEC = config.DEFAULT_DB_CODEC
+    COMPRESS_THREADS = config.DEFAULT_DB_COMPRESS_THREADS
+    BACKEND = config.DEFAULT_DB_BACKEND
+    BACKENDS = ("files", "sqlite")
 
     def __init__(
         self,
         data_path: str,
+        use_packed: Optional[bool] = None,
+        codec: Optional[str] = None,
+        compresslevel: Optional[int] = None,
+        compress_threads: Optional[int] = None,
+        backend: Optional[str] = None,
     ) -> None:
+        """`use_packed`: new db files are in the packed columnar format
+        (`DBExtEnum.PGZ` or `DBExtEnum.PBIN`), default: `USE_PACKED`.
+
+        `codec`, `compresslevel`: compression of db files written, see
+        `ah.storage.CODECS`, default: `CODEC` at its default level
+        (`PACKED_COMPRESSLEVEL` for packed gzip files), compressed by
+        `compress_threads` threads, default: `COMPRESS_THREADS`.
+
+        `backend`: one of `BACKENDS`, default: `BACKEND`. with "sqlite", db and
+        meta files are rows of one SQLite database under `data_path` (see
+        `ah.sqlitedb`), named and used just like files.
+        """
         self._data_path = data_path
+        self.use_packed = self.USE_PACKED if use_packed is None else use_packed
+        self.codec = self.CODEC if codec is None else codec
+        self.compresslevel = compresslevel
+        self.compress_threads = (
+            self.COMPRESS_THREADS if compress_threads is None else compress_threads
+        )
+        # fail early on unknown or unavailable codecs
+        get_codec(self.codec, compresslevel)
+        self.backend = self.BACKEND if backend is None else backend
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"unknown backend: {self.backend!r}")
+
+        if self.backend == "sqlite":
+            self.sqlite_db = SqliteDB(SqliteDB.get_file_path(data_path))
+        else:
+            self.sqlite_db = None
+        # by path, with their mtime, see `get_pack`
+        self._packs: Dict[str, Tuple[float, Packfile]] = {}
+        self._packs_lock = threading.Lock()
+
+    def close(self) -> None:
+        """closes the sqlite database, if any"""
+        if self.sqlite_db is not None:
+            self.sqlite_db.close()
 
     def list_file(self):
-        """list db or meta files under data_path"""
+        """list db or meta files under data_path, files backend only"""
         candidates = os.listdir(self._data_path)
         ret = []
         for file_name in candidates:
@@ -124,6 +206,20 @@ class DBHelper:
                 ret.append(file_name)
         return ret
 
+    def get_pack(self, namespace: Namespace) -> Optional[Packfile]:
+        """packfile of `namespace` under data_path, see `ah.packfile`"""
+        file_path = os.path.join(self._data_path, Packfile.get_file_name(namespace))
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            return None
+
+        with self._packs_lock:
+            if file_path not in self._packs or self._packs[file_path][0] != mtime:
+                self._packs[file_path] = (mtime, Packfile(file_path))
+
+            return self._packs[file_path][1]
+
     def get_file(
         self,
         namespace: Namespace,
@@ -131,11 +227,76 @@ class DBHelper:
         crid: Optional[int] = None,
         faction: Optional[FactionEnum] = None,
     ) -> BaseFile:
+        """files missing on their own are read from the namespace's packfile if
+        it has them, see `PackMemberFile`.
+        """
         if db_type == DBTypeEnum.META:
-            ext = DBExtEnum.JSON
+            file_path = self._get_file_path(
+                namespace, db_type, crid, faction, DBExtEnum.JSON
+            )
+            if self.sqlite_db is not None:
+                return SqliteMetaFile(os.path.basename(file_path), self.sqlite_db)
+
+            pack = self.get_pack(namespace)
+            if (
+                pack is not None
+                and not os.path.exists(file_path)
+                and os.path.basename(file_path) in pack
+            ):
+                return PackMemberFile(file_path, pack)
+
+            return TextFile(file_path)
+
+        if self.USE_COMPRESSION:
+            exts = [DBExtEnum.GZ, DBExtEnum.PGZ]
         else:
-            ext = DBExtEnum.GZ if self.USE_COMPRESSION else DBExtEnum.BIN
+            exts = [DBExtEnum.BIN, DBExtEnum.PBIN]
+        if self.use_packed:
+            exts.reverse()
+
+        file_path = self._get_file_path(namespace, db_type, crid, faction, exts[0])
+        if self.sqlite_db is not None:
+            # named like the file, e.g. to be forked from released files
+            return SqliteDBFile(os.path.basename(file_path), self.sqlite_db)
+
+        # existing files stay in their format, whichever is preferred
+        other_file_path = self._get_file_path(
+            namespace, db_type, crid, faction, exts[1]
+        )
+        if not os.path.exists(file_path) and os.path.exists(other_file_path):
+            file_path = other_file_path
+
+        kwargs = {
+            "use_compression": self.USE_COMPRESSION,
+            "compresslevel": self.compresslevel,
+            "codec": self.codec,
+            "threads": self.compress_threads,
+        }
+        file = BinaryFile(file_path, **kwargs)
+        pack = self.get_pack(namespace)
+        if pack is not None and not os.path.exists(file_path):
+            for file_path_ in (file_path, other_file_path):
+                if os.path.basename(file_path_) in pack:
+                    file = PackMemberFile(file_path_, pack, **kwargs)
+                    break
+
+        if (
+            self.compresslevel is None
+            and self.codec == GzipCodec.NAME
+            and MapItemStringMarketValueRecords.is_packed_file(file)
+        ):
+            file.compresslevel = self.PACKED_COMPRESSLEVEL
 
+        return file
+
+    def _get_file_path(
+        self,
+        namespace: Namespace,
+        db_type: DBTypeEnum,
+        crid: Optional[int],
+        faction: Optional[FactionEnum],
+        ext: DBExtEnum,
+    ) -> str:
         file_name = DBFileName(
             namespace=namespace,
             db_type=db_type,
@@ -143,10 +304,4 @@ class DBHelper:
             faction=faction,
             ext=ext,
         )
-        file_path = os.path.join(self._data_path, str(file_name))
-        if db_type == DBTypeEnum.META:
-            file = TextFile(file_path)
-        else:
-            file = BinaryFile(file_path, use_compression=self.USE_COMPRESSION)
-
-        return file
+        return os.path.join(self._data_path, str(file_name))
@@ -0,0 +1,65 @@
+"""decode json incrementally from a stream of bytes chunks, so that large
+responses never have to be held in memory as a whole.
+"""
+
+import re
+import json
+import codecs
+from typing import Any, Generator, Iterable
+
+__all__ = ("iter_json_array",)
+
+_DECODER = json.JSONDecoder()
+# whitespaces and separators between array elements
+_RE_SKIP = re.compile(r"[\s,]*")
+
+
+def iter_json_array(
+    chunks: Iterable[bytes], key: str, encoding: str = "utf-8"
+) -> Generator[Any, None, None]:
+    """yield elements of the array under `key` one by one, e.g. auctions of
+    `{"_links": {...}, "auctions": [{...}, {...}, ...]}`.
+
+    only what comes before the array is searched for `key`, and elements are
+    expected to be objects (or arrays, strings), so that an incomplete element
+    at the end of a chunk can't be mistaken for a complete one.
+
+    raises `ValueError` if `key` is not found or the stream ends early.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    re_key = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    chunks = iter(chunks)
+    buffer = ""
+    while True:
+        match = re_key.search(buffer)
+        if match:
+            pos = match.end()
+            break
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"array {key!r} not found")
+
+        buffer += decoder.decode(chunk)
+
+    while True:
+        pos = _RE_SKIP.match(buffer, pos).end()
+        if pos < len(buffer):
+            if buffer[pos] == "]":
+                return
+
+            try:
+                element, pos = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # incomplete element, need more data
+                pass
+            else:
+                yield element
+                continue
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"unexpected end of array {key!r}")
+
+        buffer = buffer[pos:] + decoder.decode(chunk)
+        pos = 0
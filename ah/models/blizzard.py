@@ -361,19 +361,34 @@ class AuctionsResponse(GenericAuctionsResponseInterface, _BaseModel):
         return self.timestamp
 
     @classmethod
-    def from_api(
+    def request_api(
         cls,
         bn_api: BNAPI,
         namespace: Namespace,
         connected_realm_id: str,
         faction: FactionEnum | None,
-    ) -> "AuctionsResponse":
+        if_modified_since: int | None = None,
+    ) -> Any:
+        """raw (json) response, unvalidated. `None` if not modified since
+        `if_modified_since`.
+        """
         auction_house_id = cls.MAP_FACTION_AH_ID[faction]
-        resp = bn_api.get_auctions(
+        return bn_api.get_auctions(
             namespace,
             connected_realm_id,
             auction_house_id=auction_house_id,
+            if_modified_since=if_modified_since,
         )
+
+    @classmethod
+    def from_api(
+        cls,
+        bn_api: BNAPI,
+        namespace: Namespace,
+        connected_realm_id: str,
+        faction: FactionEnum | None,
+    ) -> "AuctionsResponse":
+        resp = cls.request_api(bn_api, namespace, connected_realm_id, faction)
         return cls.model_validate(resp)
 
 
@@ -446,9 +461,30 @@ class CommoditiesResponse(GenericAuctionsResponseInterface, _BaseModel):
     def get_auctions(self) -> List[GenericAuctionInterface]:
         return self.auctions
 
+    @classmethod
+    def request_api(
+        cls,
+        bn_api: BNAPI,
+        namespace: Namespace,
+        if_modified_since: int | None = None,
+        stream: bool = False,
+    ) -> Any:
+        """raw (json) response, unvalidated. `None` if not modified since
+        `if_modified_since`.
+
+        with `stream`, "auctions" of the response is an iterator decoding
+        commodities as they download, see `BNAPI.stream_commodities`.
+        """
+        if stream:
+            return bn_api.stream_commodities(
+                namespace, if_modified_since=if_modified_since
+            )
+
+        return bn_api.get_commodities(namespace, if_modified_since=if_modified_since)
+
     @classmethod
     def from_api(cls, bn_api: BNAPI, namespace: Namespace) -> "CommoditiesResponse":
-        resp = bn_api.get_commodities(namespace)
+        resp = cls.request_api(bn_api, namespace)
         return cls.model_validate(resp)
 
     def get_timestamp(self) -> int:
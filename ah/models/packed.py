@@ -0,0 +1,325 @@
+"""packed columnar format of db files (`DBExtEnum.PBIN`, `DBExtEnum.PGZ`).
+
+unlike `item_db.proto`, where every record is a message of its own, records of
+all items are stored as a few packed arrays, which load straight into numpy.
+"""
+import mmap
+import struct
+from typing import ClassVar, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from attrs import define, field
+
+__all__ = (
+    "PackedItemDB",
+    "PackedItemDBReader",
+)
+
+
+def delta_encode(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """differences to the previous value of the same item, the first value of
+    every item is kept as is.
+    """
+    deltas = np.diff(values.astype(np.int64), prepend=0)
+    starts = offsets[:-1][np.diff(offsets) > 0]
+    deltas[starts] = values[starts]
+    return deltas
+
+
+def delta_decode(deltas: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    values = np.cumsum(deltas, dtype=np.int64)
+    lengths = np.diff(offsets)
+    starts = offsets[:-1][lengths > 0]
+    # sum of deltas before every item
+    bases = values[starts] - deltas[starts]
+    values -= np.repeat(bases, lengths[lengths > 0])
+    return values
+
+
+@define(kw_only=True)
+class PackedItemDB:
+    """columns of `MapItemStringMarketValueRecords`, item `i` has bonuses
+    `bonuses[bonus_offsets[i]:bonus_offsets[i + 1]]` (same for mods), and records
+    `timestamps[record_offsets[i]:record_offsets[i + 1]]` (same for the other
+    record fields).
+
+    >>> layout, little endian, every array starts at a multiple of 8 bytes:
+        header: magic b"AHPK", version (u1), flags (u1), n_items, n_records,
+                n_bonuses, n_mods (u4)
+        item_types     u1[n_items]   # `ItemStringType` in `item_db.proto`
+        item_ids       i4[n_items]
+        bonus_offsets  u4[n_items + 1]
+        bonuses        i4[n_bonuses]
+        mod_offsets    u4[n_items + 1]
+        mods           i4[n_mods]
+        record_offsets u4[n_items + 1]
+        timestamps     i4[n_records]  # delta encoded per item
+        market_values  i8[n_records]  # delta encoded per item
+        num_auctions   i4[n_records]
+        min_buyouts    i8[n_records]  # delta encoded per item
+
+    with `FLAG_SHUFFLED`, bytes of every array are stored byte plane by byte
+    plane (all first bytes, then all second bytes...), mostly zero planes of
+    small values compress better and faster, for files to be compressed.
+
+    anything after the last array (`get_nbytes`) is not part of it, e.g.
+    appended segments, see `MapItemStringMarketValueRecords.append_file`.
+    """
+
+    MAGIC: ClassVar[bytes] = b"AHPK"
+    VERSION: ClassVar[int] = 1
+    HEADER: ClassVar[struct.Struct] = struct.Struct("<4sBB2xIIII")
+    FLAG_SHUFFLED: ClassVar[int] = 1
+    ALIGN: ClassVar[int] = 8
+    # (name, dtype, size) in order of layout
+    ARRAYS: ClassVar[Tuple[Tuple[str, str, str], ...]] = (
+        ("item_types", "<u1", "n_items"),
+        ("item_ids", "<i4", "n_items"),
+        ("bonus_offsets", "<u4", "n_offsets"),
+        ("bonuses", "<i4", "n_bonuses"),
+        ("mod_offsets", "<u4", "n_offsets"),
+        ("mods", "<i4", "n_mods"),
+        ("record_offsets", "<u4", "n_offsets"),
+        ("timestamps", "<i4", "n_records"),
+        ("market_values", "<i8", "n_records"),
+        ("num_auctions", "<i4", "n_records"),
+        ("min_buyouts", "<i8", "n_records"),
+    )
+    DELTA_ENCODED: ClassVar[Tuple[str, ...]] = (
+        "timestamps",
+        "market_values",
+        "min_buyouts",
+    )
+
+    item_types: np.ndarray = field(converter=np.asarray)
+    item_ids: np.ndarray = field(converter=np.asarray)
+    bonus_offsets: np.ndarray = field(converter=np.asarray)
+    bonuses: np.ndarray = field(converter=np.asarray)
+    mod_offsets: np.ndarray = field(converter=np.asarray)
+    mods: np.ndarray = field(converter=np.asarray)
+    record_offsets: np.ndarray = field(converter=np.asarray)
+    timestamps: np.ndarray = field(converter=np.asarray)
+    market_values: np.ndarray = field(converter=np.asarray)
+    num_auctions: np.ndarray = field(converter=np.asarray)
+    min_buyouts: np.ndarray = field(converter=np.asarray)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    @classmethod
+    def is_packed(cls, data: bytes) -> bool:
+        return data[: len(cls.MAGIC)] == cls.MAGIC
+
+    @classmethod
+    def _padding(cls, n: int) -> int:
+        return -n % cls.ALIGN
+
+    @classmethod
+    def _shuffle(cls, data: bytes, itemsize: int) -> bytes:
+        return np.frombuffer(data, np.uint8).reshape(-1, itemsize).T.tobytes()
+
+    @classmethod
+    def _unshuffle(cls, array: np.ndarray) -> np.ndarray:
+        planes = array.view(np.uint8).reshape(array.itemsize, -1)
+        return np.ascontiguousarray(planes.T).view(array.dtype).reshape(-1)
+
+    def to_bytes(self, shuffle: bool = False) -> bytes:
+        sizes = {
+            "n_items": len(self.item_ids),
+            "n_offsets": len(self.item_ids) + 1,
+            "n_records": len(self.timestamps),
+            "n_bonuses": len(self.bonuses),
+            "n_mods": len(self.mods),
+        }
+        parts = [
+            self.HEADER.pack(
+                self.MAGIC,
+                self.VERSION,
+                self.FLAG_SHUFFLED if shuffle else 0,
+                sizes["n_items"],
+                sizes["n_records"],
+                sizes["n_bonuses"],
+                sizes["n_mods"],
+            )
+        ]
+        for name, dtype, size in self.ARRAYS:
+            array = getattr(self, name)
+            if len(array) != sizes[size]:
+                raise ValueError(f"{name} expects {sizes[size]} values: {len(array)}")
+
+            if name in self.DELTA_ENCODED:
+                array = delta_encode(array, self.record_offsets)
+
+            data = array.astype(dtype).tobytes()
+            if shuffle:
+                data = self._shuffle(data, np.dtype(dtype).itemsize)
+            parts.append(data)
+            parts.append(b"\0" * self._padding(len(data)))
+
+        return b"".join(parts)
+
+    @classmethod
+    def _parse_header(
+        cls, buffer: Union[bytes, memoryview, mmap.mmap]
+    ) -> Tuple[int, Dict[str, int]]:
+        if not cls.is_packed(buffer):
+            raise ValueError("not a packed db file")
+
+        (
+            _,
+            version,
+            flags,
+            n_items,
+            n_records,
+            n_bonuses,
+            n_mods,
+        ) = cls.HEADER.unpack_from(buffer)
+        if version != cls.VERSION:
+            raise ValueError(f"unsupported packed db version: {version}")
+
+        sizes = {
+            "n_items": n_items,
+            "n_offsets": n_items + 1,
+            "n_records": n_records,
+            "n_bonuses": n_bonuses,
+            "n_mods": n_mods,
+        }
+        return flags, sizes
+
+    @classmethod
+    def get_nbytes(cls, buffer: Union[bytes, memoryview, mmap.mmap]) -> int:
+        """size of the packed db at the start of `buffer`"""
+        _, sizes = cls._parse_header(buffer)
+        offset = cls.HEADER.size
+        for _, dtype, size in cls.ARRAYS:
+            nbytes = np.dtype(dtype).itemsize * sizes[size]
+            offset += nbytes + cls._padding(nbytes)
+
+        return offset
+
+    @classmethod
+    def parse_buffer(
+        cls, buffer: Union[bytes, memoryview, mmap.mmap]
+    ) -> Tuple[int, Dict[str, np.ndarray]]:
+        """returns flags and arrays as they are stored, views of `buffer`"""
+        flags, sizes = cls._parse_header(buffer)
+        arrays = {}
+        offset = cls.HEADER.size
+        for name, dtype, size in cls.ARRAYS:
+            array = np.frombuffer(buffer, dtype=dtype, count=sizes[size], offset=offset)
+            offset += array.nbytes + cls._padding(array.nbytes)
+            arrays[name] = array
+
+        return flags, arrays
+
+    @classmethod
+    def from_buffer(cls, buffer: Union[bytes, memoryview]) -> "PackedItemDB":
+        """arrays are views of `buffer` (unless delta encoded or shuffled)"""
+        flags, arrays = cls.parse_buffer(buffer)
+        if flags & cls.FLAG_SHUFFLED:
+            arrays = {name: cls._unshuffle(array) for name, array in arrays.items()}
+
+        for name in cls.DELTA_ENCODED:
+            arrays[name] = delta_decode(arrays[name], arrays["record_offsets"])
+
+        return cls(**arrays)
+
+
+class PackedItemDBReader:
+    """random access to items of an uncompressed packed db file
+    (`DBExtEnum.PBIN`) through `mmap`.
+
+    only the item columns are read on open, `record_offsets` is the index from
+    items to their records, so fetching records of an item (or just the recent
+    ones) touches nothing but that item's slices of the record arrays.
+
+    >>> with PackedItemDBReader(path) as reader:
+            for index in reader.find(item_type, item_id):
+                reader.get_item(index), reader.get_records(index, ts_from)
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        with open(file_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            flags, self._arrays = PackedItemDB.parse_buffer(self._mmap)
+            if flags & PackedItemDB.FLAG_SHUFFLED:
+                raise ValueError("shuffled packed db files can not be mapped")
+
+        except BaseException:
+            self._arrays = None
+            self._mmap.close()
+            raise
+
+        self._nbytes = PackedItemDB.get_nbytes(self._mmap)
+        # items sorted by (type, id), for binary search
+        keys = self._get_keys(self._arrays["item_types"], self._arrays["item_ids"])
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+
+    @classmethod
+    def _get_keys(cls, item_types: np.ndarray, item_ids: np.ndarray) -> np.ndarray:
+        return (item_types.astype(np.int64) << 32) | item_ids.astype(np.uint32)
+
+    def __enter__(self) -> "PackedItemDBReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # views of the mmap have to go before it gets closed
+        self._arrays = None
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get_tail(self) -> bytes:
+        """bytes after the packed db, appended segments if any"""
+        return self._mmap[self._nbytes :]
+
+    def find(self, item_type: int, item_id: int) -> List[int]:
+        """indices of items with `item_id`, every bonus and mod variant"""
+        key = self._get_keys(np.array([item_type]), np.array([item_id]))
+        lo, hi = np.searchsorted(self._keys, [key[0], key[0] + 1])
+        return sorted(self._order[lo:hi].tolist())
+
+    def get_item(self, index: int) -> Tuple[int, int, Tuple[int, ...], Tuple[int, ...]]:
+        """`(type, id, bonuses, mods)` of item `index`"""
+        arrays = self._arrays
+        bonus_offsets = arrays["bonus_offsets"]
+        mod_offsets = arrays["mod_offsets"]
+        return (
+            int(arrays["item_types"][index]),
+            int(arrays["item_ids"][index]),
+            tuple(
+                arrays["bonuses"][
+                    bonus_offsets[index] : bonus_offsets[index + 1]
+                ].tolist()
+            ),
+            tuple(arrays["mods"][mod_offsets[index] : mod_offsets[index + 1]].tolist()),
+        )
+
+    def get_records(
+        self, index: int, ts_from: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """record columns of item `index`, only those since `ts_from` if given
+        (records are in ascending order of timestamp).
+        """
+        arrays = self._arrays
+        start, end = arrays["record_offsets"][index : index + 2].tolist()
+        # first value of every item is absolute, the rest are deltas
+        columns = {
+            name: np.cumsum(arrays[name][start:end], dtype=np.int64)
+            if name in PackedItemDB.DELTA_ENCODED
+            else arrays[name][start:end].astype(np.int64)
+            for name in ("timestamps", "market_values", "num_auctions", "min_buyouts")
+        }
+        if ts_from is not None:
+            i = np.searchsorted(columns["timestamps"], ts_from)
+            columns = {name: column[i:] for name, column in columns.items()}
+
+        return columns
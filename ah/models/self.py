@@ -1,11 +1,12 @@
 from __future__ import annotations
 from functools import partial
-from heapq import heappush, heappop, nsmallest
+from heapq import heappush, heappop
 from collections import defaultdict
 from logging import Logger, getLogger
 from copy import deepcopy
 from functools import total_ordering, lru_cache
 from itertools import chain
+import os
 import re
 import json
 from typing import (
@@ -17,7 +18,9 @@ from typing import (
     Optional,
     Union,
     Iterable,
+    Iterator,
     Set,
+    Any,
     TYPE_CHECKING,
 )
 
@@ -31,9 +34,9 @@ from ah.protobuf.item_db_pb2 import (
     ItemStringType as ItemStringTypePB,
 )
 from ah.storage import BinaryFile, TextFile
+from ah.models.packed import PackedItemDB, PackedItemDBReader
 from ah.models.base import (
     _RootDictMixin,
-    _RootListMixin,
     ConverterWrapper as CW,
     StrEnum_,
     IntEnum_,
@@ -49,7 +52,7 @@ from ah.models.blizzard import (
     ConnectedRealm,
 )
 from ah.defs import SECONDS_IN
-from ah.data import map_bonuses
+from ah.data import map_bonuses, load_map_bonuses
 from ah.errors import CompressTsError, GetConnectedRealmsIndexError
 
 if TYPE_CHECKING:
@@ -64,8 +67,10 @@ __all__ = (
     "MarketValueRecords",
     "ItemStringTypeEnum",
     "ItemString",
+    "ItemStringTable",
     "MapItemStringMarketValueRecords",
     "MapItemStringMarketValueRecord",
+    "DecodedAuctions",
     "RealmCategoryEnum",
     "Meta",
 )
@@ -100,6 +105,9 @@ class DBTypeEnum(StrEnum_):
 class DBExtEnum(StrEnum_):
     GZ = "gz"
     BIN = "bin"
+    # packed columnar format, see `PackedItemDB`
+    PGZ = "pgz"
+    PBIN = "pbin"
     JSON = "json"
 
 
@@ -121,15 +129,22 @@ class DBFileName:
 
     def validate_root(self):
         # if db_type == META, then ext must be JSON
-        # elif db_type in (AUCTIONS, COMMODITIES), then ext must in (BIN, GZ)
+        # elif db_type in (AUCTIONS, COMMODITIES), then ext must in
+        #   (BIN, GZ, PBIN, PGZ)
         # else: raise ValueError
         if self.db_type == DBTypeEnum.META:
             if self.ext != DBExtEnum.JSON:
                 raise ValueError("ext must be JSON if db_type.type is META")
         elif self.db_type in (DBTypeEnum.COMMODITIES, DBTypeEnum.AUCTIONS):
-            if self.ext not in (DBExtEnum.BIN, DBExtEnum.GZ):
+            if self.ext not in (
+                DBExtEnum.BIN,
+                DBExtEnum.GZ,
+                DBExtEnum.PBIN,
+                DBExtEnum.PGZ,
+            ):
                 raise ValueError(
-                    "ext must be BIN or GZ if db_type.type is COMMODITIES or AUCTIONS"
+                    "ext must be BIN, GZ, PBIN or PGZ if db_type.type is "
+                    "COMMODITIES or AUCTIONS"
                 )
         else:
             raise ValueError(f"Invalid db_type: {self.db_type}")
@@ -175,7 +190,10 @@ class DBFileName:
                 )
 
     def is_compress(self) -> bool:
-        return self.ext == DBExtEnum.GZ
+        return self.ext in (DBExtEnum.GZ, DBExtEnum.PGZ)
+
+    def is_packed(self) -> bool:
+        return self.ext in (DBExtEnum.PBIN, DBExtEnum.PGZ)
 
     def to_str(self) -> str:
         parts = filter(
@@ -245,10 +263,18 @@ class MarketValueRecord:
         return self.timestamp < other.timestamp
 
 
-@define(kw_only=True)
-class MarketValueRecords(_RootListMixin[MarketValueRecord]):
+class MarketValueRecords:
     """
-    Holds an list of MarketValueRecord, ordered by timestamp in ascending order.
+    Holds market value records, ordered by timestamp in ascending order.
+
+    records are kept in a numpy structured array (one row per record, see
+    `DTYPE`) instead of a list of `MarketValueRecord`, which takes 24 bytes per
+    record. indexing and iterating yields `MarketValueRecord` views, which are
+    copies of the rows, changing them doesn't change the records.
+
+    records are kept in order by every method adding them, records out of
+    order are inserted after those with the same timestamp (as a stable sort
+    would), so lookups by timestamp are binary searches.
 
     >>> market_value_records = [
             $market_value_record,
@@ -257,7 +283,14 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
     """
 
     _logger: ClassVar[Logger] = getLogger("MarketValueRecords")
-    __root__: List[MarketValueRecord] = field(default=Factory(list), alias="__root__")
+    DTYPE: ClassVar[np.dtype] = np.dtype(
+        [
+            ("timestamp", np.int32),
+            ("market_value", np.int64),
+            ("num_auctions", np.int32),
+            ("min_buyout", np.int64),
+        ]
+    )
     DAY_WEIGHTS: ClassVar[List[int]] = [
         4,
         5,
@@ -277,18 +310,261 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
     ]
     HISTORICAL_DAYS: ClassVar[int] = 60
 
+    def __init__(self, __root__: Optional[Iterable[MarketValueRecord]] = None):
+        # rows beyond `_n` are spare capacity for `append`
+        self._array = np.empty(0, dtype=self.DTYPE)
+        self._n = 0
+        if __root__:
+            self.__root__ = __root__
+
+    @property
+    def array(self) -> np.ndarray:
+        """records as a structured array of `DTYPE`, a view, not a copy"""
+        return self._array[: self._n]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._array["timestamp"][: self._n]
+
+    @property
+    def market_values(self) -> np.ndarray:
+        return self._array["market_value"][: self._n]
+
+    @property
+    def num_auctions(self) -> np.ndarray:
+        return self._array["num_auctions"][: self._n]
+
+    @property
+    def min_buyouts(self) -> np.ndarray:
+        return self._array["min_buyout"][: self._n]
+
+    @property
+    def __root__(self) -> List[MarketValueRecord]:
+        """records as a list of `MarketValueRecord`, for compatibility"""
+        return list(self)
+
+    @__root__.setter
+    def __root__(self, records: Iterable[MarketValueRecord]) -> None:
+        records = list(records)
+        array = np.empty(len(records), dtype=self.DTYPE)
+        for i, record in enumerate(records):
+            array[i] = (
+                record.timestamp,
+                record.market_value,
+                record.num_auctions,
+                record.min_buyout,
+            )
+
+        self._set_array(self._sorted(array))
+
+    @classmethod
+    def _sorted(cls, array: np.ndarray) -> np.ndarray:
+        timestamps = array["timestamp"]
+        if np.all(timestamps[1:] >= timestamps[:-1]):
+            return array
+
+        # stable, same as sorting `MarketValueRecord`s, and linear on runs
+        # of sorted records
+        return array[np.argsort(timestamps, kind="stable")]
+
+    def _set_array(self, array: np.ndarray) -> None:
+        self._array = array
+        self._n = len(array)
+
+    def _reserve(self, n: int) -> None:
+        """make room for `n` records, over-allocating like `list` does"""
+        if n <= len(self._array):
+            return
+
+        array = np.empty(n + (n >> 3) + 6, dtype=self.DTYPE)
+        array[: self._n] = self.array
+        self._array = array
+
+    @classmethod
+    def _make_record(
+        cls, timestamp, market_value, num_auctions, min_buyout
+    ) -> MarketValueRecord:
+        # values are numpy scalars of the right types already, skip converters
+        record = MarketValueRecord.__new__(MarketValueRecord)
+        object.__setattr__(record, "timestamp", timestamp)
+        object.__setattr__(record, "market_value", market_value)
+        object.__setattr__(record, "num_auctions", num_auctions)
+        object.__setattr__(record, "min_buyout", min_buyout)
+        return record
+
+    @classmethod
+    def _record_at(cls, array: np.ndarray, index: int) -> MarketValueRecord:
+        return cls._make_record(
+            array["timestamp"][index],
+            array["market_value"][index],
+            array["num_auctions"][index],
+            array["min_buyout"][index],
+        )
+
+    def _iter_columns(self, step: int = 1) -> Iterator[Tuple]:
+        return zip(
+            self.timestamps[::step],
+            self.market_values[::step],
+            self.num_auctions[::step],
+            self.min_buyouts[::step],
+        )
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __iter__(self) -> Iterator[MarketValueRecord]:
+        for row in self._iter_columns():
+            yield self._make_record(*row)
+
+    def __reversed__(self) -> Iterator[MarketValueRecord]:
+        for row in self._iter_columns(-1):
+            yield self._make_record(*row)
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += self._n
+        if not 0 <= index < self._n:
+            raise IndexError("MarketValueRecords index out of range")
+
+        return index
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[MarketValueRecord, List[MarketValueRecord]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._n))]
+
+        return self._record_at(self._array, self._check_index(index))
+
+    def __setitem__(self, index: int, record: MarketValueRecord) -> None:
+        """replace the record at `index`, which moves to keep records in order
+        if its timestamp changed.
+        """
+        index = self._check_index(index)
+        if self._array["timestamp"][index] == record.timestamp:
+            self._array[index] = (
+                record.timestamp,
+                record.market_value,
+                record.num_auctions,
+                record.min_buyout,
+            )
+        else:
+            self.pop(index)
+            self.append(record)
+
+    def __eq__(self, other) -> bool:
+        # same as comparing lists of `MarketValueRecord`, by timestamps
+        if not isinstance(other, MarketValueRecords):
+            return NotImplemented
+
+        return np.array_equal(self.timestamps, other.timestamps)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(__root__={self.__root__!r})"
+
+    def append(self, record: MarketValueRecord) -> None:
+        """appending the newest record is the fast path, records out of order
+        are inserted in place.
+        """
+        self._reserve(self._n + 1)
+        index = self._n
+        if self._n and record.timestamp < self._array["timestamp"][self._n - 1]:
+            index = self.bisect(record.timestamp, right=True)
+            self._array[index + 1 : self._n + 1] = self._array[index : self._n]
+
+        self._array[index] = (
+            record.timestamp,
+            record.market_value,
+            record.num_auctions,
+            record.min_buyout,
+        )
+        self._n += 1
+
+    def extend(self, records: "MarketValueRecords") -> None:
+        """records are merged in if they overlap in time"""
+        if not records:
+            return
+
+        is_ordered = not self or self.timestamps[-1] <= records.timestamps[0]
+        self._reserve(self._n + len(records))
+        self._array[self._n : self._n + len(records)] = records.array
+        self._n += len(records)
+        if not is_ordered:
+            # merging two sorted runs
+            self._set_array(self._sorted(self.array))
+
+    def pop(self, index: int = -1) -> MarketValueRecord:
+        record = self[index]
+        index = self._check_index(index)
+        array = self.array
+        array[index:-1] = array[index + 1 :]
+        self._n -= 1
+        return record
+
+    def sort(self) -> None:
+        """records are kept in order, only needed if `array` was changed
+        directly.
+        """
+        self._set_array(self._sorted(self.array))
+
     def add(self, market_value_record: MarketValueRecord, sort: bool = False) -> int:
-        # TODO: go over all methods having `sort` parameter, making sure it
-        # doesn't do extra work. (for example, for `ItemStringMarketValueRecords`,
-        # we don't have to sort all records, just the ones that are added)
+        """`sort` is kept for compatibility, records are always kept in order"""
         self.append(market_value_record)
-        if sort:
-            self.sort()
-
         return 1
 
+    def bisect(self, ts: int, right: bool = False) -> int:
+        """index of the first record with timestamp >= `ts` (> `ts` if `right`)"""
+        return int(np.searchsorted(self.timestamps, ts, "right" if right else "left"))
+
+    def records_between(self, ts_from: int, ts_to: int) -> "MarketValueRecords":
+        """records with `ts_from <= timestamp < ts_to`, a copy"""
+        o = MarketValueRecords()
+        o._set_array(self.array[self.bisect(ts_from) : self.bisect(ts_to)].copy())
+        return o
+
+    def truncate_before(self, ts: int) -> int:
+        """remove records with `timestamp < ts`, returns number of records
+        removed.
+        """
+        index = self.bisect(ts)
+        if index:
+            self._set_array(self.array[index:].copy())
+
+        return index
+
+    def recent(self, ts_from: Optional[int] = None) -> Optional[MarketValueRecord]:
+        """the newest record, `None` if there's none, or it's older than
+        `ts_from`
+        """
+        if not self or (ts_from is not None and self.timestamps[-1] < ts_from):
+            return None
+
+        return self._record_at(self._array, self._n - 1)
+
     def empty(self):
-        self.__root__ = []
+        self._set_array(np.empty(0, dtype=self.DTYPE))
+
+    @classmethod
+    def from_columns(
+        cls,
+        timestamps: Iterable[int],
+        market_values: Iterable[int],
+        num_auctions: Iterable[int],
+        min_buyouts: Iterable[int],
+    ) -> "MarketValueRecords":
+        columns = [
+            np.asarray(column if hasattr(column, "__len__") else list(column))
+            for column in (timestamps, market_values, num_auctions, min_buyouts)
+        ]
+        array = np.empty(min(map(len, columns)), dtype=cls.DTYPE)
+        for name, column in zip(cls.DTYPE.names, columns):
+            array[name] = column[: len(array)]
+
+        o = cls()
+        o._set_array(cls._sorted(array))
+        return o
 
     @classmethod
     def get_compress_end_ts(cls, ts_now: int) -> int:
@@ -302,58 +578,73 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
         the averaged record's timestamp is the mid_day.
         also remove records that are older than `ts_expires_in`.
         """
+        n_before = len(self)
+        array, _ = self._compress_groups(
+            self.array,
+            np.zeros(n_before, dtype=np.intp),
+            ts_now,
+            ts_expires_in,
+            ts_compressed=ts_compressed,
+        )
+        self._set_array(array)
+        return n_before - len(self)
+
+    @classmethod
+    def _compress_groups(
+        cls,
+        array: np.ndarray,
+        groups: np.ndarray,
+        ts_now: int,
+        ts_expires_in: int,
+        ts_compressed: int = 0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """`compress` records of many groups at once, see `_average_by_day_groups`.
+        returns records and their groups, sorted by group.
+        """
         # keep recent records that didn't span over a day
-        ts_end = self.get_compress_end_ts(ts_now)
+        ts_end = cls.get_compress_end_ts(ts_now)
         # round up so we don't miss any records
         n_days = (ts_expires_in + SECONDS_IN.DAY - 1) // SECONDS_IN.DAY
-        compressed_records = self.average_by_day(
-            self,
+        compressed_groups, _, compressed = cls._average_by_day_groups(
+            array,
+            groups,
             ts_end,
             n_days,
             return_mvr=True,
             ts_compressed=ts_compressed,
         )
-        compressed_records = filter(None, compressed_records)
-        n_before = len(self)
-        # remove records that gets compressed
-        self.remove_expired(ts_end)
-        # prepend compressed records
-        self.__root__ = [*compressed_records, *self]
-        n_after = len(self)
-        return n_before - n_after
+        # remove records that gets compressed, prepend compressed records
+        is_recent = array["timestamp"] >= ts_end
+        groups = np.concatenate([compressed_groups, groups[is_recent]])
+        array = np.concatenate([compressed, array[is_recent]])
+        order = np.argsort(groups, kind="stable")
+        return array[order], groups[order]
 
     def remove_expired(self, ts_expires: int) -> int:
         """remove records that are older than `ts_expires` (timestamp < ts_expires)"""
-        len_before = len(self)
-        self.__root__ = [record for record in self if record.timestamp >= ts_expires]
-        return len_before - len(self)
+        return self.truncate_before(ts_expires)
 
     def get_recent_num_auctions(self, ts_last_update_begin: int) -> int:
         # return newest record
         # TODO: check that records without any auctions (None marketvalue) are added,
         # because sometimes there are no auctions for an item
-        if (
-            self
-            and self[-1].timestamp >= ts_last_update_begin
-            and self[-1].num_auctions
-        ):
-            return self[-1].num_auctions
+        record = self.recent(ts_last_update_begin)
+        if record is not None and record.num_auctions:
+            return record.num_auctions
         else:
             return 0
 
     def get_recent_min_buyout(self, ts_last_update_begin: int) -> int:
-        if self and self[-1].timestamp >= ts_last_update_begin and self[-1].min_buyout:
-            return self[-1].min_buyout
+        record = self.recent(ts_last_update_begin)
+        if record is not None and record.min_buyout:
+            return record.min_buyout
         else:
             return 0
 
     def get_recent_market_value(self, ts_last_update_begin) -> int:
-        if (
-            self
-            and self[-1].timestamp >= ts_last_update_begin
-            and self[-1].market_value
-        ):
-            return self[-1].market_value
+        record = self.recent(ts_last_update_begin)
+        if record is not None and record.market_value:
+            return record.market_value
         else:
             return 0
 
@@ -384,111 +675,180 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
 
         """
 
-        """
-        1.  put records into buckets of 1 day, later averaging each bucket into 
-            one record or market value. iterating records in descending order. 
-            records that were already averaged (compressed) are skipped for the 
-            sake of performance.
-        """
+        days_average = [None] * n_days_before
+        if not isinstance(records, MarketValueRecords):
+            records = MarketValueRecords(records)
 
-        buckets = defaultdict(list)
-        skipped = dict()
-        # last day with un-compressed records
-        last_i = -1
-        for record in reversed(records):
-            if record.market_value is None:
-                continue
-            # every `n * SECONDS_IN.DAY` is the start of a new day
-            i = (ts_now - record.timestamp - 1) // SECONDS_IN.DAY
-            if i < 0:
-                continue
+        _, days, averaged = cls._average_by_day_groups(
+            records.array,
+            np.zeros(len(records), dtype=np.intp),
+            ts_now,
+            n_days_before,
+            return_mvr=return_mvr,
+            ts_compressed=ts_compressed,
+        )
+        if return_mvr:
+            for k, i in enumerate(days.tolist()):
+                days_average[n_days_before - i - 1] = cls._record_at(averaged, k)
+        else:
+            for i, market_value in zip(
+                days.tolist(), averaged["market_value"].tolist()
+            ):
+                days_average[n_days_before - i - 1] = market_value
 
-            elif i < n_days_before:
-                # if a record is within the same day of an un-compressed record,
-                # regardless if it's already been compressed or not, we'd add it
-                # to the same bucket as the un-compressed record.
-                # because *average range* of a compressed record is snapped to
-                # UTC day, that means the range starts and ends exactly at
-                # `n * SECONDS_IN.DAY`, see `self.compress()`.
-                # if we're averaging again here with *average range* not snapped
-                # to UTC day, then the last compressed record might fall into
-                # the next bucket of un-compressed records, and needs to be
-                # averaged again.
-                # this could skew the true average of the first day after a
-                # compression period. because we're only giving the compressed
-                # record a weight of 1, instead of the total number of
-                # `MarketValueRecord` it came from.
-                # on the bright side, we have prevented too sudden of a market
-                # value jump in the first 12 hours after a compression period,
-                # due to the fact that it also sampled records from last day.
-                if record.timestamp >= ts_compressed or i == last_i:
-                    last_i = i
-                    buckets[i].append(record)
-                else:
-                    if i in skipped:
-                        raise CompressTsError(
-                            f"skipped record already exists, old: {skipped[i]} "
-                            f"new: {record}"
-                        )
-                    skipped[i] = record
+        return days_average
 
-            else:
-                # because records are sorted, we can stop processing them when we
-                # reach the first record that is older than `n_days_before`
-                break
+    @classmethod
+    def _average_by_day_groups(
+        cls,
+        array: np.ndarray,
+        groups: np.ndarray,
+        ts_now: int,
+        n_days_before: int,
+        return_mvr: bool = False,
+        ts_compressed: int = 0,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """`average_by_day` of records of many groups (e.g. items) at once.
 
+        :param array: records of all groups, `DTYPE`, sorted in ascending order
+               by timestamp within each group
+        :param groups: group of each record, from 0
+
+        returns `groups`, `days` (number of days before `ts_now`) and records
+        (`DTYPE`, only `market_value` is set unless `return_mvr`) of every day
+        with an average, sorted by group, then by timestamp in ascending order.
         """
-        2.  average each bucket so we get averaged market value for each day
-            note that some buckets may be empty, indicated by `None` instead
-            of an average.
+        empty = np.empty(0, dtype=np.intp)
+        if not len(array):
+            return empty, empty, np.empty(0, dtype=cls.DTYPE)
+
         """
-        days_average = [None] * n_days_before
-        for i, records in buckets.items():
-            if not records:
-                continue
+        1.  put records into buckets of 1 day (`days`, counted backwards from
+            `ts_now`), later averaging each bucket into one record or market
+            value. records of a group are taken from the newest one, down to
+            the first one older than `n_days_before` days.
+        """
+        timestamps = array["timestamp"].astype(np.int64)
+        # every `n * SECONDS_IN.DAY` is the start of a new day
+        days = (ts_now - timestamps - 1) // SECONDS_IN.DAY
+        older = (days >= n_days_before).nonzero()[0]
+        starts = np.zeros(groups.max() + 1, dtype=np.intp)
+        np.maximum.at(starts, groups[older], older + 1)
+        is_walked = np.arange(len(array)) >= starts[groups]
+        index = (is_walked & (days >= 0)).nonzero()[0]
+        # one bucket for every day of every group, numbered in order of group,
+        # then time
+        n_buckets = len(starts) * n_days_before
+        buckets = groups[index] * n_days_before + (n_days_before - 1 - days[index])
+        # if a record is within the same day of an un-compressed record,
+        # regardless if it's already been compressed or not, we'd add it
+        # to the same bucket as the un-compressed record.
+        # because *average range* of a compressed record is snapped to
+        # UTC day, that means the range starts and ends exactly at
+        # `n * SECONDS_IN.DAY`, see `self.compress()`.
+        # if we're averaging again here with *average range* not snapped
+        # to UTC day, then the last compressed record might fall into
+        # the next bucket of un-compressed records, and needs to be
+        # averaged again.
+        # this could skew the true average of the first day after a
+        # compression period. because we're only giving the compressed
+        # record a weight of 1, instead of the total number of
+        # `MarketValueRecord` it came from.
+        # on the bright side, we have prevented too sudden of a market
+        # value jump in the first 12 hours after a compression period,
+        # due to the fact that it also sampled records from last day.
+        is_compressed = timestamps[index] < ts_compressed
+        has_uncompressed = np.zeros(n_buckets, dtype=bool)
+        has_uncompressed[buckets[~is_compressed]] = True
+        # otherwise compressed records are alone in their day, and taken as
+        # they are (step 3), there can only be one of them per day.
+        is_skipped = is_compressed & ~has_uncompressed[buckets]
+        n_skipped = np.bincount(buckets[is_skipped], minlength=n_buckets)
+        if n_skipped.max(initial=0) > 1:
+            cls._raise_compress_ts_error(
+                array,
+                index[is_skipped],
+                buckets[is_skipped],
+                (n_skipped > 1).nonzero()[0][0] // n_days_before,
+                n_days_before,
+            )
 
-            day = n_days_before - i - 1
-            n_records = len(records)
-            avg_market_value = sum(r.market_value for r in records) / n_records
-            avg_market_value = int(avg_market_value + 0.5)
-
-            if return_mvr:
-                avg_num_auctions = sum(r.num_auctions for r in records) / n_records
-                avg_num_auctions = int(avg_num_auctions + 0.5)
-                # XXX: TSM keeps the last min_buyout of the day, not average (?)
-                # https://github.com/WouterBink/TradeSkillMaster-1/blob/master/TradeSkillMaster_AuctionDB/Modules/data.lua#L175
-                # NOTE: we use 0 to indicate no buyout, instead of the min price
-                # being 0 (special meaning)
-                min2 = nsmallest(2, (r.min_buyout for r in records))
-                min_min_buyout = next((n for n in min2 if n), 0)
-
-                # mid-day timestamp
-                time_stamp = int(ts_now - (i + 0.5) * SECONDS_IN.DAY)
-                days_average[day] = MarketValueRecord(
-                    timestamp=time_stamp,
-                    market_value=avg_market_value,
-                    num_auctions=avg_num_auctions,
-                    min_buyout=min_min_buyout,
-                )
-            else:
-                days_average[day] = avg_market_value
+        """
+        2.  average each bucket so we get averaged market value for each day
+            note that some buckets may be empty, they are left out.
+        """
+        n_records = np.bincount(buckets, minlength=n_buckets)
+        # non-empty buckets, numbered from 0
+        inverse = ((n_records > 0).cumsum() - 1)[buckets]
+        buckets = n_records.nonzero()[0]
+        n_records = n_records[buckets]
+        is_skipped = n_skipped[buckets] > 0
+        averaged = np.zeros(len(buckets), dtype=cls.DTYPE)
+        days = n_days_before - 1 - buckets % n_days_before
 
         """
-        3.  add compressed records that are in range but were skipped in step 1
+        3.  compressed records that are in range but were skipped in step 1
+            are alone in their buckets, they are taken as they are.
         """
-        for i, record in skipped.items():
-            day = n_days_before - i - 1
-            if return_mvr:
-                days_average[day] = MarketValueRecord(
-                    timestamp=record.timestamp,
-                    market_value=record.market_value,
-                    num_auctions=record.num_auctions,
-                    min_buyout=record.min_buyout,
-                )
-            else:
-                days_average[day] = record.market_value
+        sums = np.bincount(inverse, weights=array["market_value"][index])
+        # same rounding as `int(x + 0.5)`
+        averaged["market_value"] = np.where(is_skipped, sums, sums / n_records + 0.5)
+        if return_mvr:
+            sums = np.bincount(inverse, weights=timestamps[index])
+            # mid-day timestamp
+            averaged["timestamp"] = np.where(
+                is_skipped, sums, ts_now - (days + 0.5) * SECONDS_IN.DAY
+            )
+            sums = np.bincount(inverse, weights=array["num_auctions"][index])
+            averaged["num_auctions"] = np.where(
+                is_skipped, sums, sums / n_records + 0.5
+            )
+            averaged["min_buyout"] = cls._min_min_buyouts(
+                array["min_buyout"][index], inverse, n_records
+            )
 
-        return days_average
+        return buckets // n_days_before, days, averaged
+
+    @classmethod
+    def _min_min_buyouts(
+        cls, min_buyouts: np.ndarray, buckets: np.ndarray, n_records: np.ndarray
+    ) -> np.ndarray:
+        # XXX: TSM keeps the last min_buyout of the day, not average (?)
+        # https://github.com/WouterBink/TradeSkillMaster-1/blob/master/TradeSkillMaster_AuctionDB/Modules/data.lua#L175
+        # NOTE: we use 0 to indicate no buyout, instead of the min price
+        # being 0 (special meaning), the smallest of two smallest that isn't 0
+        no_buyout = min_buyouts == 0
+        min_min_buyouts = np.full(len(n_records), np.iinfo(np.int64).max)
+        np.minimum.at(min_min_buyouts, buckets, min_buyouts)
+        min_nonzero = np.full(len(n_records), np.iinfo(np.int64).max)
+        np.minimum.at(min_nonzero, buckets[~no_buyout], min_buyouts[~no_buyout])
+        n_no_buyout = np.bincount(buckets[no_buyout], minlength=len(n_records))
+        return np.where(
+            min_min_buyouts != 0,
+            min_min_buyouts,
+            np.where((n_no_buyout == 1) & (n_records > 1), min_nonzero, 0),
+        )
+
+    @classmethod
+    def _raise_compress_ts_error(
+        cls,
+        array: np.ndarray,
+        index: np.ndarray,
+        buckets: np.ndarray,
+        group: int,
+        n_days_before: int,
+    ) -> None:
+        # same error as walking skipped records of `group` from the newest one
+        skipped = dict()
+        in_group = buckets // n_days_before == group
+        for bucket, j in zip(buckets[in_group][::-1], index[in_group][::-1]):
+            if bucket in skipped:
+                raise CompressTsError(
+                    "skipped record already exists, "
+                    f"old: {cls._record_at(array, skipped[bucket])} "
+                    f"new: {cls._record_at(array, j)}"
+                )
+            skipped[bucket] = j
 
     def get_historical_market_value(self, ts_now: int, ts_compressed: int = 0) -> int:
         # TSM says it's a 60-day average of "weighted market value", I'm just
@@ -509,6 +869,10 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
             self.HISTORICAL_DAYS,
             ts_compressed=ts_compressed,
         )
+        return self.historical_from_days(days_average)
+
+    @classmethod
+    def historical_from_days(cls, days_average: List[Optional[int]]) -> int:
         # calculate average of all buckets that are not None
         sum_market_value = 0
         n_days = 0
@@ -518,8 +882,8 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
                 n_days += 1
 
         if n_days == 0:
-            self._logger.debug(
-                f"{self}: all records expired, get_historical_market_value() returns 0"
+            cls._logger.debug(
+                "all records expired, get_historical_market_value() returns 0"
             )
             return 0
 
@@ -538,13 +902,21 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
             len(self.DAY_WEIGHTS),
             ts_compressed=ts_compressed,
         )
+        return self.weighted_from_days(days_average)
+
+    @classmethod
+    def weighted_from_days(cls, days_average: List[Optional[int]]) -> int:
+        """`days_average` of the last `len(DAY_WEIGHTS)` days, or more, in which
+        case only the last ones are weighted.
+        """
+        days_average = days_average[len(days_average) - len(cls.DAY_WEIGHTS) :]
         # calculate weighted average over all buckets that are not None
         sum_market_value = 0
         sum_weights = 0
         for i, avg in enumerate(days_average):
             if avg is not None:
-                sum_market_value += avg * self.DAY_WEIGHTS[i]
-                sum_weights += self.DAY_WEIGHTS[i]
+                sum_market_value += avg * cls.DAY_WEIGHTS[i]
+                sum_weights += cls.DAY_WEIGHTS[i]
 
         # should return 0 according to TSM
         # https://github.com/WouterBink/TradeSkillMaster-1/blob/master/TradeSkillMaster_AuctionDB/Modules/data.lua#L115
@@ -557,6 +929,27 @@ class MarketValueRecords(_RootListMixin[MarketValueRecord]):
             # )
             return 0
 
+    def get_market_values(self, ts_now: int, ts_compressed: int = 0) -> Tuple[int, int]:
+        """`get_historical_market_value` and `get_weighted_market_value` at once.
+
+        both average the same days (buckets ending at `ts_now`), the weighted
+        one only the last `len(DAY_WEIGHTS)` of them, so records are averaged by
+        day only once for the two of them.
+        """
+        if not self:
+            return 0, 0
+
+        days_average = self.average_by_day(
+            self,
+            ts_now,
+            max(self.HISTORICAL_DAYS, len(self.DAY_WEIGHTS)),
+            ts_compressed=ts_compressed,
+        )
+        return (
+            self.historical_from_days(days_average[-self.HISTORICAL_DAYS :]),
+            self.weighted_from_days(days_average),
+        )
+
 
 class ItemStringTypeEnum(StrEnum_):
     PET = "p"
@@ -613,6 +1006,8 @@ class ItemString:
 
     KEEPED_MODIFIERS_TYPES: ClassVar[List[int]] = [9, 29, 30]
     MAP_BONUSES: ClassVar[Dict] = map_bonuses
+    # `MAP_BONUSES` memoized item strings were built with
+    _memo_map_bonuses: ClassVar[Dict] = map_bonuses
     SET_BONUS_ILVL_FIELDS: ClassVar[Set[str]] = {
         "level",
         "base_level",
@@ -633,28 +1028,73 @@ class ItemString:
 
     @classmethod
     def from_auction_item(cls, item: AuctionItem) -> "ItemString":
-        if item.pet_species_id is not None:
+        return cls.from_auction_item_fields(
+            item.id,
+            pet_species_id=item.pet_species_id,
+            bonus_lists=item.bonus_lists,
+            modifiers=item.modifiers,
+        )
+
+    @classmethod
+    def from_auction_item_fields(
+        cls,
+        id: int,
+        pet_species_id: Optional[int] = None,
+        bonus_lists: Optional[Iterable[int]] = None,
+        modifiers: Optional[Iterable[Dict[str, int]]] = None,
+    ) -> "ItemString":
+        """`from_auction_item` with fields of `AuctionItem`, which could come from
+        the raw (json) item as well, see `DecodedAuctions`.
+
+        memoized by the raw fields, see `from_auction_item_signature`.
+        """
+        if cls._memo_map_bonuses is not cls.MAP_BONUSES:
+            cls.clear_memo()
+
+        return cls.from_auction_item_signature(
+            id,
+            pet_species_id,
+            tuple(bonus_lists) if bonus_lists else None,
+            tuple((mod["type"], mod["value"]) for mod in modifiers)
+            if modifiers
+            else None,
+        )
+
+    @classmethod
+    @lru_cache(1 << 16)
+    def from_auction_item_signature(
+        cls,
+        id: int,
+        pet_species_id: Optional[int],
+        bonus_lists: Optional[Tuple[int, ...]],
+        modifiers: Optional[Tuple[Tuple[int, int], ...]],
+    ) -> "ItemString":
+        """`from_auction_item_fields` with `modifiers` as `(type, value)` pairs.
+
+        the same items show up in thousands of auctions of a snapshot, item
+        strings are built once per signature, for as long as it's in the LRU
+        cache. item strings are frozen, it's safe to share them.
+        """
+        if pet_species_id is not None:
             return cls(
                 type=ItemStringTypeEnum.PET,
-                id=item.pet_species_id,
+                id=pet_species_id,
                 bonuses=None,
                 mods=None,
             )
 
         else:
-            if item.bonus_lists:
+            if bonus_lists:
                 # we will not sort bonus ids as for now
-                bonuses = list(filter(cls.MAP_BONUSES.__contains__, item.bonus_lists))
+                bonuses = list(filter(cls.MAP_BONUSES.__contains__, bonus_lists))
 
             else:
                 bonuses = None
 
             plvl = None
             heap = []
-            if item.modifiers:
-                for mod in item.modifiers:
-                    mod_type = mod["type"]
-                    mod_value = mod["value"]
+            if modifiers:
+                for mod_type, mod_value in modifiers:
                     if mod_type not in cls.KEEPED_MODIFIERS_TYPES:
                         continue
                     if mod_type == cls.MOD_TYPE_PLAYER_LEVEL:
@@ -680,7 +1120,7 @@ class ItemString:
             if ilvl_info is None:
                 return cls(
                     type=ItemStringTypeEnum.ITEM,
-                    id=item.id,
+                    id=id,
                     bonuses=tuple(bonuses) if bonuses else None,
                     mods=tuple(mods) if mods else None,
                 )
@@ -694,7 +1134,7 @@ class ItemString:
                 if is_relative:
                     o = cls(
                         type=ItemStringTypeEnum.ITEM,
-                        id=item.id,
+                        id=id,
                         bonuses=None,
                         mods=(ILVL_MODIFIERS_TYPES.REL_ILVL, ilvl),
                     )
@@ -702,13 +1142,33 @@ class ItemString:
                 else:
                     o = cls(
                         type=ItemStringTypeEnum.ITEM,
-                        id=item.id,
+                        id=id,
                         bonuses=None,
                         mods=(ILVL_MODIFIERS_TYPES.ABS_ILVL, ilvl),
                     )
 
                 return o
 
+    @classmethod
+    def memo_info(cls):
+        """hits / misses of `from_auction_item_signature`, `functools._CacheInfo`"""
+        return cls.from_auction_item_signature.cache_info()
+
+    @classmethod
+    def clear_memo(cls) -> None:
+        """item strings depend on `MAP_BONUSES`, cached ones are dropped when
+        it's replaced, see `set_map_bonuses`.
+        """
+        cls.from_auction_item_signature.cache_clear()
+        cls.get_ilvl_from_curve.cache_clear()
+        cls._memo_map_bonuses = cls.MAP_BONUSES
+
+    @classmethod
+    def set_map_bonuses(cls, map_bonuses: Optional[Dict] = None) -> None:
+        """replace `MAP_BONUSES`, reloaded from `ah.data` if not given"""
+        cls.MAP_BONUSES = load_map_bonuses() if map_bonuses is None else map_bonuses
+        cls.clear_memo()
+
     @classmethod
     def get_ilvl(
         cls, bonuses: List[int], plvl: Optional[int]
@@ -824,19 +1284,37 @@ class ItemString:
         return cls(type=ItemStringTypeEnum.ITEM, id=item.id, bonuses=None, mods=None)
 
     @classmethod
-    def from_protobuf(cls, proto: ItemStringPB) -> "ItemString":
-        if proto.type == ItemStringTypePB.ITEM:
+    def from_protobuf(
+        cls, proto: ItemStringPB, table: Optional["ItemStringTable"] = None
+    ) -> "ItemString":
+        """shared instance from `table` if given, see `ItemStringTable`"""
+        fields = (proto.type, proto.id, tuple(proto.bonus), tuple(proto.mods))
+        if table is not None:
+            return table.get_item_string(*fields)
+
+        return cls.from_fields(*fields)
+
+    @classmethod
+    def from_fields(
+        cls,
+        type_pb: int,
+        id: int,
+        bonuses: Tuple[int, ...],
+        mods: Tuple[int, ...],
+    ) -> "ItemString":
+        """from fields as stored in db files, empty `bonuses` / `mods` for none"""
+        if type_pb == ItemStringTypePB.ITEM:
             type = ItemStringTypeEnum.ITEM
-        elif proto.type == ItemStringTypePB.PET:
+        elif type_pb == ItemStringTypePB.PET:
             type = ItemStringTypeEnum.PET
         else:
-            raise ValueError(f"unknown type: {proto.type}")
+            raise ValueError(f"unknown type: {type_pb}")
 
         return cls(
             type=type,
-            id=proto.id,
-            bonuses=tuple(proto.bonus) if proto.bonus else None,
-            mods=tuple(proto.mods) if proto.mods else None,
+            id=id,
+            bonuses=tuple(bonuses) if bonuses else None,
+            mods=tuple(mods) if mods else None,
         )
 
     def to_protobuf(self) -> ItemStringPB:
@@ -898,6 +1376,186 @@ class ItemString:
         return f"'{str(self)}'"
 
 
+class ItemStringTable(Dict[Tuple, ItemString]):
+    """item strings by their fields as stored in db files, see
+    `ItemString.from_fields`.
+
+    db files store each item string once, but every file loaded builds its own
+    (equal) instances, e.g. all realms of a region in `export_region`. loaded
+    with the same table, each distinct item string is built once and the
+    instance is shared by all files, which also makes merging them cheaper:
+    dict lookups of the very same key skip `__eq__`.
+    """
+
+    def get_item_string(
+        self,
+        type_pb: int,
+        id: int,
+        bonuses: Tuple[int, ...],
+        mods: Tuple[int, ...],
+    ) -> ItemString:
+        key = (type_pb, id, bonuses, mods)
+        item_string = self.get(key)
+        if item_string is None:
+            item_string = self[key] = ItemString.from_fields(*key)
+
+        return item_string
+
+
+@define(kw_only=True)
+class DecodedAuctions:
+    """fields of auctions that `MapItemStringMarketValueRecord` needs, decoded
+    from a raw (json) response straight into columns, without building pydantic
+    models for every auction (the strict path, `model_validate`).
+
+    row `i` is an auction of `item_strings[item_indices[i]]`, `prices` (bid if no
+    buyout) and `buyouts` (0 if none) are per unit.
+
+    rows failing the checks that matter are rejected and counted, see
+    `check_auction`.
+    """
+
+    _logger: ClassVar[Logger] = getLogger("DecodedAuctions")
+    PET_FIELDS: ClassVar[Tuple[str, ...]] = (
+        "pet_breed_id",
+        "pet_level",
+        "pet_quality_id",
+        "pet_species_id",
+    )
+    item_strings: List[ItemString]
+    item_indices: np.ndarray
+    prices: np.ndarray
+    quantities: np.ndarray
+    buyouts: np.ndarray
+    timestamp: int
+    n_rejected: int = 0
+
+    def __len__(self) -> int:
+        return len(self.item_indices)
+
+    @classmethod
+    def check_auction(cls, auction: Dict[str, Any]) -> Optional[str]:
+        """same checks as `Auction` and `AuctionItem` validators, returns the
+        reason of rejection, `None` if valid.
+        """
+        if auction.get("bid") is None and auction.get("buyout") is None:
+            return "no bid or buyout"
+
+        item = auction["item"]
+        if any(item.get(f) for f in cls.PET_FIELDS):
+            if not all(item.get(f) for f in cls.PET_FIELDS):
+                return "missing pet field"
+
+        return None
+
+    @classmethod
+    def from_raw(
+        cls,
+        resp: Dict[str, Any],
+        game_version: GameVersionEnum = GameVersionEnum.RETAIL,
+        is_commodities: bool = False,
+    ) -> "DecodedAuctions":
+        is_classic = game_version in (
+            GameVersionEnum.CLASSIC_ERA,
+            GameVersionEnum.CLASSIC,
+        )
+        item_strings = []
+        # raw item fields -> index, then item string -> index, different raw
+        # items could end up being the same item string
+        map_item_index = {}
+        map_item_string_index = {}
+        item_indices = []
+        prices = []
+        quantities = []
+        buyouts = []
+        n_rejected = 0
+        reasons = defaultdict(int)
+        for auction in resp.get("auctions") or ():
+            try:
+                item = auction["item"]
+                quantity = auction["quantity"]
+                if not isinstance(quantity, int) or quantity <= 0:
+                    raise ValueError("invalid quantity")
+
+                if is_commodities:
+                    key = item["id"]
+                    buyout = price = auction["unit_price"]
+                else:
+                    reason = cls.check_auction(auction)
+                    if reason:
+                        raise ValueError(reason)
+
+                    bonus_lists = item.get("bonus_lists")
+                    modifiers = item.get("modifiers")
+                    key = (
+                        item["id"],
+                        item.get("pet_species_id"),
+                        tuple(bonus_lists) if bonus_lists else None,
+                        tuple((m["type"], m["value"]) for m in modifiers)
+                        if modifiers
+                        else None,
+                    )
+                    buyout = auction.get("buyout")
+                    price = buyout or auction.get("bid")
+                    if is_classic:
+                        buyout = (buyout or 0) // quantity
+                        price = price // quantity
+                    else:
+                        buyout = buyout or 0
+
+                if not isinstance(price, int) or not isinstance(buyout, int):
+                    raise ValueError("invalid price")
+
+                index = map_item_index.get(key)
+                if index is None:
+                    if is_commodities:
+                        item_string = ItemString(
+                            type=ItemStringTypeEnum.ITEM,
+                            id=key,
+                            bonuses=None,
+                            mods=None,
+                        )
+                    else:
+                        item_string = ItemString.from_auction_item_fields(
+                            key[0],
+                            pet_species_id=key[1],
+                            bonus_lists=key[2],
+                            modifiers=modifiers,
+                        )
+                    index = map_item_string_index.get(item_string)
+                    if index is None:
+                        index = len(item_strings)
+                        item_strings.append(item_string)
+                        map_item_string_index[item_string] = index
+                    map_item_index[key] = index
+
+            except (KeyError, TypeError, ValueError) as e:
+                n_rejected += 1
+                reasons[str(e)] += 1
+                continue
+
+            item_indices.append(index)
+            prices.append(price)
+            quantities.append(quantity)
+            buyouts.append(buyout)
+
+        if n_rejected:
+            cls._logger.warning(
+                f"{n_rejected} auctions rejected, reasons: {dict(reasons)}"
+            )
+        cls._logger.debug(f"item string memo: {ItemString.memo_info()}")
+
+        return cls(
+            item_strings=item_strings,
+            item_indices=np.array(item_indices, dtype=np.int32),
+            prices=np.array(prices, dtype=np.int64),
+            quantities=np.array(quantities, dtype=np.int64),
+            buyouts=np.array(buyouts, dtype=np.int64),
+            timestamp=resp["timestamp"],
+            n_rejected=n_rejected,
+        )
+
+
 @define(kw_only=True)
 class MapItemStringMarketValueRecord(_RootDictMixin[ItemString, MarketValueRecord]):
     """
@@ -996,9 +1654,79 @@ class MapItemStringMarketValueRecord(_RootDictMixin[ItemString, MarketValueRecor
         return samples_s / samples_n
 
     @classmethod
-    def _heap_pop_all(cls, heap: list) -> Generator[Tuple[int, int], None, None]:
-        while heap:
-            yield heappop(heap)
+    def calc_market_values(
+        cls,
+        item_ns: np.ndarray,
+        starts: np.ndarray,
+        prices: np.ndarray,
+        quantities: np.ndarray,
+    ) -> np.ndarray:
+        """`calc_market_value` of many items at once, price groups of item `i`
+        are `prices[starts[i]:starts[i + 1]]` (and `quantities`), sorted by price.
+
+        returns market values (float64), `nan` where `calc_market_value` returns
+        `None`.
+
+        steps of `calc_market_value` in terms of every price group:
+        - a group is sampled if none of the groups before it (of the same item)
+          stops sampling, a group stops sampling if it's not the first one,
+          `lo` is reached, and `hi` is reached or its price jumps.
+        - the last sampled group is trimmed to `hi` (but at least 1 for the first
+          group).
+        - the outlier filter is a weighted mean / std per item.
+        """
+        item_ns = np.asarray(item_ns)
+        starts = np.asarray(starts)
+        prices = np.asarray(prices)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        n_groups = len(prices)
+        if not len(starts):
+            return np.empty(0, dtype=np.float64)
+
+        # item of every price group
+        segments = np.repeat(
+            np.arange(len(starts)), np.diff(starts, append=n_groups)
+        )
+        is_first = np.zeros(n_groups, dtype=bool)
+        is_first[starts] = True
+        cum = np.cumsum(quantities)
+        # quantity sampled before each group
+        cum_prev = cum - quantities
+        cum_prev -= cum_prev[starts][segments]
+
+        lo = (item_ns * cls.SAMPLE_LO).astype(np.int64)[segments]
+        hi = (item_ns * cls.SAMPLE_HI).astype(np.int64)[segments]
+        is_jump = np.zeros(n_groups, dtype=bool)
+        is_jump[1:] = prices[1:] >= cls.MAX_JUMP_MUL * prices[:-1]
+        is_stop = ~is_first & (cum_prev >= lo) & ((cum_prev >= hi) | is_jump)
+        n_stops = np.cumsum(is_stop)
+        n_stops -= n_stops[starts][segments]
+        is_sampled = n_stops == 0
+
+        weights = np.where(is_sampled, quantities, 0)
+        is_over = is_sampled & (cum_prev + quantities > hi)
+        weights[is_over] = (hi - cum_prev)[is_over]
+        weights[is_over & is_first & (weights == 0)] = 1
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            samples_n = np.add.reduceat(weights, starts)
+            samples_s = np.add.reduceat(prices * weights, starts)
+            samples_mean = samples_s / samples_n
+            deviations = prices - samples_mean[segments]
+            samples_variance = np.add.reduceat(deviations**2 * weights, starts)
+            ddof = np.where(samples_n == item_ns, 0, 1)
+            samples_std = np.where(
+                samples_n > 1, np.sqrt(samples_variance / (samples_n - ddof)), 0
+            )
+            samples_wstd = samples_std * cls.MAX_STD_MUL
+
+            weights[np.abs(deviations) > samples_wstd[segments]] = 0
+            samples_n = np.add.reduceat(weights, starts)
+            samples_s = np.add.reduceat(prices * weights, starts)
+            market_values = samples_s / samples_n
+
+        market_values[item_ns == 0] = np.nan
+        return market_values
 
     @classmethod
     def from_response(
@@ -1006,10 +1734,33 @@ class MapItemStringMarketValueRecord(_RootDictMixin[ItemString, MarketValueRecor
         response: GenericAuctionsResponseInterface,
         game_version: GameVersionEnum = GameVersionEnum.RETAIL,
     ) -> "MapItemStringMarketValueRecord":
-        obj = cls()
-        # >>> [total_quantity, min_buyout, [(price, quantity), ...]]
-        temp = {}
+        return cls.from_rows(
+            cls._iter_response_rows(response, game_version), response.get_timestamp()
+        )
 
+    @classmethod
+    def from_decoded(
+        cls, decoded: "DecodedAuctions"
+    ) -> "MapItemStringMarketValueRecord":
+        """same as `from_response`, from auctions decoded by `DecodedAuctions`"""
+        return cls.from_columns(
+            decoded.item_strings,
+            decoded.item_indices,
+            decoded.prices,
+            decoded.quantities,
+            decoded.buyouts,
+            decoded.timestamp,
+        )
+
+    @classmethod
+    def _iter_response_rows(
+        cls,
+        response: GenericAuctionsResponseInterface,
+        game_version: GameVersionEnum,
+    ) -> Generator[Tuple[ItemString, int, int, int], None, None]:
+        """yields `(item_string, price, quantity, buyout)`, price and buyout are
+        per unit.
+        """
         for auction in response.get_auctions():
             item_string = ItemString.from_item(auction.get_item())
             quantity = auction.get_quantity()
@@ -1032,31 +1783,139 @@ class MapItemStringMarketValueRecord(_RootDictMixin[ItemString, MarketValueRecor
                 # - we will normalize buyout=None to 0 (same as classic)
                 buyout = buyout or 0
 
-            if item_string not in temp:
-                temp[item_string] = [0, float("inf"), []]
+            yield item_string, price, quantity, buyout
 
-            temp[item_string][0] += quantity
-            if buyout and buyout < temp[item_string][1]:
-                temp[item_string][1] = buyout
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Tuple[ItemString, int, int, int]],
+        timestamp: int,
+    ) -> "MapItemStringMarketValueRecord":
+        """aggregate `(item_string, price, quantity, buyout)` rows of auctions
+        into market value records, see `from_columns`.
+        """
+        item_strings = []
+        map_item_string_index = {}
+        item_indices = []
+        prices = []
+        quantities = []
+        buyouts = []
+        for item_string, price, quantity, buyout in rows:
+            index = map_item_string_index.get(item_string)
+            if index is None:
+                index = len(item_strings)
+                item_strings.append(item_string)
+                map_item_string_index[item_string] = index
+
+            item_indices.append(index)
+            prices.append(price)
+            quantities.append(quantity)
+            buyouts.append(buyout)
+
+        return cls.from_columns(
+            item_strings,
+            np.array(item_indices, dtype=np.int32),
+            np.array(prices, dtype=np.int64),
+            np.array(quantities, dtype=np.int64),
+            np.array(buyouts, dtype=np.int64),
+            timestamp,
+        )
 
-            # we're using bid as price for auctions without buyout
-            heappush(temp[item_string][2], (price, quantity))
+    @classmethod
+    def from_columns(
+        cls,
+        item_strings: List[ItemString],
+        item_indices: np.ndarray,
+        prices: np.ndarray,
+        quantities: np.ndarray,
+        buyouts: np.ndarray,
+        timestamp: int,
+    ) -> "MapItemStringMarketValueRecord":
+        """aggregate auctions given as columns, auction `i` is of
+        `item_strings[item_indices[i]]`, `prices` (bid if no buyout) and
+        `buyouts` (0 if none) are per unit.
+
+        auctions are sorted once by (item, price, quantity), then every item is
+        a contiguous segment: total quantities and min buyouts are segmented
+        reductions, market values are computed for all items at once by
+        `calc_market_values`.
+        """
+        obj = cls()
+        if not len(item_indices):
+            return obj
 
-        for item_string in temp:
-            market_value = cls.calc_market_value(
-                temp[item_string][0], cls._heap_pop_all(temp[item_string][2])
+        # quantity as the last key, same order as popping a heap of
+        # `(price, quantity)`, which `calc_market_value` is sensitive to
+        order = np.lexsort((quantities, prices, item_indices))
+        item_indices = item_indices[order]
+        prices = prices[order]
+        quantities = quantities[order]
+        # 0 for bid-only auctions, left out of min buyout
+        buyouts = np.where(buyouts > 0, buyouts, np.iinfo(np.int64).max)[order]
+
+        starts = np.flatnonzero(np.diff(item_indices, prepend=-1))
+        totals = np.add.reduceat(quantities, starts)
+        min_buyouts = np.minimum.reduceat(buyouts, starts)
+        # if all auctions are bid-only, min_buyout = 0
+        min_buyouts[min_buyouts == np.iinfo(np.int64).max] = 0
+        market_values = cls.calc_market_values(totals, starts, prices, quantities)
+        is_valid = ~np.isnan(market_values) & (market_values != 0)
+        market_values = (market_values[is_valid] + 0.5).astype(np.int64)
+        for index, market_value, total, min_buyout in zip(
+            item_indices[starts][is_valid].tolist(),
+            market_values.tolist(),
+            totals[is_valid].tolist(),
+            min_buyouts[is_valid].tolist(),
+        ):
+            obj[item_strings[index]] = MarketValueRecord(
+                timestamp=timestamp,
+                market_value=market_value,
+                num_auctions=total,
+                min_buyout=min_buyout,
             )
+
+        return obj
+
+    @classmethod
+    def from_commodities(
+        cls,
+        commodities: Iterable[Dict[str, Any]],
+        timestamp: int,
+    ) -> "MapItemStringMarketValueRecord":
+        """same as `from_response` for a (retail) commodities response, but takes
+        raw (json) commodities, which could be an iterator decoding them from the
+        response body (see `BNAPI.stream_commodities`). commodities are
+        aggregated as they come, neither the response nor per-auction models are
+        ever built.
+        """
+        obj = cls()
+        # >>> {item_id: [total_quantity, {price: quantity, ...}]}
+        # commodities of an item tend to share prices, grouping them by price
+        # takes less memory than keeping every auction
+        temp = {}
+        for commodity in commodities:
+            item_id = commodity["item"]["id"]
+            quantity = commodity["quantity"]
+            price = commodity["unit_price"]
+            if item_id not in temp:
+                temp[item_id] = [0, defaultdict(int)]
+
+            temp[item_id][0] += quantity
+            temp[item_id][1][price] += quantity
+
+        for item_id, (total_quantity, price_groups) in temp.items():
+            price_groups = sorted(price_groups.items())
+            market_value = cls.calc_market_value(total_quantity, price_groups)
             if market_value:
-                market_value = np.int64(market_value + 0.5)
-                # if all auctions are bid-only, min_buyout = 0
-                min_buyout = (
-                    0 if temp[item_string][1] == float("inf") else temp[item_string][1]
+                item_string = ItemString(
+                    type=ItemStringTypeEnum.ITEM, id=item_id, bonuses=None, mods=None
                 )
                 obj[item_string] = MarketValueRecord(
-                    timestamp=response.get_timestamp(),
-                    market_value=market_value,
-                    num_auctions=temp[item_string][0],
-                    min_buyout=min_buyout,
+                    timestamp=timestamp,
+                    market_value=np.int64(market_value + 0.5),
+                    num_auctions=total_quantity,
+                    # buyout is the unit price for commodities
+                    min_buyout=next((p for p, _ in price_groups if p), 0),
                 )
 
         return obj
@@ -1126,12 +1985,11 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
         n_added_records = 0
         n_added_entries = 0
         for item_string, market_value_records in other.items():
-            for market_value_record in market_value_records:
-                n_added_records_, n_added_entries_ = self.add_market_value_record(
-                    item_string, market_value_record, sort=False
-                )
-                n_added_records += n_added_records_
-                n_added_entries += n_added_entries_
+            if market_value_records:
+                if not self[item_string]:
+                    n_added_entries += 1
+                self[item_string].extend(market_value_records)
+                n_added_records += len(market_value_records)
 
             if sort:
                 self[item_string].sort()
@@ -1176,12 +2034,30 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
         n_added_records += self[item_string].add(market_value_record, sort=sort)
         return n_added_records, n_added_entries
 
-    def remove_expired(self, ts_expires: int) -> Tuple[int, int]:
-        n_removed_records = 0
-        for market_value_records in self.values():
-            n_removed_records += market_value_records.remove_expired(ts_expires)
+    def _flatten(self) -> Tuple[List[ItemString], np.ndarray, np.ndarray]:
+        """records of all items as one array, with the group (index into item
+        strings) of each record
+        """
+        item_strings = list(self.keys())
+        arrays = [market_value_records.array for market_value_records in self.values()]
+        groups = np.repeat(np.arange(len(arrays)), [len(array) for array in arrays])
+        array = np.concatenate(arrays or [np.empty(0, MarketValueRecords.DTYPE)])
+        return item_strings, array, groups
+
+    def _scatter(
+        self, item_strings: List[ItemString], array: np.ndarray, groups: np.ndarray
+    ) -> None:
+        """reverse `_flatten`, `groups` must be sorted"""
+        offsets = np.searchsorted(groups, np.arange(len(item_strings) + 1)).tolist()
+        for i, item_string in enumerate(item_strings):
+            # views of `array`, records are replaced, not changed in place
+            self[item_string]._set_array(array[offsets[i] : offsets[i + 1]])
 
-        return n_removed_records
+    def remove_expired(self, ts_expires: int) -> Tuple[int, int]:
+        item_strings, array, groups = self._flatten()
+        is_kept = array["timestamp"] >= ts_expires
+        self._scatter(item_strings, array[is_kept], groups[is_kept])
+        return len(array) - int(is_kept.sum())
 
     def compress(
         self,
@@ -1189,13 +2065,15 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
         ts_expires_in: int,
         ts_compressed: int = 0,
     ) -> int:
-        n_removed = 0
-        for market_value_records in self.values():
-            n_removed += market_value_records.compress(
-                ts_now, ts_expires_in, ts_compressed=ts_compressed
-            )
-
-        return n_removed
+        """`MarketValueRecords.compress` of all items in a few passes over all
+        records at once, rather than item by item.
+        """
+        item_strings, array, groups = self._flatten()
+        compressed, groups = MarketValueRecords._compress_groups(
+            array, groups, ts_now, ts_expires_in, ts_compressed=ts_compressed
+        )
+        self._scatter(item_strings, compressed, groups)
+        return len(array) - len(compressed)
 
     def remove_empty_entries(self) -> int:
         n_removed_entries = 0
@@ -1207,22 +2085,25 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
         return n_removed_entries
 
     @classmethod
-    def from_protobuf(cls, pb_item_db: ItemDB) -> "MapItemStringMarketValueRecords":
+    def from_protobuf(
+        cls, pb_item_db: ItemDB, item_strings: Optional[ItemStringTable] = None
+    ) -> "MapItemStringMarketValueRecords":
         o = cls()
+        if item_strings is None:
+            item_strings = ItemStringTable()
+
         for pb_item in pb_item_db.items:
-            market_value_records = MarketValueRecords()
-            for pb_item_mv_record in pb_item.market_value_records:
-                market_value_records.add(
-                    MarketValueRecord(
-                        timestamp=pb_item_mv_record.timestamp,
-                        market_value=pb_item_mv_record.market_value,
-                        num_auctions=pb_item_mv_record.num_auctions,
-                        min_buyout=pb_item_mv_record.min_buyout,
-                    ),
-                    sort=False,
+            # items repeat if segments were appended, see `append_file`
+            item_string = ItemString.from_protobuf(pb_item.item_string, item_strings)
+            pb_records = pb_item.market_value_records
+            o[item_string].extend(
+                MarketValueRecords.from_columns(
+                    [r.timestamp for r in pb_records],
+                    [r.market_value for r in pb_records],
+                    [r.num_auctions for r in pb_records],
+                    [r.min_buyout for r in pb_records],
                 )
-            item_string = ItemString.from_protobuf(pb_item.item_string)
-            o[item_string] = market_value_records
+            )
 
         return o
 
@@ -1234,12 +2115,17 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
                 continue
             pb_item = pb_item_db.items.add()
             pb_item.item_string.CopyFrom(item_string.to_protobuf())
-            for mv_record in market_value_records:
+            for timestamp, market_value, num_auctions, min_buyout in zip(
+                market_value_records.timestamps.tolist(),
+                market_value_records.market_values.tolist(),
+                market_value_records.num_auctions.tolist(),
+                market_value_records.min_buyouts.tolist(),
+            ):
                 pb_item_mv_record = pb_item.market_value_records.add()
-                pb_item_mv_record.timestamp = mv_record.timestamp
-                pb_item_mv_record.market_value = mv_record.market_value
-                pb_item_mv_record.num_auctions = mv_record.num_auctions
-                pb_item_mv_record.min_buyout = mv_record.min_buyout
+                pb_item_mv_record.timestamp = timestamp
+                pb_item_mv_record.market_value = market_value
+                pb_item_mv_record.num_auctions = num_auctions
+                pb_item_mv_record.min_buyout = min_buyout
 
         return pb_item_db
 
@@ -1247,17 +2133,137 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
     def from_protobuf_bytes(
         cls,
         data: bytes,
+        item_strings: Optional[ItemStringTable] = None,
     ) -> "MapItemStringMarketValueRecords":
         item_db = ItemDB()
         item_db.ParseFromString(data)
-        return cls.from_protobuf(item_db)
+        return cls.from_protobuf(item_db, item_strings)
 
     def to_protobuf_bytes(self) -> bytes:
         return self.to_protobuf().SerializeToString()
 
+    @classmethod
+    def from_packed(
+        cls, packed: PackedItemDB, item_strings: Optional[ItemStringTable] = None
+    ) -> "MapItemStringMarketValueRecords":
+        o = cls()
+        if item_strings is None:
+            item_strings = ItemStringTable()
+
+        bonus_offsets = packed.bonus_offsets.tolist()
+        bonuses = packed.bonuses.tolist()
+        mod_offsets = packed.mod_offsets.tolist()
+        mods = packed.mods.tolist()
+        record_offsets = packed.record_offsets.tolist()
+        for i, (type_, id_) in enumerate(
+            zip(packed.item_types.tolist(), packed.item_ids.tolist())
+        ):
+            item_string = item_strings.get_item_string(
+                type_,
+                id_,
+                tuple(bonuses[bonus_offsets[i] : bonus_offsets[i + 1]]),
+                tuple(mods[mod_offsets[i] : mod_offsets[i + 1]]),
+            )
+            start, end = record_offsets[i], record_offsets[i + 1]
+            o[item_string] = MarketValueRecords.from_columns(
+                packed.timestamps[start:end],
+                packed.market_values[start:end],
+                packed.num_auctions[start:end],
+                packed.min_buyouts[start:end],
+            )
+
+        return o
+
+    def to_packed(self) -> PackedItemDB:
+        map_types = {
+            ItemStringTypeEnum.ITEM: ItemStringTypePB.ITEM,
+            ItemStringTypeEnum.PET: ItemStringTypePB.PET,
+        }
+        item_types = []
+        item_ids = []
+        bonus_offsets = [0]
+        bonuses = []
+        mod_offsets = [0]
+        mods = []
+        record_offsets = [0]
+        arrays = []
+        n_records = 0
+        for item_string, market_value_records in self.items():
+            if not market_value_records:
+                # skip empty entries
+                continue
+
+            item_types.append(map_types[item_string.type])
+            item_ids.append(item_string.id)
+            bonuses.extend(item_string.bonuses or ())
+            bonus_offsets.append(len(bonuses))
+            mods.extend(item_string.mods or ())
+            mod_offsets.append(len(mods))
+            arrays.append(market_value_records.array)
+            n_records += len(market_value_records)
+            record_offsets.append(n_records)
+
+        array = np.concatenate(arrays or [np.empty(0, MarketValueRecords.DTYPE)])
+        return PackedItemDB(
+            item_types=np.array(item_types, dtype=np.uint8),
+            item_ids=np.array(item_ids, dtype=np.int32),
+            bonus_offsets=np.array(bonus_offsets, dtype=np.uint32),
+            bonuses=np.array(bonuses, dtype=np.int32),
+            mod_offsets=np.array(mod_offsets, dtype=np.uint32),
+            mods=np.array(mods, dtype=np.int32),
+            record_offsets=np.array(record_offsets, dtype=np.uint32),
+            timestamps=array["timestamp"],
+            market_values=array["market_value"],
+            num_auctions=array["num_auctions"],
+            min_buyouts=array["min_buyout"],
+        )
+
+    @classmethod
+    def from_packed_bytes(
+        cls, data: bytes, item_strings: Optional[ItemStringTable] = None
+    ) -> "MapItemStringMarketValueRecords":
+        return cls.from_packed(PackedItemDB.from_buffer(data), item_strings)
+
+    def to_packed_bytes(self, shuffle: bool = False) -> bytes:
+        return self.to_packed().to_bytes(shuffle=shuffle)
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, item_strings: Optional[ItemStringTable] = None
+    ) -> "MapItemStringMarketValueRecords":
+        """either format, packed files are told by their magic bytes.
+
+        segments appended to files (see `append_file`) are protobuf, for
+        protobuf files they simply parse as part of the base.
+
+        pass the same `item_strings` to files loaded together to share their
+        item strings, see `ItemStringTable`.
+        """
+        if item_strings is None:
+            item_strings = ItemStringTable()
+
+        if PackedItemDB.is_packed(data):
+            obj = cls.from_packed_bytes(data, item_strings)
+            segments = data[PackedItemDB.get_nbytes(data) :]
+            if segments:
+                obj.extend(cls.from_protobuf_bytes(segments, item_strings))
+
+            return obj
+
+        return cls.from_protobuf_bytes(data, item_strings)
+
+    @classmethod
+    def is_packed_file(cls, file: BinaryFile) -> bool:
+        """whether `file` should be written in the packed format, by extension"""
+        ext = file.file_name.rpartition(DBFileName.SEP_EXT)[2]
+        return ext in (DBExtEnum.PBIN, DBExtEnum.PGZ)
+
     @classmethod
     def from_file(
-        cls, file: BinaryFile, forker: GithubFileForker = None
+        cls,
+        file: BinaryFile,
+        forker: GithubFileForker = None,
+        item_strings: Optional[ItemStringTable] = None,
     ) -> "MapItemStringMarketValueRecords":
         if forker:
             forker.ensure_file(file)
@@ -1268,16 +2274,100 @@ class MapItemStringMarketValueRecords(_RootDictMixin[ItemString, MarketValueReco
             )
             return cls()
 
+        if hasattr(file, "read_records"):
+            # rows of a database (`ah.sqlitedb`), no need for the file format
+            obj = file.read_records(item_strings=item_strings)
+            cls._logger.info(f"{file} loaded.")
+            return obj
+
         with file.open("rb") as f:
-            obj = cls.from_protobuf_bytes(f.read())
+            obj = cls.from_bytes(f.read(), item_strings)
             cls._logger.info(f"{file} loaded.")
             return obj
 
-    def to_file(self, file: BinaryFile) -> None:
+    @classmethod
+    def query_file(
+        cls,
+        file: BinaryFile,
+        id_: int,
+        ts_from: Optional[int] = None,
+    ) -> "MapItemStringMarketValueRecords":
+        """same as `from_file(file).query(id_)`, with only records since `ts_from`
+        if given.
+
+        uncompressed packed files on disk are looked up through
+        `PackedItemDBReader`, db files kept as rows (`ah.sqlitedb`) through
+        their indices, without loading other items, other files are loaded as a
+        whole.
+        """
+        if not file.exists():
+            return cls()
+
+        if hasattr(file, "read_records"):
+            return file.read_records(item_id=id_, ts_from=ts_from)
+
+        if (
+            file.use_compression
+            or not cls.is_packed_file(file)
+            # e.g. packfile members
+            or not os.path.isfile(file.file_path)
+        ):
+            result = cls.from_file(file).query(id_)
+            if ts_from is not None:
+                for records in result.values():
+                    records.remove_expired(ts_from)
+
+            return result
+
+        result = cls()
+        with PackedItemDBReader(file.file_path) as reader:
+            for type_pb in (ItemStringTypePB.ITEM, ItemStringTypePB.PET):
+                for index in reader.find(type_pb, id_):
+                    item_string = ItemString.from_fields(*reader.get_item(index))
+                    columns = reader.get_records(index, ts_from=ts_from)
+                    result[item_string] = MarketValueRecords.from_columns(
+                        columns["timestamps"],
+                        columns["market_values"],
+                        columns["num_auctions"],
+                        columns["min_buyouts"],
+                    )
+
+            segments = reader.get_tail()
+
+        if segments:
+            segments = cls.from_protobuf_bytes(segments).query(id_)
+            if ts_from is not None:
+                segments.remove_expired(ts_from)
+            result.extend(segments)
+
+        return result
+
+    def to_file(self, file: BinaryFile, packed: Optional[bool] = None) -> None:
+        """`packed` defaults to the format `file`'s extension implies"""
+        if packed is None:
+            packed = self.is_packed_file(file)
+
         with file.open("wb") as f:
-            f.write(self.to_protobuf_bytes())
+            if packed:
+                # shuffled bytes compress better
+                f.write(self.to_packed_bytes(shuffle=file.use_compression))
+            else:
+                f.write(self.to_protobuf_bytes())
             self._logger.info(f"{file} saved.")
 
+    def append_file(self, file: BinaryFile) -> None:
+        """append records to `file` as a segment, without reading or rewriting
+        what's already in there, readers merge segments into records of the
+        same items on load.
+
+        segments are protobuf (a member of their own in compressed
+        files), concatenated protobuf messages parse as one, after packed data
+        they're told apart by the packed size.
+        """
+        with file.open("ab") as f:
+            f.write(self.to_protobuf_bytes())
+            self._logger.info(f"{file} segment appended.")
+
 
 class RealmCategoryEnum(StrEnum_):
     DEFAULT = "default"
@@ -1330,7 +2420,12 @@ class Meta:
                     ],
                     ...
                 },
-                "system": {...}
+                "system": {...},
+                "last_modified": {
+                    # see `get_last_modified`
+                    $db_file_key: $timestamp,
+                    ...
+                }
             }
 
         """
@@ -1343,6 +2438,7 @@ class Meta:
             },
             "connected_realms": {},
             "system": {},
+            "last_modified": {},
         }
 
     def add_connected_realm(self, crid: int, connected_realm: ConnectedRealm) -> None:
@@ -1412,6 +2508,46 @@ class Meta:
     def get_update_ts(self) -> Tuple[int, int]:
         return self._data["update"]["start_ts"], self._data["update"]["end_ts"]
 
+    @classmethod
+    def _get_last_modified_key(
+        cls, crid: Optional[int] = None, faction: Optional[FactionEnum] = None
+    ) -> str:
+        if crid is None:
+            return "commodities"
+        elif faction is None:
+            return str(crid)
+        else:
+            return f"{crid}-{faction}"
+
+    def get_last_modified(
+        self, crid: Optional[int] = None, faction: Optional[FactionEnum] = None
+    ) -> Optional[int]:
+        """timestamp of the latest snapshot saved in the db file of this
+        connected realm (and faction), commodities if `crid` not given.
+
+        `None` if unknown, e.g. the last request failed or meta was saved by an
+        older version.
+        """
+        key = self._get_last_modified_key(crid, faction)
+        return self._data.get("last_modified", {}).get(key)
+
+    def set_last_modified(
+        self,
+        timestamp: Optional[int],
+        crid: Optional[int] = None,
+        faction: Optional[FactionEnum] = None,
+    ) -> None:
+        key = self._get_last_modified_key(crid, faction)
+        last_modified = self._data.setdefault("last_modified", {})
+        if timestamp is None:
+            last_modified.pop(key, None)
+        else:
+            last_modified[key] = timestamp
+
+    def inherit_last_modified(self, meta: "Meta") -> None:
+        """take over snapshot timestamps from an older `meta` of the same region"""
+        self._data["last_modified"] = dict(meta._data.get("last_modified", {}))
+
     @classmethod
     def from_file(cls, file: TextFile, forker: GithubFileForker = None) -> "Meta":
         if forker:
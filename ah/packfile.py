@@ -0,0 +1,323 @@
+"""region packfiles, all db (and meta) files of a namespace in one archive, so
+that a region is a single release asset (one download) and a single local file.
+
+    python -m ah.packfile pack --db_path db dynamic-us
+    python -m ah.packfile unpack --out_path db db/dynamic-us.pack
+"""
+
+import io
+import os
+import sys
+import struct
+import hashlib
+import logging
+import argparse
+from logging import getLogger
+from typing import ClassVar, Dict, Iterable, List, Optional, Tuple
+
+from attrs import define
+
+from ah.storage import BinaryFile, decompress
+from ah.models import DBFileName, Namespace
+from ah import config
+
+__all__ = (
+    "Packfile",
+    "PackEntry",
+    "PackMemberFile",
+)
+
+
+@define(frozen=True)
+class PackEntry:
+    offset: int
+    size: int
+    digest: bytes
+
+
+class Packfile:
+    """members are stored as they are (compressed db files stay compressed),
+    behind an index of `name -> (offset, size, sha256)`.
+
+    >>> layout, little endian:
+        header: magic b"AHPF", version (u1), n_entries, index_size (u4)
+        index:  n_entries x (offset (u8), size (u8), sha256 (32 bytes),
+                name_size (u2), name (utf-8))
+        members, at their offsets from the start of the file
+
+    only the header and index are read on open, members are read on demand.
+    """
+
+    _logger = getLogger("Packfile")
+    MAGIC: ClassVar[bytes] = b"AHPF"
+    VERSION: ClassVar[int] = 1
+    HEADER: ClassVar[struct.Struct] = struct.Struct("<4sB3xII")
+    ENTRY: ClassVar[struct.Struct] = struct.Struct("<QQ32sH")
+    EXT: ClassVar[str] = "pack"
+
+    def __init__(self, file_path: Optional[str] = None, data: bytes = None) -> None:
+        """either the path of a packfile, or the packfile itself as `data`"""
+        self.file_path = file_path
+        self._data = data
+        self._index = None
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}("{self.file_path}")'
+
+    @classmethod
+    def get_file_name(cls, namespace: Namespace) -> str:
+        return f"{namespace}.{cls.EXT}"
+
+    @classmethod
+    def get_namespace(cls, file_name: str) -> Optional[Namespace]:
+        """namespace a db (or meta) file belongs to, `None` if not a db file"""
+        try:
+            return DBFileName.from_str(file_name).namespace
+        except Exception:
+            return None
+
+    @classmethod
+    def build(cls, members: Iterable[Tuple[str, bytes]]) -> bytes:
+        members = list(members)
+        names = [name.encode("utf-8") for name, _ in members]
+        index_size = sum(cls.ENTRY.size + len(name) for name in names)
+        offset = cls.HEADER.size + index_size
+        parts = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(members), index_size)]
+        for name, (_, data) in zip(names, members):
+            digest = hashlib.sha256(data).digest()
+            parts.append(cls.ENTRY.pack(offset, len(data), digest, len(name)))
+            parts.append(name)
+            offset += len(data)
+
+        parts.extend(data for _, data in members)
+        return b"".join(parts)
+
+    @classmethod
+    def write(cls, file_path: str, members: Iterable[Tuple[str, bytes]]) -> None:
+        # replaced at once, readers never see a partial packfile
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(cls.build(members))
+
+        os.replace(temp_path, file_path)
+        cls._logger.info(f"{file_path} saved.")
+
+    @classmethod
+    def parse_index(cls, f: io.BufferedIOBase) -> Dict[str, PackEntry]:
+        magic, version, n_entries, index_size = cls.HEADER.unpack(
+            f.read(cls.HEADER.size)
+        )
+        if magic != cls.MAGIC:
+            raise ValueError("not a packfile")
+
+        if version != cls.VERSION:
+            raise ValueError(f"unsupported packfile version: {version}")
+
+        index = {}
+        buffer = f.read(index_size)
+        pos = 0
+        for _ in range(n_entries):
+            offset, size, digest, name_size = cls.ENTRY.unpack_from(buffer, pos)
+            pos += cls.ENTRY.size
+            name = buffer[pos : pos + name_size].decode("utf-8")
+            pos += name_size
+            index[name] = PackEntry(offset, size, digest)
+
+        return index
+
+    def _open(self) -> io.BufferedIOBase:
+        if self._data is not None:
+            return io.BytesIO(self._data)
+
+        return open(self.file_path, "rb")
+
+    @property
+    def index(self) -> Dict[str, PackEntry]:
+        if self._index is None:
+            with self._open() as f:
+                self._index = self.parse_index(f)
+
+        return self._index
+
+    def names(self) -> List[str]:
+        return list(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def read(self, name: str) -> bytes:
+        """raises `KeyError` if no such member, `ValueError` if corrupted"""
+        entry = self.index[name]
+        with self._open() as f:
+            f.seek(entry.offset)
+            data = f.read(entry.size)
+
+        if hashlib.sha256(data).digest() != entry.digest:
+            raise ValueError(f"corrupted member {name!r} of {self!r}")
+
+        return data
+
+    def iter_members(self) -> Iterable[Tuple[str, bytes]]:
+        for name in self.index:
+            yield name, self.read(name)
+
+
+class PackMemberFile(BinaryFile):
+    """db (or meta) file read from a packfile, unless the file exists on its
+    own (loose) under `file_path`, which it's always written to.
+    """
+
+    def __init__(self, file_path: str, pack: Packfile, **kwargs) -> None:
+        super().__init__(file_path, **kwargs)
+        self.pack = pack
+
+    def is_loose(self) -> bool:
+        return super().exists()
+
+    def exists(self):
+        return self.is_loose() or self.file_name in self.pack
+
+    def open(self, mode="rb"):
+        if "a" in mode and not self.is_loose() and self.file_name in self.pack:
+            # segments go after the member, in a loose copy read from then on
+            with open(self.file_path, "wb") as f:
+                f.write(self.pack.read(self.file_name))
+
+        if "r" not in mode or self.is_loose():
+            return super().open(mode)
+
+        data = self.pack.read(self.file_name)
+        if self.use_compression:
+            data = decompress(data)
+
+        if "b" in mode:
+            return io.BytesIO(data)
+
+        return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+
+
+def pack(
+    db_path: str,
+    out_path: Optional[str] = None,
+    namespaces: Optional[List[str]] = None,
+    remove: bool = False,
+) -> List[str]:
+    """pack db files under `db_path` into one packfile per namespace (only
+    `namespaces` if given), members of existing packfiles are kept unless
+    there's a newer loose file.
+
+    returns paths of packfiles written.
+    """
+    out_path = out_path or db_path
+    groups: Dict[str, Dict[str, str]] = {}
+    for file_name in sorted(os.listdir(db_path)):
+        namespace = Packfile.get_namespace(file_name)
+        file_path = os.path.join(db_path, file_name)
+        if namespace is None or not os.path.isfile(file_path):
+            continue
+
+        groups.setdefault(str(namespace), {})[file_name] = file_path
+
+    written = []
+    for namespace, loose in groups.items():
+        if namespaces and namespace not in namespaces:
+            continue
+
+        pack_path = os.path.join(out_path, f"{namespace}.{Packfile.EXT}")
+        members = {}
+        if os.path.exists(pack_path):
+            members.update(Packfile(pack_path).iter_members())
+
+        for file_name, file_path in loose.items():
+            with open(file_path, "rb") as f:
+                members[file_name] = f.read()
+
+        Packfile.write(pack_path, sorted(members.items()))
+        written.append(pack_path)
+        if remove:
+            for file_path in loose.values():
+                os.remove(file_path)
+
+    return written
+
+
+def unpack(pack_paths: List[str], out_path: str) -> List[str]:
+    """extract members of packfiles into `out_path`, returns paths extracted"""
+    extracted = []
+    for pack_path in pack_paths:
+        for name, data in Packfile(pack_path).iter_members():
+            file_path = os.path.join(out_path, name)
+            with open(file_path, "wb") as f:
+                f.write(data)
+            extracted.append(file_path)
+
+    return extracted
+
+
+def main(command: str = None, **kwargs) -> None:
+    if command == "pack":
+        pack(**kwargs)
+    elif command == "unpack":
+        unpack(**kwargs)
+    elif command == "list":
+        packfile = Packfile(kwargs["pack_path"])
+        for name, entry in packfile.index.items():
+            print(f"{name}\t{entry.size}\t{entry.digest.hex()}")
+
+
+def parse_args(raw_args):
+    parser = argparse.ArgumentParser()
+    default_db_path = config.DEFAULT_DB_PATH
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_pack = subparsers.add_parser(
+        "pack",
+        help="Pack db files into one packfile per namespace.",
+    )
+    parser_pack.add_argument(
+        "--db_path",
+        help=f"Path to database, default: {default_db_path!r}",
+        default=default_db_path,
+        type=str,
+    )
+    parser_pack.add_argument(
+        "--out_path",
+        default=None,
+        type=str,
+        help="Where to save packfiles, default: '--db_path'.",
+    )
+    parser_pack.add_argument(
+        "--remove",
+        action="store_true",
+        help="Remove db files once packed, they're read from the packfile then.",
+    )
+    parser_pack.add_argument(
+        "namespaces",
+        nargs="*",
+        help="Namespaces to pack, e.g. 'dynamic-us', default: all.",
+    )
+    parser_unpack = subparsers.add_parser(
+        "unpack",
+        help="Extract db files from packfiles.",
+    )
+    parser_unpack.add_argument(
+        "--out_path",
+        help=f"Where to extract to, default: {default_db_path!r}",
+        default=default_db_path,
+        type=str,
+    )
+    parser_unpack.add_argument("pack_paths", nargs="+", help="Packfiles.")
+    parser_list = subparsers.add_parser(
+        "list",
+        help="List members (name, size, sha256) of a packfile.",
+    )
+    parser_list.add_argument("pack_path", help="Packfile.")
+    return parser.parse_args(raw_args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=config.LOGGING_LEVEL)
+    args = parse_args(sys.argv[1:])
+    main(**vars(args))
@@ -0,0 +1,212 @@
+"""a small thread based pipeline, stages are connected by bounded queues so that
+work of different stages (e.g. network, CPU, disk) overlaps while memory usage
+stays bounded.
+"""
+
+import time
+import queue
+import threading
+from logging import getLogger
+from typing import Any, Callable, Iterable, List, Optional
+
+__all__ = (
+    "Stage",
+    "Pipeline",
+)
+
+
+class _Sentinel:
+    pass
+
+
+_STOP = _Sentinel()
+
+
+class Stage:
+    """one step of the pipeline, `func` is called on every item from upstream,
+    its return value is passed downstream.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        # stats
+        self._lock = threading.Lock()
+        self.n_items = 0
+        self.busy_time = 0.0
+        self.max_latency = 0.0
+        self.max_qsize = 0
+
+    def record(self, latency: float, qsize: int) -> None:
+        with self._lock:
+            self.n_items += 1
+            self.busy_time += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.max_qsize = max(self.max_qsize, qsize)
+
+    def get_stats(self) -> str:
+        avg = self.busy_time / self.n_items if self.n_items else 0
+        return (
+            f"stage={self.name!r} workers={self.workers} items={self.n_items} "
+            f"busy={self.busy_time:.2f}s avg={avg:.2f}s max={self.max_latency:.2f}s "
+            f"max_qsize={self.max_qsize}"
+        )
+
+
+class Pipeline:
+    """run items through `stages` in order, every stage runs in its own worker
+    thread(s). a stage blocks when its downstream queue is full (`maxsize`).
+
+    in case any stage raises, the pipeline stops taking new items and the
+    exception is re-raised from `run`.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, stages: List[Stage], maxsize: int = 1, name: str = None):
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+
+        self._logger = getLogger(self.__class__.__name__)
+        self.name = name or self.__class__.__name__
+        self.stages = stages
+        self.maxsize = maxsize
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """put with abort check, returns False if aborted"""
+        while not self._abort.is_set():
+            try:
+                q.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._abort.is_set():
+            try:
+                return q.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+        return _STOP
+
+    def _feed(self, items: Iterable[Any], q_out: queue.Queue, n_stop: int) -> None:
+        try:
+            for item in items:
+                if not self._put(q_out, item):
+                    return
+
+        except BaseException as e:
+            self._fail(e)
+            return
+
+        for _ in range(n_stop):
+            self._put(q_out, _STOP)
+
+    def _fail(self, e: BaseException) -> None:
+        if self._error is None:
+            self._error = e
+        self._abort.set()
+
+    def _work(
+        self,
+        stage: Stage,
+        q_in: queue.Queue,
+        q_out: queue.Queue,
+        n_stop_out: int,
+        done: List[int],
+        lock: threading.Lock,
+    ) -> None:
+        while True:
+            item = self._get(q_in)
+            if item is _STOP:
+                break
+
+            qsize = q_in.qsize()
+            ts = time.perf_counter()
+            try:
+                result = stage.func(item)
+            except BaseException as e:
+                self._fail(e)
+                return
+
+            latency = time.perf_counter() - ts
+            stage.record(latency, qsize)
+            self._logger.debug(
+                f"{self.name}: stage={stage.name!r} {latency=:.3f}s "
+                f"queue_depth={qsize}"
+            )
+            if not self._put(q_out, result):
+                return
+
+        # the last worker of a stage passes stop signals downstream
+        with lock:
+            done[0] += 1
+            is_last = done[0] == stage.workers
+
+        if is_last:
+            for _ in range(n_stop_out):
+                self._put(q_out, _STOP)
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """returns outputs of the last stage, order is not guaranteed when any
+        stage has more than one worker.
+        """
+        self._abort.clear()
+        self._error = None
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in self.stages]
+        # unbounded, collects outputs of the last stage
+        queues.append(queue.Queue())
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(items, queues[0], self.stages[0].workers),
+                name=f"{self.name}-feed",
+                daemon=True,
+            )
+        ]
+        for i, stage in enumerate(self.stages):
+            if i + 1 < len(self.stages):
+                n_stop_out = self.stages[i + 1].workers
+            else:
+                n_stop_out = 1
+
+            done = [0]
+            lock = threading.Lock()
+            for n in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(stage, queues[i], queues[i + 1], n_stop_out, done, lock),
+                        name=f"{self.name}-{stage.name}-{n}",
+                        daemon=True,
+                    )
+                )
+
+        ts = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        results = []
+        while True:
+            item = self._get(queues[-1])
+            if item is _STOP:
+                break
+            results.append(item)
+
+        for thread in threads:
+            thread.join()
+
+        self._logger.info(f"{self.name}: done in {time.perf_counter() - ts:.2f}s")
+        for stage in self.stages:
+            self._logger.info(f"{self.name}: {stage.get_stats()}")
+
+        if self._error is not None:
+            raise self._error
+
+        return results
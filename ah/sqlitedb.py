@@ -0,0 +1,536 @@
+"""SQLite backend of the db, all db and meta files of a `data_path` as rows of
+one SQLite database, see `DBHelper(backend="sqlite")`.
+
+items and records get a row each, indexed by (namespace, crid, faction, item)
+and by timestamp, so they can be queried without loading whole files.
+`SqliteDBFile` and `SqliteMetaFile` read and write like the files they stand
+for, besides which the updater saves increments as rows (see
+`Updater.update_rows`): increments are inserted, expired records deleted by
+timestamp and only items with records to compress are rewritten.
+"""
+
+import io
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from logging import getLogger
+from typing import Callable, ClassVar, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ah.storage import BinaryFile, TextFile, detect_codec
+from ah.models import DBFileName, ItemStringTable, MapItemStringMarketValueRecords
+from ah.models.packed import PackedItemDB
+
+__all__ = (
+    "SqliteDB",
+    "SqliteDBFile",
+    "SqliteMetaFile",
+)
+
+
+class SqliteDB:
+    """one connection per thread, writes of every file in a transaction of
+    its own, sqlite serializes them.
+
+    a db file is a row of `files`, its items rows of `items` and their records
+    rows of `records`, meta files are kept as they are in `meta`. files are
+    named without their extension, the format they were written in is gone.
+    """
+
+    _logger = getLogger("SqliteDB")
+    FILE_NAME: ClassVar[str] = "db.sqlite3"
+    # seconds to wait for other writers
+    TIMEOUT: ClassVar[float] = 60
+    SCHEMA: ClassVar[str] = """
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            namespace TEXT NOT NULL,
+            db_type TEXT NOT NULL,
+            crid INTEGER,
+            faction TEXT
+        );
+        CREATE INDEX IF NOT EXISTS files_realm
+            ON files (namespace, crid, faction);
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY,
+            file INTEGER NOT NULL REFERENCES files (id),
+            item_id INTEGER NOT NULL,
+            type INTEGER NOT NULL,
+            bonuses BLOB NOT NULL,
+            mods BLOB NOT NULL,
+            UNIQUE (file, item_id, type, bonuses, mods)
+        );
+        CREATE TABLE IF NOT EXISTS records (
+            item INTEGER NOT NULL REFERENCES items (id),
+            timestamp INTEGER NOT NULL,
+            market_value INTEGER NOT NULL,
+            num_auctions INTEGER NOT NULL,
+            min_buyout INTEGER NOT NULL
+        );
+        -- by timestamp of each item, records of a file are expired through it
+        CREATE INDEX IF NOT EXISTS records_item ON records (item, timestamp);
+        CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self._local = threading.local()
+        # of all threads, see `close`
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}("{self.file_path}")'
+
+    @classmethod
+    def get_file_path(cls, data_path: str) -> str:
+        return os.path.join(data_path, cls.FILE_NAME)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None or conn not in self._connections:
+            # only ever used by the thread, but closed by whichever calls `close`
+            conn = sqlite3.connect(
+                self.file_path, timeout=self.TIMEOUT, check_same_thread=False
+            )
+            conn.executescript(self.SCHEMA)
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+
+        return conn
+
+    def close(self) -> None:
+        """closes connections of all threads, threads using it afterwards
+        reconnect.
+        """
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """committed if the `with` block didn't raise, rolled back otherwise"""
+        with self.connection as conn:
+            yield conn.cursor()
+
+    @classmethod
+    def get_name(cls, file_name: str) -> str:
+        return file_name.rpartition(DBFileName.SEP_EXT)[0]
+
+    @classmethod
+    def _get_file_id(
+        cls, cursor: sqlite3.Cursor, file_name: str, create: bool = False
+    ) -> Optional[int]:
+        name = cls.get_name(file_name)
+        row = cursor.execute("SELECT id FROM files WHERE name = ?", (name,)).fetchone()
+        if row is not None or not create:
+            return row and row[0]
+
+        db_file_name = DBFileName.from_str(file_name)
+        cursor.execute(
+            "INSERT INTO files (name, namespace, db_type, crid, faction) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                name,
+                str(db_file_name.namespace),
+                str(db_file_name.db_type),
+                db_file_name.crid,
+                db_file_name.faction and str(db_file_name.faction),
+            ),
+        )
+        return cursor.lastrowid
+
+    @classmethod
+    def _delete_items(cls, cursor: sqlite3.Cursor, file_id: int) -> None:
+        cursor.execute(
+            "DELETE FROM records WHERE item IN (SELECT id FROM items WHERE file = ?)",
+            (file_id,),
+        )
+        cursor.execute("DELETE FROM items WHERE file = ?", (file_id,))
+
+    def exists(self, file_name: str) -> bool:
+        return self._get_file_id(self.connection.cursor(), file_name) is not None
+
+    def remove(self, file_name: str) -> None:
+        with self.transaction() as cursor:
+            file_id = self._get_file_id(cursor, file_name)
+            if file_id is not None:
+                self._delete_items(cursor, file_id)
+                cursor.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def touch(self, file_name: str) -> None:
+        """file `file_name` exists (without items) if it didn't"""
+        with self.transaction() as cursor:
+            self._get_file_id(cursor, file_name, create=True)
+
+    def write(self, file_name: str, packed: PackedItemDB, replace: bool = True) -> None:
+        """items and records of `packed` into file `file_name`, in one
+        transaction, which replaces what's there if `replace` (a rewrite of the
+        whole file), otherwise records are added to the items already there
+        (appended segments, increments).
+        """
+        with self.transaction() as cursor:
+            file_id = self._get_file_id(cursor, file_name, create=True)
+            if replace:
+                self._delete_items(cursor, file_id)
+
+            n_records = self._insert(cursor, file_id, packed)
+
+        self._logger.debug(f"{self!r}: {n_records} records written to {file_name}")
+
+    def replace_items(self, file_name: str, packed: PackedItemDB) -> None:
+        """records of items in `packed` are replaced by theirs, other items of
+        file `file_name` are untouched.
+        """
+        with self.transaction() as cursor:
+            file_id = self._get_file_id(cursor, file_name, create=True)
+            n_records = self._insert(cursor, file_id, packed, replace_items=True)
+
+        self._logger.debug(f"{self!r}: {n_records} records replaced in {file_name}")
+
+    @classmethod
+    def _insert(
+        cls,
+        cursor: sqlite3.Cursor,
+        file_id: int,
+        packed: PackedItemDB,
+        replace_items: bool = False,
+    ) -> int:
+        """batched inserts of items (unless they're there) and records of
+        `packed`, returns number of records inserted.
+        """
+        bonus_offsets = packed.bonus_offsets.tolist()
+        mod_offsets = packed.mod_offsets.tolist()
+        bonuses = packed.bonuses.astype("<i4")
+        mods = packed.mods.astype("<i4")
+        item_keys = [
+            (
+                item_id,
+                type_,
+                bonuses[bonus_offsets[i] : bonus_offsets[i + 1]].tobytes(),
+                mods[mod_offsets[i] : mod_offsets[i + 1]].tobytes(),
+            )
+            for i, (type_, item_id) in enumerate(
+                zip(packed.item_types.tolist(), packed.item_ids.tolist())
+            )
+        ]
+        cursor.executemany(
+            "INSERT OR IGNORE INTO items (file, item_id, type, bonuses, mods) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((file_id, *key) for key in item_keys),
+        )
+        ids = {
+            tuple(row[1:]): row[0]
+            for row in cursor.execute(
+                "SELECT id, item_id, type, bonuses, mods FROM items WHERE file = ?",
+                (file_id,),
+            )
+        }
+        item_db_ids = [ids[key] for key in item_keys]
+        if replace_items:
+            cursor.executemany(
+                "DELETE FROM records WHERE item = ?", ((id_,) for id_ in item_db_ids)
+            )
+
+        items = np.repeat(
+            np.array(item_db_ids, dtype=np.int64),
+            np.diff(packed.record_offsets.astype(np.int64)),
+        )
+        cursor.executemany(
+            "INSERT INTO records "
+            "(item, timestamp, market_value, num_auctions, min_buyout) "
+            "VALUES (?, ?, ?, ?, ?)",
+            zip(
+                items.tolist(),
+                packed.timestamps.tolist(),
+                packed.market_values.tolist(),
+                packed.num_auctions.tolist(),
+                packed.min_buyouts.tolist(),
+            ),
+        )
+        return len(items)
+
+    def remove_expired(self, file_name: str, ts_expires: int) -> int:
+        """deletes records of file `file_name` older than `ts_expires` (by the
+        (item, timestamp) index), and items left without records, returns number
+        of records deleted.
+        """
+        with self.transaction() as cursor:
+            file_id = self._get_file_id(cursor, file_name)
+            if file_id is None:
+                return 0
+
+            n_records = cursor.execute(
+                "DELETE FROM records WHERE timestamp < ? "
+                "AND item IN (SELECT id FROM items WHERE file = ?)",
+                (ts_expires, file_id),
+            ).rowcount
+            if n_records:
+                cursor.execute(
+                    "DELETE FROM items WHERE file = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM records WHERE records.item = items.id)",
+                    (file_id,),
+                )
+
+        return n_records
+
+    def read(
+        self,
+        file_name: str,
+        item_id: Optional[int] = None,
+        ts_from: Optional[int] = None,
+        ts_between: Optional[Tuple[int, int]] = None,
+    ) -> PackedItemDB:
+        """items (with records) of file `file_name`, in the order they were
+        written, records of an item by timestamp.
+
+        only items of `item_id` (by the item index), with only their records
+        since `ts_from` (by the record index) if given. only items that have
+        records in `[ts_between[0], ts_between[1])` if given, all records of
+        theirs.
+        """
+        cursor = self.connection.cursor()
+        file_id = self._get_file_id(cursor, file_name)
+        where = "items.file = ?"
+        params = [file_id]
+        if item_id is not None:
+            where += " AND items.item_id = ?"
+            params.append(item_id)
+        if ts_between is not None:
+            where += (
+                " AND EXISTS (SELECT 1 FROM records WHERE records.item = items.id "
+                "AND records.timestamp >= ? AND records.timestamp < ?)"
+            )
+            params.extend(ts_between)
+
+        items = cursor.execute(
+            "SELECT id, item_id, type, bonuses, mods FROM items "
+            f"WHERE {where} ORDER BY id",
+            params,
+        ).fetchall()
+        records = cursor.execute(
+            "SELECT records.item, records.timestamp, records.market_value, "
+            "records.num_auctions, records.min_buyout "
+            "FROM records JOIN items ON records.item = items.id "
+            f"WHERE {where}{'' if ts_from is None else ' AND records.timestamp >= ?'} "
+            "ORDER BY records.item, records.timestamp, records.rowid",
+            params if ts_from is None else [*params, ts_from],
+        ).fetchall()
+        columns = np.array(records, dtype=np.int64).reshape(-1, 5).T
+        # items without records (since `ts_from`) are kept, as in files
+        item_db_ids = np.array([row[0] for row in items], dtype=np.int64)
+        record_offsets = np.searchsorted(
+            columns[0], np.append(item_db_ids, np.iinfo(np.int64).max)
+        )
+        item_types = []
+        item_ids = []
+        bonuses: List[np.ndarray] = []
+        mods: List[np.ndarray] = []
+        for _, item_id_, type_, item_bonuses, item_mods in items:
+            item_types.append(type_)
+            item_ids.append(item_id_)
+            bonuses.append(np.frombuffer(item_bonuses, "<i4"))
+            mods.append(np.frombuffer(item_mods, "<i4"))
+
+        return PackedItemDB(
+            item_types=np.array(item_types, dtype=np.uint8),
+            item_ids=np.array(item_ids, dtype=np.int32),
+            bonus_offsets=self._get_offsets([len(b) for b in bonuses]),
+            bonuses=self._concat(bonuses),
+            mod_offsets=self._get_offsets([len(m) for m in mods]),
+            mods=self._concat(mods),
+            record_offsets=record_offsets.astype(np.uint32),
+            timestamps=columns[1].astype(np.int32),
+            market_values=columns[2],
+            num_auctions=columns[3].astype(np.int32),
+            min_buyouts=columns[4],
+        )
+
+    @classmethod
+    def _get_offsets(cls, lengths) -> np.ndarray:
+        return np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))).astype(
+            np.uint32
+        )
+
+    @classmethod
+    def _concat(cls, arrays: List[np.ndarray]) -> np.ndarray:
+        if not arrays:
+            return np.array([], dtype=np.int32)
+
+        return np.concatenate(arrays).astype(np.int32)
+
+    def read_meta(self, name: str) -> Optional[str]:
+        row = (
+            self.connection.cursor()
+            .execute("SELECT data FROM meta WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return row and row[0]
+
+    def write_meta(self, name: str, data: str) -> None:
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO meta (name, data) VALUES (?, ?)", (name, data)
+            )
+
+    def remove_meta(self, name: str) -> None:
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM meta WHERE name = ?", (name,))
+
+    def touch_meta(self, name: str) -> None:
+        """meta file `name` exists (with empty data) if it didn't"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO meta (name, data) VALUES (?, '')", (name,)
+            )
+
+    def names(self) -> List[str]:
+        """names of db files (and meta files) in the database"""
+        cursor = self.connection.cursor()
+        return [
+            *(row[0] for row in cursor.execute("SELECT name FROM files")),
+            *(row[0] for row in cursor.execute("SELECT name FROM meta")),
+        ]
+
+
+class _OnCloseWriter:
+    """buffers what's written, passed to `on_close` on close, discarded if the
+    `with` block raised.
+    """
+
+    def __init__(self, on_close: Callable) -> None:
+        super().__init__()
+        self._on_close = on_close
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is not None:
+            super().close()
+
+        self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        data = self.getvalue()
+        super().close()
+        self._on_close(data)
+
+
+class _BytesWriter(_OnCloseWriter, io.BytesIO):
+    pass
+
+
+class _TextWriter(_OnCloseWriter, io.StringIO):
+    pass
+
+
+class SqliteDBFile(BinaryFile):
+    """db file `file_name` as rows of `db`, which reads as (uncompressed)
+    packed data, whatever its extension. written data of either format,
+    compressed or not (e.g. forked from released files), is stored as rows.
+
+    records are also read (`from_file`, `query_file`) and updated (see
+    `Updater.update_rows`) as rows, without going through the file format.
+    """
+
+    def __init__(self, file_name: str, db: SqliteDB) -> None:
+        super().__init__(f"{db.file_path}:{file_name}")
+        self.file_name = file_name
+        self.db = db
+
+    def exists(self):
+        return self.db.exists(self.file_name)
+
+    def remove(self):
+        self.db.remove(self.file_name)
+
+    def touch(self):
+        self.db.touch(self.file_name)
+
+    def open(self, mode="rb"):
+        if "r" in mode:
+            return io.BytesIO(self.db.read(self.file_name).to_bytes())
+
+        return _BytesWriter(lambda data: self._write(data, replace="a" not in mode))
+
+    def read_records(
+        self,
+        item_id: Optional[int] = None,
+        ts_from: Optional[int] = None,
+        ts_between: Optional[Tuple[int, int]] = None,
+        item_strings: Optional[ItemStringTable] = None,
+    ) -> MapItemStringMarketValueRecords:
+        """see `SqliteDB.read`"""
+        return MapItemStringMarketValueRecords.from_packed(
+            self.db.read(
+                self.file_name, item_id=item_id, ts_from=ts_from, ts_between=ts_between
+            ),
+            item_strings,
+        )
+
+    def replace_records(self, records: MapItemStringMarketValueRecords) -> None:
+        """records of items in `records` are replaced, see `SqliteDB.replace_items`"""
+        self.db.replace_items(self.file_name, records.to_packed())
+
+    def remove_expired(self, ts_expires: int) -> int:
+        """see `SqliteDB.remove_expired`"""
+        return self.db.remove_expired(self.file_name, ts_expires)
+
+    def _write(self, data: bytes, replace: bool) -> None:
+        codec = detect_codec(data)
+        if codec is not None:
+            data = codec().decompress(data)
+
+        if PackedItemDB.is_packed(data) and PackedItemDB.get_nbytes(data) == len(data):
+            packed = PackedItemDB.from_buffer(data)
+        else:
+            packed = MapItemStringMarketValueRecords.from_bytes(data).to_packed()
+
+        self.db.write(self.file_name, packed, replace=replace)
+
+
+class SqliteMetaFile(TextFile):
+    """meta file `file_name` as a row of `db`"""
+
+    def __init__(self, file_name: str, db: SqliteDB) -> None:
+        super().__init__(f"{db.file_path}:{file_name}")
+        self.file_name = file_name
+        self.db = db
+
+    def exists(self):
+        return self.db.read_meta(self.file_name) is not None
+
+    def remove(self):
+        self.db.remove_meta(self.file_name)
+
+    def touch(self):
+        self.db.touch_meta(self.file_name)
+
+    def open(self, mode="r", **kwargs):
+        if "r" in mode:
+            data = self.db.read_meta(self.file_name)
+            if data is None:
+                raise FileNotFoundError(self.file_name)
+
+            if "b" in mode:
+                return io.BytesIO(data.encode("utf-8"))
+
+            return io.StringIO(data)
+
+        if "b" in mode:
+            return _BytesWriter(
+                lambda data: self.db.write_meta(self.file_name, data.decode("utf-8"))
+            )
+
+        return _TextWriter(lambda data: self.db.write_meta(self.file_name, data))
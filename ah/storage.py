@@ -1,9 +1,289 @@
+import io
 import os
-from gzip import GzipFile
+import gzip
+import lzma
+import zlib
+import struct
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, ClassVar, Dict, Optional, Type
 
 from ah.utils import ensure_path, remove_file
 
+# optional codecs
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+__all__ = (
+    "BaseFile",
+    "TextFile",
+    "BinaryFile",
+    "Codec",
+    "CODECS",
+    "get_codec",
+    "detect_codec",
+    "decompress",
+)
+
+
+def _decompress_frames(data: bytes, decompressobj: Callable) -> bytes:
+    """decompress concatenated frames (or streams) one after another"""
+    chunks = []
+    while data:
+        obj = decompressobj()
+        chunks.append(obj.decompress(data))
+        if not obj.eof:
+            raise ValueError("compressed data ended early")
+
+        data = obj.unused_data
+
+    return b"".join(chunks)
+
+
+class Codec:
+    """compression of `BinaryFile`s, compressed data starts with `MAGIC`, so
+    readers tell codecs apart by the first bytes of a file.
+
+    data compressed in several goes (e.g. appended segments) is a series of
+    members (frames, streams), `decompress` takes all of them.
+
+    `threads` > 1 compresses large data in parallel, for `THREADED` codecs.
+    """
+
+    NAME: ClassVar[str]
+    MAGIC: ClassVar[bytes]
+    DEFAULT_LEVEL: ClassVar[int]
+    # module needed, for optional codecs
+    MODULE: ClassVar[Optional[str]] = None
+    THREADED: ClassVar[bool] = False
+
+    def __init__(self, level: Optional[int] = None, threads: int = 1) -> None:
+        self.level = self.DEFAULT_LEVEL if level is None else level
+        self.threads = max(1, threads)
+
+    def __repr__(self) -> str:
+        cls_name = self.__class__.__name__
+        return f"{cls_name}(level={self.level!r}, threads={self.threads!r})"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    @classmethod
+    def match(cls, data: bytes) -> bool:
+        return data.startswith(cls.MAGIC)
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCodec(Codec):
+    """with `threads`, data is deflated in blocks by a thread pool (zlib
+    releases the GIL), pigz style: every block is primed with the end of the
+    block before, and all but the last are sync flushed, so that the blocks
+    concatenate into one ordinary gzip member.
+    """
+
+    NAME = "gzip"
+    MAGIC = b"\x1f\x8b"
+    DEFAULT_LEVEL = 9
+    THREADED = True
+    BLOCK_SIZE: ClassVar[int] = 1 << 20
+    # deflate window, the preset dictionary of every block
+    WINDOW_SIZE: ClassVar[int] = 1 << 15
+
+    def compress(self, data: bytes) -> bytes:
+        if self.threads > 1 and len(data) > self.BLOCK_SIZE:
+            return self._compress_blocks(data)
+
+        return gzip.compress(data, compresslevel=self.level)
+
+    def _deflate_block(self, data: memoryview, start: int, end: int) -> bytes:
+        kwargs = {}
+        if start:
+            kwargs["zdict"] = data[max(0, start - self.WINDOW_SIZE) : start]
+
+        obj = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS, **kwargs)
+        mode = zlib.Z_FINISH if end == len(data) else zlib.Z_SYNC_FLUSH
+        return obj.compress(data[start:end]) + obj.flush(mode)
+
+    def _compress_blocks(self, data: bytes) -> bytes:
+        view = memoryview(data)
+        starts = range(0, len(data), self.BLOCK_SIZE)
+        with ThreadPoolExecutor(self.threads) as executor:
+            blocks = list(
+                executor.map(
+                    lambda start: self._deflate_block(
+                        view, start, min(start + self.BLOCK_SIZE, len(data))
+                    ),
+                    starts,
+                )
+            )
+
+        if self.level == 9:
+            xfl = 2
+        elif self.level == 1:
+            xfl = 4
+        else:
+            xfl = 0
+        # no mtime, unknown OS
+        header = struct.pack("<2sBBIBB", self.MAGIC, 8, 0, 0, xfl, 255)
+        trailer = struct.pack("<II", zlib.crc32(data), len(data) & 0xFFFFFFFF)
+        return b"".join([header, *blocks, trailer])
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZlibCodec(Codec):
+    NAME = "zlib"
+    # deflate with a 32K window, the second byte depends on the level
+    MAGIC = b"\x78"
+    DEFAULT_LEVEL = 6
+
+    @classmethod
+    def match(cls, data: bytes) -> bool:
+        # header checksum, a multiple of 31
+        return (
+            len(data) >= 2
+            and data.startswith(cls.MAGIC)
+            and int.from_bytes(data[:2], "big") % 31 == 0
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return _decompress_frames(data, zlib.decompressobj)
+
+
+class LzmaCodec(Codec):
+    NAME = "lzma"
+    MAGIC = b"\xfd7zXZ\x00"
+    DEFAULT_LEVEL = 6
+
+    def compress(self, data: bytes) -> bytes:
+        return lzma.compress(data, preset=self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lzma.decompress(data)
+
+
+class ZstdCodec(Codec):
+    NAME = "zstd"
+    MAGIC = b"\x28\xb5\x2f\xfd"
+    DEFAULT_LEVEL = 3
+    MODULE = "zstandard"
+    THREADED = True
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return zstandard is not None
+
+    def compress(self, data: bytes) -> bytes:
+        threads = self.threads if self.threads > 1 else 0
+        return zstandard.ZstdCompressor(level=self.level, threads=threads).compress(
+            data
+        )
+
+    def decompress(self, data: bytes) -> bytes:
+        return _decompress_frames(
+            data, lambda: zstandard.ZstdDecompressor().decompressobj()
+        )
+
+
+class Lz4Codec(Codec):
+    NAME = "lz4"
+    MAGIC = b"\x04\x22\x4d\x18"
+    DEFAULT_LEVEL = 0
+    MODULE = "lz4"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return lz4_frame is not None
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data, compression_level=self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return _decompress_frames(data, lz4_frame.LZ4FrameDecompressor)
+
+
+CODECS: Dict[str, Type[Codec]] = {
+    codec.NAME: codec
+    for codec in (GzipCodec, ZlibCodec, LzmaCodec, ZstdCodec, Lz4Codec)
+}
+
+
+def get_codec(name: str, level: Optional[int] = None, threads: int = 1) -> Codec:
+    """raises `ValueError` if `name` is unknown or its module is not installed"""
+    if name not in CODECS:
+        raise ValueError(f"unknown codec: {name!r}")
+
+    codec = CODECS[name]
+    if not codec.is_available():
+        raise ValueError(f"codec {name!r} requires {codec.MODULE!r} installed")
+
+    return codec(level, threads=threads)
+
+
+def detect_codec(data: bytes) -> Optional[Type[Codec]]:
+    """codec of compressed `data`, by its first bytes"""
+    for codec in CODECS.values():
+        if codec.match(data):
+            return codec
+
+    return None
+
+
+def decompress(data: bytes) -> bytes:
+    """decompress `data` of any codec, raises `ValueError` if none matches"""
+    if not data:
+        return data
+
+    codec = detect_codec(data)
+    if codec is None:
+        raise ValueError("unknown compression")
+
+    return codec().decompress(data)
+
+
+class _CompressedWriter(io.BytesIO):
+    """buffers what's written, compressed into the file on close (a member of
+    its own if appending), discarded if the `with` block raised.
+    """
+
+    def __init__(self, file_path: str, mode: str, codec: Codec) -> None:
+        super().__init__()
+        self._file_path = file_path
+        self._mode = mode
+        self._codec = codec
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is not None:
+            super().close()
+
+        self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        data = self.getvalue()
+        super().close()
+        with open(self._file_path, self._mode) as f:
+            f.write(self._codec.compress(data))
+
 
 class BaseFile:
     def __init__(self, file_path: str) -> None:
@@ -41,17 +321,50 @@ class TextFile(BaseFile):
 
 
 class BinaryFile(BaseFile):
-    def __init__(self, file_path: str, use_compression=False) -> None:
+    def __init__(
+        self,
+        file_path: str,
+        use_compression=False,
+        compresslevel: Optional[int] = None,
+        codec: str = GzipCodec.NAME,
+        threads: int = 1,
+    ) -> None:
+        """`codec` (see `CODECS`), its `compresslevel` (`None` for the codec's
+        default) and `threads` are for writing, compressed files are read with
+        whichever codec they were written with.
+        """
         super().__init__(file_path)
         self.use_compression = use_compression
+        self.compresslevel = compresslevel
+        self.codec = codec
+        self.threads = threads
 
     # def _get_path(self, name, use_compression: bool = False):
     #     file_name = f"{name}.bin.gz" if use_compression else f"{name}.bin"
     #     return os.path.join(self.base_path, file_name)
 
-    def open(self, mode="rb"):
-        if self.use_compression:
-            return GzipFile(self.file_path, mode)
+    def _read_head(self, n: int = 8) -> bytes:
+        with open(self.file_path, "rb") as f:
+            return f.read(n)
 
-        else:
+    def open(self, mode="rb"):
+        if not self.use_compression:
             return open(self.file_path, mode)
+
+        if "r" in mode:
+            with open(self.file_path, "rb") as f:
+                data = f.read()
+
+            try:
+                return io.BytesIO(decompress(data))
+            except ValueError as e:
+                raise ValueError(f"{e!s}: {self!r}") from e
+
+        codec = get_codec(self.codec, self.compresslevel, threads=self.threads)
+        if "a" in mode and self.exists():
+            # members of one file share the codec
+            codec_ = detect_codec(self._read_head())
+            if codec_ is not None and codec_.NAME != codec.NAME:
+                codec = codec_(threads=self.threads)
+
+        return _CompressedWriter(self.file_path, mode, codec)
@@ -1,4 +1,4 @@
-from typing import List, Set
+from typing import Dict, List, Optional, Set, Tuple
 import argparse
 import logging
 import sys
@@ -8,6 +8,8 @@ import numpy as np
 
 from ah.models import (
     MapItemStringMarketValueRecords,
+    ItemString,
+    ItemStringTable,
     RegionEnum,
     Namespace,
     NameSpaceCategoriesEnum,
@@ -156,6 +158,23 @@ class TSMExporter:
             cls.baseN(num // b, b, numerals).lstrip(numerals[0]) + numerals[num % b]
         )
 
+    @classmethod
+    def get_market_values(
+        cls,
+        market_values: Dict[ItemString, Tuple[int, int]],
+        item_string: ItemString,
+        records: MarketValueRecords,
+        ts_now: int,
+        ts_compressed: int,
+    ) -> Tuple[int, int]:
+        """historical and weighted market value of `item_string`, computed once"""
+        if item_string not in market_values:
+            market_values[item_string] = records.get_market_values(
+                ts_now, ts_compressed=ts_compressed
+            )
+
+        return market_values[item_string]
+
     @classmethod
     def export_append_data(
         cls,
@@ -167,12 +186,27 @@ class TSMExporter:
         ts_update_begin: int,
         ts_update_end: int,
         should_reset_tsc: bool = False,
+        ts_recent: int = None,
+        market_values: Optional[Dict[ItemString, Tuple[int, int]]] = None,
     ) -> None:
+        """`ts_recent`: records since then are considered as the latest scan,
+        default to `ts_update_begin`. records are stamped with the snapshot's
+        "Last-Modified" (see `Meta.get_last_modified`), which could be earlier
+        than `ts_update_begin`, or the snapshot might not get updated at all if
+        not modified.
+
+        `market_values`: pass the same dict to exports of the same
+        `map_records`, historical and weighted market values of an item are
+        then computed together once (see `MarketValueRecords.get_market_values`)
+        and kept there, instead of averaging its records by day for each.
+        """
         cls._logger.info(f"Exporting {type_} for {region_or_realm}...")
         if should_reset_tsc:
             ts_compressed = 0
         else:
             ts_compressed = MarketValueRecords.get_compress_end_ts(ts_update_begin)
+        if ts_recent is None:
+            ts_recent = ts_update_begin
         items_data = []
         for item_string, records in map_records.items():
             # tsm can handle:
@@ -183,27 +217,45 @@ class TSMExporter:
             is_skip_item = True
             for field in fields:
                 if field == "minBuyout":
-                    value = records.get_recent_min_buyout(ts_update_begin)
+                    value = records.get_recent_min_buyout(ts_recent)
                     if value:
                         is_skip_item = False
                 elif field == "numAuctions":
-                    value = records.get_recent_num_auctions(ts_update_begin)
+                    value = records.get_recent_num_auctions(ts_recent)
                     if value:
                         is_skip_item = False
                 elif field == "marketValueRecent":
-                    value = records.get_recent_market_value(ts_update_begin)
+                    value = records.get_recent_market_value(ts_recent)
                     if value:
                         is_skip_item = False
                 elif field in ["historical", "regionHistorical"]:
-                    value = records.get_historical_market_value(
-                        ts_update_end, ts_compressed=ts_compressed
-                    )
+                    if market_values is None:
+                        value = records.get_historical_market_value(
+                            ts_update_end, ts_compressed=ts_compressed
+                        )
+                    else:
+                        value = cls.get_market_values(
+                            market_values,
+                            item_string,
+                            records,
+                            ts_update_end,
+                            ts_compressed,
+                        )[0]
                     if value:
                         is_skip_item = False
                 elif field in ["marketValue", "regionMarketValue"]:
-                    value = records.get_weighted_market_value(
-                        ts_update_end, ts_compressed=ts_compressed
-                    )
+                    if market_values is None:
+                        value = records.get_weighted_market_value(
+                            ts_update_end, ts_compressed=ts_compressed
+                        )
+                    else:
+                        value = cls.get_market_values(
+                            market_values,
+                            item_string,
+                            records,
+                            ts_update_end,
+                            ts_compressed,
+                        )[1]
                     if value:
                         is_skip_item = False
                 elif field == "itemString":
@@ -271,6 +323,9 @@ class TSMExporter:
         for cate in RealmCategoryEnum:
             cate_should_export[cate] = False
 
+        # item strings shared by all files of the region, see `ItemStringTable`
+        item_strings = ItemStringTable()
+
         # tracks auctions + commodities (if applicable) for all realms under this category
         cate_data = dict()
         for cate in RealmCategoryEnum:
@@ -281,7 +336,7 @@ class TSMExporter:
             if self.forker:
                 commodity_file.remove()
             commodity_data = MapItemStringMarketValueRecords.from_file(
-                commodity_file, forker=self.forker
+                commodity_file, forker=self.forker, item_strings=item_strings
             )
         else:
             commodity_file = None
@@ -291,6 +346,7 @@ class TSMExporter:
             # only retail has commodities, it only has `RealmCategoryEnum.DEFAULT`
             cate_data[RealmCategoryEnum.DEFAULT].extend(commodity_data)
 
+            market_values = {}
             for commodity_export in self.REGION_COMMODITIES_EXPORTS:
                 self.export_append_data(
                     self.export_file,
@@ -300,6 +356,8 @@ class TSMExporter:
                     namespace.region.upper(),
                     ts_update_start,
                     ts_update_end,
+                    ts_recent=meta.get_last_modified(),
+                    market_values=market_values,
                 )
 
         if namespace.game_version == GameVersionEnum.RETAIL:
@@ -322,7 +380,7 @@ class TSMExporter:
                 if self.forker:
                     db_file.remove()
                 auction_data = MapItemStringMarketValueRecords.from_file(
-                    db_file, forker=self.forker
+                    db_file, forker=self.forker, item_strings=item_strings
                 )
                 if not auction_data:
                     self._logger.warning(f"no data in {db_file}.")
@@ -335,6 +393,7 @@ class TSMExporter:
                 else:
                     cate_should_export[category] = True
 
+                market_values = {}
                 for realm in sub_export_realms:
                     if faction is None:
                         tsm_realm = realm
@@ -350,6 +409,8 @@ class TSMExporter:
                             tsm_realm,
                             ts_update_start,
                             ts_update_end,
+                            ts_recent=meta.get_last_modified(crid, faction),
+                            market_values=market_values,
                         )
 
         for cate, data in cate_data.items():
@@ -373,8 +434,7 @@ class TSMExporter:
                 # retail = None
                 tsm_region = region
 
-            # need to sort because it's records are from multiple realms
-            data.sort()
+            market_values = {}
             for region_a_c_export in self.REGION_AUCTIONS_COMMODITIES_EXPORTS:
                 self.export_append_data(
                     self.export_file,
@@ -385,6 +445,7 @@ class TSMExporter:
                     ts_update_start,
                     ts_update_end,
                     should_reset_tsc=True,
+                    market_values=market_values,
                 )
 
         self.export_append_app_info(self.export_file, self.TSM_VERSION, ts_update_end)
@@ -407,6 +468,7 @@ def main(
     warcraft_base: str = None,
     export_region: RegionEnum = None,
     export_realms: Set[str] = None,
+    db_backend: str = config.DEFAULT_DB_BACKEND,
     # below are for testability
     cache: Cache = None,
     gh_api: GHAPI = None,
@@ -419,7 +481,7 @@ def main(
     else:
         forker = None
 
-    db_helper = DBHelper(db_path)
+    db_helper = DBHelper(db_path, backend=db_backend)
     export_path = TSMExporter.get_tsm_appdata_path(warcraft_base, game_version)
     namespace = Namespace(
         category=NameSpaceCategoriesEnum.DYNAMIC,
@@ -429,7 +491,10 @@ def main(
     export_file = TextFile(export_path)
     exporter = TSMExporter(db_helper, export_file, forker=forker)
     exporter.export_file.remove()
-    exporter.export_region(namespace, export_realms)
+    try:
+        exporter.export_region(namespace, export_realms)
+    finally:
+        db_helper.close()
 
 
 def parse_args(raw_args):
@@ -468,6 +533,13 @@ def parse_args(raw_args):
         default=default_game_version,
         help=f"Game version to export, default: {default_game_version!r}",
     )
+    parser.add_argument(
+        "--db_backend",
+        choices=DBHelper.BACKENDS,
+        default=config.DEFAULT_DB_BACKEND,
+        help="Where db files are kept, 'files' under '--db_path', or 'sqlite' for "
+        f"one SQLite database there. default: {config.DEFAULT_DB_BACKEND!r}",
+    )
     parser.add_argument(
         "--warcraft_base",
         type=str,
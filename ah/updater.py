@@ -1,16 +1,23 @@
+import os
 import sys
 import time
 import logging
 import argparse
 from logging import getLogger
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple, Union
+import threading
+import multiprocessing
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from requests.exceptions import HTTPError, RetryError
 
 from ah.api import BNAPI, GHAPI
 from ah.models import (
+    GenericAuctionsResponseInterface,
     AuctionsResponse,
     CommoditiesResponse,
+    DecodedAuctions,
     MapItemStringMarketValueRecord,
     RegionEnum,
     Namespace,
@@ -22,49 +29,110 @@ from ah.models import (
     Meta,
     MarketValueRecords,
 )
-from ah.storage import BinaryFile
+from ah.storage import BinaryFile, CODECS
 from ah.db import DBHelper, GithubFileForker
+from ah.sqlitedb import SqliteDBFile
 from ah import config
 from ah.cache import Cache
 from ah.sysinfo import SysInfo
+from ah.pipeline import Pipeline, Stage
 from ah.errors import CompressTsError, GetConnectedRealmsIndexError
 
 
+class _Sentinel:
+    pass
+
+
+# returned by `Updater.pull_response` if the auctions snapshot has not been
+# modified since the last update, the realm is skipped entirely in that case
+NOT_MODIFIED = _Sentinel()
+
+
 class Updater:
     RECORDS_EXPIRES_IN = config.MIN_RECORD_EXPIRES
+    PIPELINE_QUEUE_SIZE = config.DEFAULT_PIPELINE_QUEUE_SIZE
+    # "strict": validate responses with pydantic models, "fast": decode raw
+    # responses straight into columns, see `DecodedAuctions`
+    DECODERS = ("strict", "fast")
 
     def __init__(
         self,
         bn_api: BNAPI,
         db_helper: DBHelper,
         forker: GithubFileForker = None,
+        workers: int = 1,
+        pipeline: bool = False,
+        processes: int = 0,
+        stream_commodities: bool = False,
+        decoder: str = "strict",
+        segments: bool = False,
+        compact: bool = False,
     ) -> None:
+        """`segments`: increments are appended to db files rather than merged
+        into them, see `is_compaction_due`, `compact`: compact every db file
+        in this run regardless.
+        """
+        if decoder not in self.DECODERS:
+            raise ValueError(f"unknown decoder: {decoder!r}")
+
         self._logger = getLogger(self.__class__.__name__)
         self.bn_api = bn_api
         self.db_helper = db_helper
         self.forker = forker
+        self.workers = max(1, workers)
+        self.pipeline = pipeline
+        self.processes = processes
+        self.stream_commodities = stream_commodities
+        self.decoder = decoder
+        self.segments = segments
+        self.compact = compact
 
-    def pull_increment(
+    def pull_response(
         self,
         namespace: Namespace,
         connected_realm_id: int = None,
         faction: FactionEnum = None,
-    ) -> MapItemStringMarketValueRecord:
-        """pull lastest auction increment from api, if `connected_realm_id`
-        not given, then pull commodities (retail commodities are region-wide).
+        validate: bool = True,
+        if_modified_since: Optional[int] = None,
+        stream: bool = False,
+    ) -> Optional[Union[GenericAuctionsResponseInterface, Dict, _Sentinel]]:
+        """pull lastest auctions from api, if `connected_realm_id` not given,
+        then pull commodities (retail commodities are region-wide).
+
+        with `validate=False`, the raw (json) response is returned instead, to be
+        validated later by `build_increment`.
+
+        with `if_modified_since` (see `get_if_modified_since`), `NOT_MODIFIED` is
+        returned if no newer snapshot is available, see `stamp_response`.
+
+        with `stream`, commodities are returned raw, with auctions decoded as they
+        get consumed (by `build_increment`), see `BNAPI.stream_commodities`.
 
         NOTE: failed to fetch auctions for some connected realms,
               due to `auctions` field being `None` or a 404 status code.
 
-              we will return a falsy increment in case of `auctions` field being `None`,
-              or returning `None` when 404. together with warning log message.
+              we will return `None` in case of request failure, together with
+              warning log message.
 
         """
         if connected_realm_id:
             try:
-                resp = AuctionsResponse.from_api(
-                    self.bn_api, namespace, connected_realm_id, faction=faction
+                resp = AuctionsResponse.request_api(
+                    self.bn_api,
+                    namespace,
+                    connected_realm_id,
+                    faction=faction,
+                    if_modified_since=if_modified_since,
                 )
+                if not self.stamp_response(resp, if_modified_since):
+                    self._logger.info(
+                        f"Auctions not modified since {if_modified_since}: "
+                        f"{namespace!r} {connected_realm_id} {faction!s}"
+                    )
+                    return NOT_MODIFIED
+
+                if validate:
+                    resp = AuctionsResponse.model_validate(resp)
             except HTTPError as e:
                 self._logger.warning(
                     "Failed to request auctions for: "
@@ -72,9 +140,9 @@ class Updater:
                     f"Error message: {e!s}"
                 )
                 self._logger.debug("traceback:", exc_info=True)
-                return MapItemStringMarketValueRecord()
+                return None
 
-            if not resp.get_auctions():
+            if validate and not resp.get_auctions():
                 self._logger.warning(
                     "Requested auction was empty: "
                     f"{namespace!r} {connected_realm_id} {faction!s}",
@@ -82,7 +150,24 @@ class Updater:
 
         else:
             try:
-                resp = CommoditiesResponse.from_api(self.bn_api, namespace)
+                resp = CommoditiesResponse.request_api(
+                    self.bn_api,
+                    namespace,
+                    if_modified_since=if_modified_since,
+                    stream=stream,
+                )
+                if not self.stamp_response(resp, if_modified_since):
+                    self._logger.info(
+                        f"Commodities not modified since {if_modified_since}: "
+                        f"{namespace!r}"
+                    )
+                    return NOT_MODIFIED
+
+                if stream:
+                    return resp
+
+                if validate:
+                    resp = CommoditiesResponse.model_validate(resp)
             except (HTTPError, RetryError) as e:
                 """NOTE:
                 Dec 5, 2023: 
@@ -95,27 +180,104 @@ class Updater:
                     f"Error message: {e!s}"
                 )
                 self._logger.debug("traceback:", exc_info=True)
-                return MapItemStringMarketValueRecord()
+                return None
 
-            if not resp.get_auctions():
+            if validate and not resp.get_auctions():
                 self._logger.warning(
                     f"Requested commodities was empty: {namespace!r}",
                 )
 
-        increment = MapItemStringMarketValueRecord.from_response(
+        return resp
+
+    @classmethod
+    def stamp_response(
+        cls, resp: Optional[Dict], if_modified_since: Optional[int]
+    ) -> bool:
+        """returns `False` if `resp` is not newer than `if_modified_since`
+        (`resp` is `None` in case of a 304).
+
+        `timestamp` of `resp` is the snapshot's "Last-Modified" (see
+        `BNAPI.set_last_modified`), it's only trusted for conditional requests,
+        otherwise (e.g. the first update since meta has no `last_modified`) the
+        download time is used, to keep records in ascending order of timestamp.
+        """
+        if resp is None:
+            return False
+
+        if if_modified_since is None or "timestamp" not in resp:
+            resp["timestamp"] = int(time.time())
+            return True
+
+        return resp["timestamp"] > if_modified_since
+
+    @classmethod
+    def build_increment(
+        cls,
+        resp: Optional[Union[GenericAuctionsResponseInterface, Dict]],
+        namespace: Namespace,
+        is_commodities: bool = False,
+        fast: bool = False,
+    ) -> MapItemStringMarketValueRecord:
+        """a falsy increment is returned if `resp` is `None` (request failed),
+        raw responses (see `pull_response`) are validated here.
+
+        with `fast`, raw responses are decoded by `DecodedAuctions` instead,
+        invalid auctions are dropped (and counted) rather than failing the whole
+        response.
+        """
+        if resp is None:
+            return MapItemStringMarketValueRecord()
+
+        if isinstance(resp, dict) and isinstance(resp["auctions"], Iterator):
+            # streamed commodities
+            return MapItemStringMarketValueRecord.from_commodities(
+                resp["auctions"], resp["timestamp"]
+            )
+
+        if isinstance(resp, dict) and fast:
+            decoded = DecodedAuctions.from_raw(
+                resp, game_version=namespace.game_version, is_commodities=is_commodities
+            )
+            if decoded.n_rejected:
+                # reasons are logged by `DecodedAuctions.from_raw`
+                getLogger(cls.__name__).debug(
+                    f"{decoded.n_rejected} of {decoded.n_rejected + len(decoded)} "
+                    f"auctions rejected: {namespace!r}"
+                )
+
+            return MapItemStringMarketValueRecord.from_decoded(decoded)
+
+        if isinstance(resp, dict):
+            if is_commodities:
+                resp = CommoditiesResponse.model_validate(resp)
+            else:
+                resp = AuctionsResponse.model_validate(resp)
+
+        return MapItemStringMarketValueRecord.from_response(
             resp, namespace.game_version
         )
 
-        return increment
+    def pull_increment(
+        self,
+        namespace: Namespace,
+        connected_realm_id: int = None,
+        faction: FactionEnum = None,
+    ) -> MapItemStringMarketValueRecord:
+        """pull lastest auction increment from api, see `pull_response`."""
+        resp = self.pull_response(
+            namespace,
+            connected_realm_id=connected_realm_id,
+            faction=faction,
+        )
+        return self.build_increment(resp, namespace)
 
-    def save_increment(
+    def resolve_ts_compressed(
         self,
         file: BinaryFile,
-        increment: MapItemStringMarketValueRecord,
-        start_ts: int,
-        ts_compressed: int = 0,
-        is_tsc_local: bool = False,
-    ) -> MapItemStringMarketValueRecords:
+        ts_compressed: int,
+        is_tsc_local: bool,
+    ) -> int:
+        """must be called before `file` gets forked"""
         if file.exists() != is_tsc_local:
             # db file and db compress ts locality does not match
             # note in case of local mode + meta miss + data miss, the locality of
@@ -126,9 +288,23 @@ class Updater:
                 f"{is_tsc_local=!r}, "
                 f"{file!r}.exists()={file.exists()!r}"
             )
-            ts_compressed = 0
+            return 0
+
+        return ts_compressed
+
+    def merge_increment(
+        self,
+        file: BinaryFile,
+        records: MapItemStringMarketValueRecords,
+        increment: MapItemStringMarketValueRecord,
+        start_ts: int,
+        ts_compressed: int = 0,
+    ) -> Tuple[int, int, int]:
+        """add `increment` to `records`, then remove expired and compress
+        records in place.
 
-        records = MapItemStringMarketValueRecords.from_file(file, forker=self.forker)
+        returns `n_added_records`, `n_added_entries` and `n_removed_records`
+        """
         n_added_records, n_added_entries = records.update_increment(increment)
         n_removed_records = records.remove_expired(start_ts - self.RECORDS_EXPIRES_IN)
         try:
@@ -150,6 +326,110 @@ class Updater:
                 ts_compressed=0,
             )
 
+        return n_added_records, n_added_entries, n_removed_records
+
+    def is_compaction_due(
+        self, file: BinaryFile, start_ts: int, ts_compressed: int
+    ) -> bool:
+        """whether to load, merge (compress, remove expired) and rewrite `file`,
+        rather than appending the increment to it as a segment.
+
+        `ts_compressed` is the start of the UTC day of the last update (or 0),
+        so with `self.segments`, the first update of every UTC day compacts,
+        which is also when `compress` has new days to average.
+        """
+        if not self.segments or self.compact or not file.exists():
+            return True
+
+        return ts_compressed < MarketValueRecords.get_compress_end_ts(start_ts)
+
+    def append_increment(
+        self, file: BinaryFile, increment: MapItemStringMarketValueRecord
+    ) -> int:
+        """append `increment` to `file` as a segment, returns `n_added_records`"""
+        segment = MapItemStringMarketValueRecords()
+        n_added_records, _ = segment.update_increment(increment)
+        if n_added_records:
+            segment.append_file(file)
+
+        return n_added_records
+
+    def update_rows(
+        self,
+        file: SqliteDBFile,
+        increment: MapItemStringMarketValueRecord,
+        start_ts: int,
+        ts_compressed: int = 0,
+    ) -> None:
+        """`merge_increment` for db files kept as rows (see `ah.sqlitedb`),
+        without rewriting the file: rows of `increment` are inserted, expired
+        records deleted by timestamp, and only items with records in days to
+        compress (since `ts_compressed`, at most once a day) are read,
+        compressed and replaced.
+        """
+        n_added_records = self.append_increment(file, increment)
+        n_removed_records = file.remove_expired(start_ts - self.RECORDS_EXPIRES_IN)
+        ts_end = MarketValueRecords.get_compress_end_ts(start_ts)
+        records = MapItemStringMarketValueRecords()
+        if ts_compressed < ts_end:
+            records = file.read_records(ts_between=(ts_compressed, ts_end))
+            try:
+                n_removed_records += records.compress(
+                    start_ts,
+                    self.RECORDS_EXPIRES_IN,
+                    ts_compressed=ts_compressed,
+                )
+            except CompressTsError as e:
+                self._logger.warning(
+                    f"`ts_compress` {ts_compressed!s} incompatible with records: "
+                    f"{file!r}, setting `ts_compress` to 0. "
+                    f"Error message: {e!s}"
+                )
+                self._logger.debug("traceback:", exc_info=True)
+                records = file.read_records(ts_between=(0, ts_end))
+                n_removed_records += records.compress(
+                    start_ts,
+                    self.RECORDS_EXPIRES_IN,
+                    ts_compressed=0,
+                )
+
+        if records:
+            file.replace_records(records)
+
+        self._logger.info(
+            f"DB update: {file!r}, {n_added_records=} {n_removed_records=} "
+            f"n_compressed_entries={len(records)}"
+        )
+
+    def save_increment(
+        self,
+        file: BinaryFile,
+        increment: MapItemStringMarketValueRecord,
+        start_ts: int,
+        ts_compressed: int = 0,
+        is_tsc_local: bool = False,
+    ) -> Optional[MapItemStringMarketValueRecords]:
+        """merge `increment` into `file`, returns the updated records, or `None`
+        if `increment` was appended as a segment (see `is_compaction_due`) or
+        saved as rows (see `update_rows`).
+        """
+        ts_compressed = self.resolve_ts_compressed(file, ts_compressed, is_tsc_local)
+        if self.forker:
+            self.forker.ensure_file(file)
+
+        if isinstance(file, SqliteDBFile):
+            self.update_rows(file, increment, start_ts, ts_compressed=ts_compressed)
+            return None
+
+        if not self.is_compaction_due(file, start_ts, ts_compressed):
+            n_added_records = self.append_increment(file, increment)
+            self._logger.info(f"DB segment: {file!r}, {n_added_records=}")
+            return None
+
+        records = MapItemStringMarketValueRecords.from_file(file)
+        n_added_records, n_added_entries, n_removed_records = self.merge_increment(
+            file, records, increment, start_ts, ts_compressed=ts_compressed
+        )
         records.to_file(file)
         self._logger.info(
             f"DB update: {file!r}, {n_added_records=} "
@@ -157,48 +437,264 @@ class Updater:
         )
         return records
 
+    def update_realm_records(
+        self,
+        namespace: Namespace,
+        start_ts: int,
+        crid: Optional[int] = None,
+        faction: Optional[FactionEnum] = None,
+        ts_compressed: int = 0,
+        is_tsc_local: bool = False,
+        meta: Optional[Meta] = None,
+    ) -> Optional[MapItemStringMarketValueRecords]:
+        """pull and save the increment of one connected realm (and faction), if
+        `crid` not given, then commodities.
+
+        with `meta`, the request is conditional, `None` is returned if the
+        snapshot was not modified since last update (see `pull_response`).
+        """
+        file = self.get_realm_file(namespace, crid=crid, faction=faction)
+        resp = self.pull_response(
+            namespace,
+            connected_realm_id=crid,
+            faction=faction,
+            validate=self.decoder == "strict",
+            if_modified_since=self.get_if_modified_since(
+                file, meta, crid, faction, is_tsc_local
+            ),
+            stream=self.stream_commodities,
+        )
+        if resp is NOT_MODIFIED:
+            return None
+
+        records = self.save_increment(
+            file,
+            self.build_increment(
+                resp,
+                namespace,
+                is_commodities=crid is None,
+                fast=self.decoder == "fast",
+            ),
+            start_ts,
+            ts_compressed=ts_compressed,
+            is_tsc_local=is_tsc_local,
+        )
+        self.set_last_modified(meta, resp, crid, faction)
+        return records
+
+    @classmethod
+    def get_if_modified_since(
+        cls,
+        file: BinaryFile,
+        meta: Optional[Meta],
+        crid: Optional[int],
+        faction: Optional[FactionEnum],
+        is_tsc_local: bool,
+    ) -> Optional[int]:
+        """timestamp of the snapshot saved in `file`, if meta knows about it.
+
+        must be called before `file` gets forked, just like ts_compressed, meta
+        only describes `file` if both of them came from the same place.
+        """
+        if meta is None or file.exists() != is_tsc_local:
+            return None
+
+        return meta.get_last_modified(crid, faction)
+
+    @classmethod
+    def set_last_modified(
+        cls,
+        meta: Optional[Meta],
+        resp: Optional[Union[GenericAuctionsResponseInterface, Dict]],
+        crid: Optional[int],
+        faction: Optional[FactionEnum],
+    ) -> None:
+        """record the timestamp of the snapshot just saved, forget it in case of
+        request failure, so the next update does not skip the realm.
+        """
+        if meta is None:
+            return
+
+        if resp is None:
+            timestamp = None
+        elif isinstance(resp, dict):
+            timestamp = resp["timestamp"]
+        else:
+            timestamp = resp.get_timestamp()
+
+        meta.set_last_modified(timestamp, crid, faction)
+
+    def get_realm_file(
+        self,
+        namespace: Namespace,
+        crid: Optional[int] = None,
+        faction: Optional[FactionEnum] = None,
+    ) -> BinaryFile:
+        """db file of a connected realm (and faction), commodities if `crid` not
+        given.
+        """
+        if crid:
+            return self.db_helper.get_file(
+                namespace,
+                DBTypeEnum.AUCTIONS,
+                crid=crid,
+                faction=faction,
+            )
+        else:
+            return self.db_helper.get_file(namespace, DBTypeEnum.COMMODITIES)
+
+    @classmethod
+    def get_realm_tasks(
+        cls,
+        namespace: Namespace,
+        connected_realm_ids: Tuple[int],
+    ) -> List[Tuple[Optional[int], Optional[FactionEnum]]]:
+        """list of `(crid, faction)` to update under this region, commodities
+        (retail only) is listed last as `(None, None)`.
+        """
+        if namespace.game_version == GameVersionEnum.RETAIL:
+            factions = [None]
+        else:
+            factions = [FactionEnum.ALLIANCE, FactionEnum.HORDE]
+
+        tasks = [(crid, faction) for crid in connected_realm_ids for faction in factions]
+        if namespace.game_version == GameVersionEnum.RETAIL:
+            tasks.append((None, None))
+
+        return tasks
+
     def update_region_records(
         self,
         namespace: Namespace,
         connected_realm_ids: Tuple[int],
         ts_compressed: int = 0,
         is_tsc_local: bool = False,
+        meta: Optional[Meta] = None,
     ) -> Tuple[int, int]:
         """update auction / commodities records for every connected realm under
         this region
 
+        with `meta`, realms with unmodified snapshots are skipped, see
+        `update_realm_records`, and `meta` gets the timestamps of saved snapshots.
+
+        with `self.workers > 1`, realms are fetched and saved concurrently in a
+        thread pool, every realm (and faction) still owns its own db file, so
+        each file gets written exactly once.
+
+        with `self.pipeline`, see `update_region_records_pipeline`.
+
+        with `self.processes`, see `update_region_records_processes`.
+
         returns update start_ts and end_ts
         """
         start_ts = int(time.time())
-        if namespace.game_version == GameVersionEnum.RETAIL:
-            factions = [None]
-        else:
-            factions = [FactionEnum.ALLIANCE, FactionEnum.HORDE]
+        tasks = self.get_realm_tasks(namespace, connected_realm_ids)
+        kwargs = {
+            "ts_compressed": ts_compressed,
+            "is_tsc_local": is_tsc_local,
+            "meta": meta,
+        }
 
-        for crid in connected_realm_ids:
-            for faction in factions:
-                increment = self.pull_increment(
-                    namespace,
-                    connected_realm_id=crid,
-                    faction=faction,
-                )
-                file = self.db_helper.get_file(
-                    namespace,
-                    DBTypeEnum.AUCTIONS,
-                    crid=crid,
-                    faction=faction,
-                )
-                self.save_increment(
-                    file,
-                    increment,
-                    start_ts,
-                    ts_compressed=ts_compressed,
-                    is_tsc_local=is_tsc_local,
+        if self.processes:
+            self.update_region_records_processes(namespace, start_ts, tasks, **kwargs)
+
+        elif self.pipeline:
+            self.update_region_records_pipeline(namespace, start_ts, tasks, **kwargs)
+
+        elif self.workers == 1:
+            for crid, faction in tasks:
+                self.update_realm_records(
+                    namespace, start_ts, crid=crid, faction=faction, **kwargs
                 )
 
-        if namespace.game_version == GameVersionEnum.RETAIL:
-            increment = self.pull_increment(namespace)
-            file = self.db_helper.get_file(namespace, DBTypeEnum.COMMODITIES)
+        else:
+            self._logger.info(
+                f"Updating {len(tasks)} realms of {namespace!r} "
+                f"with {self.workers} workers"
+            )
+            executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="updater",
+            )
+            try:
+                futures = [
+                    executor.submit(
+                        self.update_realm_records,
+                        namespace,
+                        start_ts,
+                        crid=crid,
+                        faction=faction,
+                        **kwargs,
+                    )
+                    for crid, faction in tasks
+                ]
+                for future in futures:
+                    future.result()
+
+            except BaseException:
+                # don't wait for the rest of the realms in case of failure
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+            else:
+                executor.shutdown(wait=True)
+
+        # just in case we're in the same ts as the increment, which cause
+        # `MarketValueRecords.average_by_day` to ignore the increment record
+        # because the ts passed in is the same as the increment's ts
+        end_ts = int(time.time()) + 1
+        return start_ts, end_ts
+
+    def update_region_records_pipeline(
+        self,
+        namespace: Namespace,
+        start_ts: int,
+        tasks: List[Tuple[Optional[int], Optional[FactionEnum]]],
+        ts_compressed: int = 0,
+        is_tsc_local: bool = False,
+        meta: Optional[Meta] = None,
+    ) -> None:
+        """update realms in three stages connected by bounded queues:
+        download (network + response parsing, `self.workers` threads),
+        build (`from_response`) and persist (`save_increment`), so one realm's
+        building and writing overlaps with the download of the next ones.
+        """
+
+        def download(task):
+            crid, faction = task
+            file = self.get_realm_file(namespace, crid=crid, faction=faction)
+            # NOTE: streamed commodities downloads during "build"
+            resp = self.pull_response(
+                namespace,
+                connected_realm_id=crid,
+                faction=faction,
+                validate=self.decoder == "strict",
+                if_modified_since=self.get_if_modified_since(
+                    file, meta, crid, faction, is_tsc_local
+                ),
+                stream=self.stream_commodities,
+            )
+            return crid, faction, file, resp
+
+        def build(item):
+            crid, faction, file, resp = item
+            if resp is NOT_MODIFIED:
+                return item
+
+            increment = self.build_increment(
+                resp,
+                namespace,
+                is_commodities=crid is None,
+                fast=self.decoder == "fast",
+            )
+            return crid, faction, file, (resp, increment)
+
+        def persist(item):
+            crid, faction, file, built = item
+            if built is NOT_MODIFIED:
+                return crid, faction
+
+            resp, increment = built
             self.save_increment(
                 file,
                 increment,
@@ -206,12 +702,105 @@ class Updater:
                 ts_compressed=ts_compressed,
                 is_tsc_local=is_tsc_local,
             )
+            self.set_last_modified(meta, resp, crid, faction)
+            return crid, faction
 
-        # just in case we're in the same ts as the increment, which cause
-        # `MarketValueRecords.average_by_day` to ignore the increment record
-        # because the ts passed in is the same as the increment's ts
-        end_ts = int(time.time()) + 1
-        return start_ts, end_ts
+        pipeline = Pipeline(
+            [
+                Stage("download", download, workers=self.workers),
+                Stage("build", build),
+                Stage("persist", persist),
+            ],
+            maxsize=self.PIPELINE_QUEUE_SIZE,
+            name=f"Pipeline({namespace})",
+        )
+        pipeline.run(tasks)
+
+    def update_region_records_processes(
+        self,
+        namespace: Namespace,
+        start_ts: int,
+        tasks: List[Tuple[Optional[int], Optional[FactionEnum]]],
+        ts_compressed: int = 0,
+        is_tsc_local: bool = False,
+        meta: Optional[Meta] = None,
+    ) -> None:
+        """download raw responses with `self.workers` threads in this process,
+        the CPU bound "raw response -> updated db file" work of every realm is
+        done by a pool of `self.processes` processes, see `update_realm_file`.
+
+        db files are forked (if needed) here before being handed over.
+        """
+        # bounds the number of downloaded responses waiting for a process
+        slots = threading.BoundedSemaphore(self.processes * 2)
+
+        def submit(pool, task):
+            crid, faction = task
+            slots.acquire()
+            try:
+                file = self.get_realm_file(namespace, crid=crid, faction=faction)
+                resp = self.pull_response(
+                    namespace,
+                    connected_realm_id=crid,
+                    faction=faction,
+                    validate=False,
+                    if_modified_since=self.get_if_modified_since(
+                        file, meta, crid, faction, is_tsc_local
+                    ),
+                )
+                if resp is NOT_MODIFIED:
+                    slots.release()
+                    return None
+
+                tsc = self.resolve_ts_compressed(file, ts_compressed, is_tsc_local)
+                if self.forker:
+                    self.forker.ensure_file(file)
+
+                future = pool.submit(
+                    update_realm_file,
+                    namespace,
+                    resp,
+                    file.file_path,
+                    file.use_compression,
+                    start_ts,
+                    compresslevel=file.compresslevel,
+                    codec=file.codec,
+                    compress_threads=file.threads,
+                    is_commodities=crid is None,
+                    ts_compressed=tsc,
+                    fast=self.decoder == "fast",
+                    segments=self.segments,
+                    compact=self.compact,
+                )
+            except BaseException:
+                slots.release()
+                raise
+
+            future.add_done_callback(lambda _: slots.release())
+            return crid, faction, resp, future
+
+        # "spawn" for all platforms, forking with threads running is not safe
+        mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            self.processes,
+            mp_context=mp_context,
+            initializer=init_worker_logging,
+            initargs=(logging.getLogger().getEffectiveLevel(),),
+        ) as pool:
+            with ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="updater",
+            ) as executor:
+                futures = [executor.submit(submit, pool, task) for task in tasks]
+                submitted = [future.result() for future in futures]
+
+            for crid, faction, resp, future in filter(None, submitted):
+                result = future.result()
+                self.set_last_modified(meta, resp, crid, faction)
+                self._logger.info(
+                    "DB update: "
+                    + ", ".join(f"{k}={v!r}" for k, v in result.items())
+                )
 
     def update_region(self, namespace: Namespace, compress_all=False) -> None:
         sys_info = SysInfo()
@@ -235,7 +824,7 @@ class Updater:
 
         # try update connected realm info, if failed, use existing info
         try:
-            meta = Meta.from_api(self.bn_api, namespace)
+            meta_api = Meta.from_api(self.bn_api, namespace)
         except GetConnectedRealmsIndexError as e:
             self._logger.warning(
                 f"Failed to request connected realms index for: {namespace!r}, "
@@ -243,12 +832,16 @@ class Updater:
                 f"Error message: {e!s}"
             )
             self._logger.debug("traceback:", exc_info=True)
+        else:
+            meta_api.inherit_last_modified(meta)
+            meta = meta_api
 
         start_ts, end_ts = self.update_region_records(
             namespace,
             meta.get_connected_realm_ids(),
             ts_compressed=ts_compressed,
             is_tsc_local=is_tsc_local,
+            meta=meta,
         )
         meta.set_update_ts(start_ts, end_ts)
         sys_info.stop_monitor()
@@ -256,6 +849,86 @@ class Updater:
         meta.to_file(meta_file)
 
 
+def init_worker_logging(level: int) -> None:
+    """spawned processes start with logging unconfigured"""
+    logging.basicConfig(level=level)
+
+
+def update_realm_file(
+    namespace: Namespace,
+    resp: Optional[Dict],
+    file_path: str,
+    use_compression: bool,
+    start_ts: int,
+    is_commodities: bool = False,
+    ts_compressed: int = 0,
+    fast: bool = False,
+    compresslevel: Optional[int] = None,
+    segments: bool = False,
+    compact: bool = False,
+    codec: str = config.DEFAULT_DB_CODEC,
+    compress_threads: int = 1,
+) -> Dict:
+    """`ProcessPoolExecutor` entry of `Updater.update_region_records_processes`:
+    raw response -> increment -> updated db file (or appended segment).
+
+    returns counts and timings (seconds) for the parent to log.
+    """
+    updater = Updater(None, None, segments=segments, compact=compact)
+    file = BinaryFile(
+        file_path,
+        use_compression=use_compression,
+        compresslevel=compresslevel,
+        codec=codec,
+        threads=compress_threads,
+    )
+    ts = time.perf_counter()
+    n_auctions = len(resp.get("auctions") or []) if resp else 0
+    increment = updater.build_increment(
+        resp, namespace, is_commodities=is_commodities, fast=fast
+    )
+    t_build = time.perf_counter() - ts
+
+    if not updater.is_compaction_due(file, start_ts, ts_compressed):
+        ts = time.perf_counter()
+        n_added_records = updater.append_increment(file, increment)
+        return {
+            "file": repr(file),
+            "pid": os.getpid(),
+            "n_auctions": n_auctions,
+            "n_added_records": n_added_records,
+            "t_build": round(t_build, 3),
+            "t_append": round(time.perf_counter() - ts, 3),
+        }
+
+    ts = time.perf_counter()
+    records = MapItemStringMarketValueRecords.from_file(file)
+    t_load = time.perf_counter() - ts
+
+    ts = time.perf_counter()
+    n_added_records, n_added_entries, n_removed_records = updater.merge_increment(
+        file, records, increment, start_ts, ts_compressed=ts_compressed
+    )
+    t_merge = time.perf_counter() - ts
+
+    ts = time.perf_counter()
+    records.to_file(file)
+    t_save = time.perf_counter() - ts
+
+    return {
+        "file": repr(file),
+        "pid": os.getpid(),
+        "n_auctions": n_auctions,
+        "n_added_records": n_added_records,
+        "n_added_entries": n_added_entries,
+        "n_removed_records": n_removed_records,
+        "t_build": round(t_build, 3),
+        "t_load": round(t_load, 3),
+        "t_merge": round(t_merge, 3),
+        "t_save": round(t_save, 3),
+    }
+
+
 def main(
     db_path: str = None,
     repo: str = None,
@@ -263,11 +936,29 @@ def main(
     game_version: GameVersionEnum = None,
     region: RegionEnum = None,
     compress_all: bool = False,
+    workers: int = 1,
+    pipeline: bool = False,
+    processes: int = 0,
+    stream_commodities: bool = False,
+    decoder: str = "strict",
+    packed: bool = False,
+    segments: bool = False,
+    compact: bool = False,
+    codec: str = config.DEFAULT_DB_CODEC,
+    compresslevel: Optional[int] = None,
+    compress_threads: int = config.DEFAULT_DB_COMPRESS_THREADS,
+    db_backend: str = config.DEFAULT_DB_BACKEND,
+    targets: List[Tuple[GameVersionEnum, RegionEnum]] = None,
+    target_workers: int = 1,
     # below are for testability
     cache: Cache = None,
     gh_api: GHAPI = None,
     bn_api: BNAPI = None,
 ):
+    """update every `(game_version, region)` in `targets` (or the single
+    `game_version`, `region` pair if not given) in this process, all targets share
+    the same `BNAPI` (session, access tokens), cache and db helper.
+    """
     cache = cache or Cache(config.DEFAULT_CACHE_PATH)
     cache.remove_expired()
 
@@ -282,15 +973,56 @@ def main(
         config.BN_CLIENT_SECRET,
         cache,
     )
-    namespace = Namespace(
-        category=NameSpaceCategoriesEnum.DYNAMIC,
-        game_version=game_version,
-        region=region,
+    db_helper = DBHelper(
+        db_path,
+        use_packed=packed,
+        codec=codec,
+        compresslevel=compresslevel,
+        compress_threads=compress_threads,
+        backend=db_backend,
     )
-    db_helper = DBHelper(db_path)
-    updater = Updater(bn_api, db_helper, forker=forker)
-    updater.update_region(namespace, compress_all=compress_all)
-    updater._logger.info(f"Updated {namespace!r}")
+    updater = Updater(
+        bn_api,
+        db_helper,
+        forker=forker,
+        workers=workers,
+        pipeline=pipeline,
+        processes=processes,
+        stream_commodities=stream_commodities,
+        decoder=decoder,
+        segments=segments,
+        compact=compact,
+    )
+    namespaces = [
+        Namespace(
+            category=NameSpaceCategoriesEnum.DYNAMIC,
+            game_version=game_version_,
+            region=region_,
+        )
+        for game_version_, region_ in targets or [(game_version, region)]
+    ]
+
+    def update(namespace: Namespace) -> bool:
+        # like separate runs, a failed target does not stop the others
+        try:
+            updater.update_region(namespace, compress_all=compress_all)
+        except Exception:
+            updater._logger.exception(f"Failed to update {namespace!r}")
+            return False
+
+        updater._logger.info(f"Updated {namespace!r}")
+        return True
+
+    if target_workers > 1 and len(namespaces) > 1:
+        with ThreadPoolExecutor(max_workers=target_workers) as executor:
+            results = list(executor.map(update, namespaces))
+    else:
+        results = [update(namespace) for namespace in namespaces]
+
+    db_helper.close()
+    failed = [ns for ns, ok in zip(namespaces, results) if not ok]
+    if failed:
+        raise RuntimeError(f"Failed to update: {', '.join(map(repr, failed))}")
 
 
 def parse_args(raw_args):
@@ -335,9 +1067,103 @@ def parse_args(raw_args):
         "incorrect, use this option to fix it.",
     )
     parser.add_argument(
-        "region",
-        choices={e.value for e in RegionEnum},
-        help="Region to export",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of connected realms to fetch and update concurrently, "
+        "default: 1 (one after another).",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap downloading, parsing and saving of different connected "
+        "realms in a staged pipeline, '--workers' sets the number of "
+        "concurrent downloads.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="Number of processes for parsing responses and updating db files, "
+        "network requests stay in the main process ('--workers' threads). "
+        "default: 0 (disabled).",
+    )
+    parser.add_argument(
+        "--stream_commodities",
+        action="store_true",
+        help="Decode (retail) commodities as they download instead of loading "
+        "the whole response, lowers peak memory usage. Responses are not cached "
+        "in this case. Not used with '--processes'.",
+    )
+    parser.add_argument(
+        "--decoder",
+        choices=Updater.DECODERS,
+        default="strict",
+        help="How auctions responses are parsed. 'strict' validates every auction "
+        "with pydantic models, 'fast' decodes responses straight into arrays, "
+        "invalid auctions are skipped and reported. default: 'strict'.",
+    )
+    parser.add_argument(
+        "--packed",
+        action="store_true",
+        help="Save new db files in the packed columnar format ('.pgz', '.pbin') "
+        "instead of protobuf, existing db files keep their format.",
+    )
+    parser.add_argument(
+        "--segments",
+        action="store_true",
+        help="Append increments to db files as segments instead of rewriting them, "
+        "segments are merged into the files by the first update of every UTC day.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="With '--segments', merge segments into every db file in this run.",
+    )
+    parser.add_argument(
+        "--codec",
+        choices=list(CODECS),
+        default=config.DEFAULT_DB_CODEC,
+        help="Compression of db files written, 'zstd' and 'lz4' require "
+        "'zstandard' and 'lz4' installed, readers detect the codec of each file. "
+        f"default: {config.DEFAULT_DB_CODEC!r}.",
+    )
+    parser.add_argument(
+        "--compresslevel",
+        type=int,
+        default=None,
+        help="Compression level of '--codec', default: the codec's default "
+        "(gzip: 9, or 6 for packed db files).",
+    )
+    parser.add_argument(
+        "--compress_threads",
+        type=int,
+        default=config.DEFAULT_DB_COMPRESS_THREADS,
+        help="Number of threads compressing each large db file, for 'gzip' "
+        "and 'zstd', output stays readable by any gzip / zstd reader. "
+        f"default: {config.DEFAULT_DB_COMPRESS_THREADS}.",
+    )
+    parser.add_argument(
+        "--db_backend",
+        choices=DBHelper.BACKENDS,
+        default=config.DEFAULT_DB_BACKEND,
+        help="Where db files are kept, 'files' under '--db_path', or 'sqlite' for "
+        "one SQLite database there, which can not be used with '--processes'. "
+        f"default: {config.DEFAULT_DB_BACKEND!r}.",
+    )
+    parser.add_argument(
+        "--target_workers",
+        type=int,
+        default=1,
+        help="Number of targets to update concurrently, default: 1.",
+    )
+    parser.add_argument(
+        "targets",
+        metavar="region",
+        nargs="+",
+        help="Region(s) to export, e.g. 'us', or 'game_version:region' pairs "
+        "(e.g. 'classic:us') to update multiple game versions in one run. "
+        "'--game_version' is used for regions without a game version.",
     )
     args = parser.parse_args(raw_args)
 
@@ -351,8 +1177,49 @@ def parse_args(raw_args):
             f"Invalid Github proxy server given by '--gh_proxy' option, "
             f"it should be a valid URL, not {args.gh_proxy!r}."
         )
+    if args.workers < 1:
+        raise ValueError(
+            f"Invalid number of workers given by '--workers' option, "
+            f"it should be a positive integer, not {args.workers!r}."
+        )
+    if args.processes < 0:
+        raise ValueError(
+            f"Invalid number of processes given by '--processes' option, "
+            f"it should be a non-negative integer, not {args.processes!r}."
+        )
+    if args.processes and args.pipeline:
+        raise ValueError("'--processes' and '--pipeline' can not be used together.")
+    if args.processes and args.db_backend == "sqlite":
+        raise ValueError(
+            "'--processes' and '--db_backend sqlite' can not be used together."
+        )
+    if args.target_workers < 1:
+        raise ValueError(
+            f"Invalid number of workers given by '--target_workers' option, "
+            f"it should be a positive integer, not {args.target_workers!r}."
+        )
     args.game_version = GameVersionEnum[args.game_version.upper()]
-    args.region = RegionEnum(args.region)
+    targets = []
+    for target in args.targets:
+        game_version, _, region = target.rpartition(":")
+        try:
+            targets.append(
+                (
+                    GameVersionEnum[game_version.upper()]
+                    if game_version
+                    else args.game_version,
+                    RegionEnum(region),
+                )
+            )
+        except (KeyError, ValueError):
+            raise ValueError(
+                f"Invalid target {target!r}, it should be a region "
+                f"({', '.join(e.value for e in RegionEnum)}) or "
+                "'game_version:region'."
+            )
+
+    # dedupe, keeps order
+    args.targets = list(dict.fromkeys(targets))
     return args
 
 
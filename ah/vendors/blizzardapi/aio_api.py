@@ -0,0 +1,243 @@
+"""aio_api.py file."""
+import json
+import base64
+import asyncio
+from email.utils import formatdate
+
+from requests.exceptions import ConnectionError, HTTPError, RetryError, Timeout
+
+from ah import config
+from .api import parse_last_modified
+
+# optional, only needed by the asyncio client
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse:
+    """A minimal response object, mimics the part of `requests.Response` we use.
+
+    Attributes:
+        url: A string url this response came from.
+        status_code: An integer HTTP status code.
+        reason: A string HTTP reason phrase.
+        headers: A case-insensitive dict of response headers.
+        content: Decoded (decompressed) response body in bytes.
+    """
+
+    def __init__(self, url, status_code, reason, headers, content):
+        """Init AsyncResponse."""
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Decode the response body as json."""
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise `HTTPError` in case of 4xx or 5xx status code."""
+        if 400 <= self.status_code < 600:
+            raise HTTPError(
+                f"{self.status_code} Error: {self.reason} for url: {self.url}",
+                response=self,
+            )
+
+
+class AsyncApi:
+    """Base asyncio API class, the coroutine counterpart of `Api`.
+
+    Attributes:
+        _client_id: A string client id supplied by Blizzard.
+        _client_secret: A string client secret supplied by Blizzard.
+        _access_tokens: A dict of access tokens that are used to access Blizzard's
+            API, keyed by OAuth url (china has its own OAuth server).
+        _api_url: A string url used to call the API endpoints.
+        _api_url_cn: A string url used to call the china API endpoints.
+        _oauth_url: A string url used to call the OAuth API endpoints.
+        _oauth_url_cn: A string url used to call the china OAuth API endpoints.
+        _max_connections: Max number of connections in use at the same time.
+        _session: An `aiohttp.ClientSession`, opened on first request (it binds
+            to the running event loop).
+        _retry_total: Number of retries on `_retry_status_forcelist` status codes.
+        _retry_backoff_factor: Backoff factor in seconds between retries.
+        _retry_status_forcelist: Status codes to retry on.
+    """
+
+    def __init__(self, client_id, client_secret, max_connections=None):
+        """Init AsyncApi, raises `ImportError` if `aiohttp` is not installed."""
+        if aiohttp is None:
+            raise ImportError("the asyncio client requires 'aiohttp' installed")
+
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._access_tokens = {}
+        self._token_lock = None
+
+        self._api_url = "https://{0}.api.blizzard.com{1}"
+        self._api_url_cn = "https://gateway.battlenet.com.cn{0}"
+        self._oauth_url = (config.BN_OAUTH_URL or "https://oauth.battle.net") + "{0}"
+        self._oauth_url_cn = (
+            config.BN_OAUTH_URL_CN or "https://oauth.battlenet.com.cn"
+        ) + "{0}"
+
+        self._max_connections = max_connections or config.BN_API_POOL_MAXSIZE
+        self._session = None
+        self._retry_total = 5
+        self._retry_backoff_factor = 1
+        self._retry_status_forcelist = (429, 502)
+
+    def _get_session(self):
+        if self._session is None:
+            # proxies are taken from the environment (`HTTPS_PROXY` etc.) like
+            # `requests` does, redirects are followed
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._max_connections, ssl=config.VERIFY_SSL
+                ),
+                timeout=aiohttp.ClientTimeout(total=config.BN_API_TIMEOUT),
+                trust_env=True,
+            )
+
+        return self._session
+
+    async def _send(self, method, url, query_params, headers=None):
+        """Send a request, returns an `AsyncResponse`, connection errors and
+        timeouts are raised as their `requests` counterparts.
+        """
+        try:
+            async with self._get_session().request(
+                method, url, params=query_params, headers=headers
+            ) as response:
+                # decompressed as it's read, compressed body isn't kept
+                content = await response.read()
+
+        except asyncio.TimeoutError as e:
+            raise Timeout(f"Timed out: {url}") from e
+
+        except aiohttp.ClientError as e:
+            raise ConnectionError(f"{e!s}: {url}") from e
+
+        return AsyncResponse(
+            str(response.url),
+            response.status,
+            response.reason,
+            response.headers,
+            content,
+        )
+
+    async def _request(self, method, url, query_params, headers=None):
+        """Send request, retry on status codes in `_retry_status_forcelist`."""
+        for n_retry in range(self._retry_total + 1):
+            response = await self._send(method, url, query_params, headers=headers)
+            if response.status_code not in self._retry_status_forcelist:
+                return response
+
+            if n_retry < self._retry_total:
+                await asyncio.sleep(self._retry_backoff_factor * (2**n_retry))
+
+        raise RetryError(f"Max retries exceeded with url: {url}")
+
+    async def _get_client_token(self, region):
+        """Fetch an access token based on client id and client secret credentials.
+
+        Args:
+            region:
+                A string containing a region.
+        """
+        url = self._format_oauth_url("/token", region)
+        query_params = {"grant_type": "client_credentials"}
+        credentials = f"{self._client_id}:{self._client_secret}".encode()
+        headers = {"Authorization": "Basic " + base64.b64encode(credentials).decode()}
+        response = await self._request("POST", url, query_params, headers=headers)
+        return self._response_handler(response)
+
+    def _response_handler(self, response):
+        """Handle the response."""
+        response.raise_for_status()
+        return response.json()
+
+    async def _authorized_request(self, url, region, query_params, headers=None):
+        """Send an authorized GET request, returns the `AsyncResponse`."""
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+
+        token_key = self._format_oauth_url("/token", region)
+        if token_key not in self._access_tokens:
+            async with self._token_lock:
+                if token_key not in self._access_tokens:
+                    json_ = await self._get_client_token(region)
+                    self._access_tokens[token_key] = json_["access_token"]
+
+        query_params = dict(query_params)
+        if query_params.get("access_token") is None:
+            query_params["access_token"] = self._access_tokens[token_key]
+
+        return await self._request("GET", url, query_params, headers=headers)
+
+    async def _request_handler(self, url, region, query_params):
+        """Handle the request."""
+        response = await self._authorized_request(url, region, query_params)
+        return self._response_handler(response)
+
+    async def _conditional_request_handler(
+        self, url, region, query_params, if_modified_since=None
+    ):
+        """Handle a conditional request, see `get_modified_resource`."""
+        headers = {}
+        if if_modified_since is not None:
+            headers["If-Modified-Since"] = formatdate(if_modified_since, usegmt=True)
+
+        response = await self._authorized_request(
+            url, region, query_params, headers=headers
+        )
+        if response.status_code == 304:
+            return None, None
+
+        return self._response_handler(response), parse_last_modified(
+            response.headers.get("last-modified")
+        )
+
+    def _format_api_url(self, resource, region):
+        """Format the API url into a usable url."""
+        if region == "cn":
+            url = self._api_url_cn.format(resource)
+        else:
+            url = self._api_url.format(region, resource)
+
+        return url
+
+    def _format_oauth_url(self, resource, region):
+        """Format the oauth url into a usable url."""
+        if region == "cn":
+            url = self._oauth_url_cn.format(resource)
+        else:
+            url = self._oauth_url.format(resource)
+
+        return url
+
+    async def get_resource(self, resource, region, query_params={}):
+        """Direction handler for when fetching resources."""
+        url = self._format_api_url(resource, region)
+        return await self._request_handler(url, region, query_params)
+
+    async def get_modified_resource(
+        self, resource, region, query_params={}, if_modified_since=None
+    ):
+        """Direction handler for when fetching resources that carry a
+        "Last-Modified" header, see `Api.get_modified_resource`.
+        """
+        url = self._format_api_url(resource, region)
+        return await self._conditional_request_handler(
+            url, region, query_params, if_modified_since=if_modified_since
+        )
+
+    async def close(self):
+        """Close the session, with its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
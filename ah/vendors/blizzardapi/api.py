@@ -1,4 +1,7 @@
 """api.py file."""
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+
 import requests
 from requests.adapters import HTTPAdapter, Retry
 
@@ -11,19 +14,21 @@ class Api:
     Attributes:
         _client_id: A string client id supplied by Blizzard.
         _client_secret: A string client secret supplied by Blizzard.
-        _access_token: A string access token that is used to access Blizzard's API.
+        _access_tokens: A dict of access tokens that are used to access Blizzard's
+            API, keyed by OAuth url (china has its own OAuth server).
         _api_url: A string url used to call the API endpoints.
         _api_url_cn: A string url used to call the china API endpoints.
         _oauth_url: A string url used to call the OAuth API endpoints.
         _oauth_url_cn: A string url used to call the china OAuth API endpoints.
         _session: An open requests.Session instance.
+        _token_lock: A lock guarding the access token among threads.
     """
 
     def __init__(self, client_id, client_secret):
         """Init Api."""
         self._client_id = client_id
         self._client_secret = client_secret
-        self._access_token = None
+        self._access_tokens = {}
 
         self._api_url = "https://{0}.api.blizzard.com{1}"
         self._api_url_cn = "https://gateway.battlenet.com.cn{0}"
@@ -38,9 +43,13 @@ class Api:
         ) + "{0}"
 
         self._session = requests.Session()
+        self._token_lock = threading.Lock()
         retries = Retry(total=5, backoff_factor=1, status_forcelist=[429, 502])
-        self._session.mount("https://", HTTPAdapter(max_retries=retries))
-        self._session.mount("http://", HTTPAdapter(max_retries=retries))
+        adapter = HTTPAdapter(
+            max_retries=retries, pool_maxsize=config.BN_API_POOL_MAXSIZE
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
 
     def _get_client_token(self, region):
         """Fetch an access token based on client id and client secret credentials.
@@ -67,19 +76,56 @@ class Api:
         resp = response.json()
         return resp
 
-    def _request_handler(self, url, region, query_params):
-        """Handle the request."""
-        if self._access_token is None:
-            json = self._get_client_token(region)
-            self._access_token = json["access_token"]
+    def _request(self, url, region, query_params, headers=None, stream=False):
+        """Send an authorized GET request, returns the `requests.Response`."""
+        token_key = self._format_oauth_url("/token", region)
+        if token_key not in self._access_tokens:
+            with self._token_lock:
+                if token_key not in self._access_tokens:
+                    json = self._get_client_token(region)
+                    self._access_tokens[token_key] = json["access_token"]
 
         if query_params.get("access_token") is None:
-            query_params["access_token"] = self._access_token
+            query_params["access_token"] = self._access_tokens[token_key]
 
-        response = self._session.get(url, params=query_params, verify=config.VERIFY_SSL)
+        return self._session.get(
+            url,
+            params=query_params,
+            headers=headers,
+            verify=config.VERIFY_SSL,
+            stream=stream,
+        )
 
+    def _request_handler(self, url, region, query_params):
+        """Handle the request."""
+        response = self._request(url, region, query_params)
         return self._response_handler(response)
 
+    def _conditional_request_handler(
+        self, url, region, query_params, if_modified_since=None, stream=False
+    ):
+        """Handle a conditional request, see `get_modified_resource` and
+        `stream_modified_resource`.
+        """
+        headers = {}
+        if if_modified_since is not None:
+            headers["If-Modified-Since"] = formatdate(if_modified_since, usegmt=True)
+
+        response = self._request(
+            url, region, query_params, headers=headers, stream=stream
+        )
+        if response.status_code == 304:
+            response.close()
+            return None, None
+
+        last_modified = parse_last_modified(response.headers.get("Last-Modified"))
+        if stream:
+            response.raise_for_status()
+            body = response.iter_content(config.BN_API_STREAM_CHUNK_SIZE)
+            return body, last_modified
+
+        return self._response_handler(response), last_modified
+
     def _format_api_url(self, resource, region):
         """Format the API url into a usable url."""
         if region == "cn":
@@ -94,6 +140,41 @@ class Api:
         url = self._format_api_url(resource, region)
         return self._request_handler(url, region, query_params)
 
+    def get_modified_resource(
+        self, resource, region, query_params={}, if_modified_since=None
+    ):
+        """Direction handler for when fetching resources that carry a
+        "Last-Modified" header.
+
+        Args:
+            if_modified_since:
+                An integer unix timestamp, sent as "If-Modified-Since" if given.
+
+        Returns:
+            A tuple of the json response and the unix timestamp of its
+            "Last-Modified" header (`None` if absent), or `(None, None)` if the
+            resource was not modified since `if_modified_since`.
+        """
+        url = self._format_api_url(resource, region)
+        return self._conditional_request_handler(
+            url, region, query_params, if_modified_since=if_modified_since
+        )
+
+    def stream_modified_resource(
+        self, resource, region, query_params={}, if_modified_since=None
+    ):
+        """Like `get_modified_resource`, but the body is not decoded, an iterator
+        of (decompressed) body chunks in bytes is returned instead of the json.
+        """
+        url = self._format_api_url(resource, region)
+        return self._conditional_request_handler(
+            url,
+            region,
+            query_params,
+            if_modified_since=if_modified_since,
+            stream=True,
+        )
+
     def _format_oauth_url(self, resource, region):
         """Format the oauth url into a usable url."""
         if region == "cn":
@@ -108,3 +189,14 @@ class Api:
         """Direction handler for when fetching oauth resources."""
         url = self._format_oauth_url(resource, region)
         return self._request_handler(url, region, query_params)
+
+
+def parse_last_modified(value):
+    """Parse a "Last-Modified" header into a unix timestamp, `None` if invalid."""
+    if not value:
+        return None
+
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError):
+        return None
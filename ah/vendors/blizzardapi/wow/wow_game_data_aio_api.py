@@ -0,0 +1,78 @@
+"""wow_game_data_aio_api.py file."""
+from ..aio_api import AsyncApi
+
+
+class AsyncWowGameDataApi(AsyncApi):
+    """Asyncio counterpart of the Wow Game Data API methods we use.
+
+    Attributes:
+        client_id: A string client id supplied by Blizzard.
+        client_secret: A string client secret supplied by Blizzard.
+        max_connections: Max number of requests in flight.
+    """
+
+    def __init__(self, client_id, client_secret, max_connections=None):
+        """Init AsyncWowGameDataApi."""
+        super().__init__(client_id, client_secret, max_connections=max_connections)
+
+    # Auction House API
+
+    async def get_commodities(self, region, locale, namespace):
+        """Returns all commodities for region."""
+        resource = "/data/wow/auctions/commodities"
+        query_params = {"namespace": namespace, "locale": locale}
+        return await super().get_resource(resource, region, query_params)
+
+    async def get_auctions(
+        self, region, locale, namespace, connected_realm_id, auction_house_id=None
+    ):
+        """Return all active auctions for a connected realm."""
+        resource = f"/data/wow/connected-realm/{connected_realm_id}/auctions"
+        if auction_house_id:
+            resource += f"/{auction_house_id}"
+
+        query_params = {"namespace": namespace, "locale": locale}
+        return await super().get_resource(resource, region, query_params)
+
+    async def get_modified_commodities(
+        self, region, locale, namespace, if_modified_since=None
+    ):
+        """Like `get_commodities`, see `AsyncApi.get_modified_resource`."""
+        resource = "/data/wow/auctions/commodities"
+        query_params = {"namespace": namespace, "locale": locale}
+        return await super().get_modified_resource(
+            resource, region, query_params, if_modified_since=if_modified_since
+        )
+
+    async def get_modified_auctions(
+        self,
+        region,
+        locale,
+        namespace,
+        connected_realm_id,
+        auction_house_id=None,
+        if_modified_since=None,
+    ):
+        """Like `get_auctions`, see `AsyncApi.get_modified_resource`."""
+        resource = f"/data/wow/connected-realm/{connected_realm_id}/auctions"
+        if auction_house_id:
+            resource += f"/{auction_house_id}"
+
+        query_params = {"namespace": namespace, "locale": locale}
+        return await super().get_modified_resource(
+            resource, region, query_params, if_modified_since=if_modified_since
+        )
+
+    # Connected Realm API
+
+    async def get_connected_realms_index(self, region, locale, namespace):
+        """Return an index of connected realms."""
+        resource = "/data/wow/connected-realm/index"
+        query_params = {"namespace": namespace, "locale": locale}
+        return await super().get_resource(resource, region, query_params)
+
+    async def get_connected_realm(self, region, locale, namespace, connected_realm_id):
+        """Return a connected realm by ID."""
+        resource = f"/data/wow/connected-realm/{connected_realm_id}"
+        query_params = {"namespace": namespace, "locale": locale}
+        return await super().get_resource(resource, region, query_params)
@@ -83,6 +83,45 @@ class WowGameDataApi(Api):
         query_params = {"namespace": namespace, "locale": locale}
         return super().get_resource(resource, region, query_params)
 
+    def get_modified_commodities(
+        self, region, locale, namespace, if_modified_since=None
+    ):
+        """Like `get_commodities`, see `Api.get_modified_resource`."""
+        resource = "/data/wow/auctions/commodities"
+        query_params = {"namespace": namespace, "locale": locale}
+        return super().get_modified_resource(
+            resource, region, query_params, if_modified_since=if_modified_since
+        )
+
+    def stream_modified_commodities(
+        self, region, locale, namespace, if_modified_since=None
+    ):
+        """Like `get_commodities`, see `Api.stream_modified_resource`."""
+        resource = "/data/wow/auctions/commodities"
+        query_params = {"namespace": namespace, "locale": locale}
+        return super().stream_modified_resource(
+            resource, region, query_params, if_modified_since=if_modified_since
+        )
+
+    def get_modified_auctions(
+        self,
+        region,
+        locale,
+        namespace,
+        connected_realm_id,
+        auction_house_id=None,
+        if_modified_since=None,
+    ):
+        """Like `get_auctions`, see `Api.get_modified_resource`."""
+        resource = f"/data/wow/connected-realm/{connected_realm_id}/auctions"
+        if auction_house_id:
+            resource += f"/{auction_house_id}"
+
+        query_params = {"namespace": namespace, "locale": locale}
+        return super().get_modified_resource(
+            resource, region, query_params, if_modified_since=if_modified_since
+        )
+
     # Azerite Essence API
 
     def get_azerite_essences_index(self, region, locale):
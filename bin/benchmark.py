@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""benchmarks on synthetic data, run from the repo root, e.g.
+
+    PYTHONPATH=. python bin/benchmark.py aggregate --n_auctions 500000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from heapq import heappush, heappop
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from ah.models import (
+    AuctionsResponse,
+    DBTypeEnum,
+    DecodedAuctions,
+    GameVersionEnum,
+    ItemString,
+    ItemStringTypeEnum,
+    MapItemStringMarketValueRecord,
+    MapItemStringMarketValueRecords,
+    MarketValueRecord,
+    MarketValueRecords,
+    Namespace,
+)
+from ah.storage import BinaryFile, TextFile, CODECS, get_codec
+from ah.db import DBHelper
+from ah.updater import Updater
+from ah.tsm_exporter import TSMExporter
+from ah import config
+
+
+def timeit(func: Callable, repeat: int = 3) -> Tuple[float, object]:
+    """best of `repeat` runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        ts = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - ts)
+
+    return best, result
+
+
+def report(title: str, rows: List[Tuple[str, float]]) -> None:
+    print(title)
+    base = rows[0][1]
+    for name, seconds in rows:
+        print(f"  {name:<24} {seconds:8.3f}s  x{base / seconds:.2f}")
+
+
+def mock_raw_auctions(n_auctions: int, n_items: int, seed: int = 0) -> Dict:
+    """raw auctions response, with bonuses, modifiers and bid-only auctions"""
+    rnd = random.Random(seed)
+    items = []
+    for i in range(n_items):
+        item = {"id": 1000 + i, "context": 1}
+        if rnd.random() < 0.3:
+            item["bonus_lists"] = rnd.sample(range(1, 20), 2)
+        if rnd.random() < 0.3:
+            item["modifiers"] = [{"type": 9, "value": rnd.choice([60, 70])}]
+        items.append((item, rnd.randint(100, 100000)))
+
+    auctions = []
+    for i in range(n_auctions):
+        item, base_price = rnd.choice(items)
+        price = int(base_price * rnd.uniform(0.8, 3))
+        auction = {
+            "id": i,
+            "item": item,
+            "quantity": rnd.randint(1, 20),
+            "time_left": "LONG",
+        }
+        if rnd.random() < 0.1:
+            auction["bid"] = price
+        else:
+            auction["buyout"] = price
+        auctions.append(auction)
+
+    return {"_links": {}, "auctions": auctions, "timestamp": 1000}
+
+
+def from_rows_heap(rows, timestamp: int) -> MapItemStringMarketValueRecord:
+    """the row by row (heap) aggregation `from_columns` replaced"""
+    obj = MapItemStringMarketValueRecord()
+    temp = {}
+    for item_string, price, quantity, buyout in rows:
+        if item_string not in temp:
+            temp[item_string] = [0, float("inf"), []]
+
+        temp[item_string][0] += quantity
+        if buyout and buyout < temp[item_string][1]:
+            temp[item_string][1] = buyout
+
+        heappush(temp[item_string][2], (price, quantity))
+
+    for item_string, (total, min_buyout, heap) in temp.items():
+        market_value = MapItemStringMarketValueRecord.calc_market_value(
+            total, (heappop(heap) for _ in range(len(heap)))
+        )
+        if market_value:
+            obj[item_string] = MarketValueRecord(
+                timestamp=timestamp,
+                market_value=np.int64(market_value + 0.5),
+                num_auctions=total,
+                min_buyout=0 if min_buyout == float("inf") else min_buyout,
+            )
+
+    return obj
+
+
+def dump(increment: MapItemStringMarketValueRecord) -> Dict[ItemString, Tuple]:
+    # `MarketValueRecord` compares timestamps only
+    return {
+        item_string: (r.timestamp, r.market_value, r.num_auctions, r.min_buyout)
+        for item_string, r in increment.items()
+    }
+
+
+def bench_aggregate(n_auctions: int, n_items: int, repeat: int) -> None:
+    raw = mock_raw_auctions(n_auctions, n_items)
+    resp = AuctionsResponse.model_validate(raw)
+    game_version = GameVersionEnum.RETAIL
+    rows = list(MapItemStringMarketValueRecord._iter_response_rows(resp, game_version))
+    decoded = DecodedAuctions.from_raw(raw)
+
+    t_heap, expected = timeit(lambda: from_rows_heap(rows, 1000), repeat)
+    t_columns, increment = timeit(
+        lambda: MapItemStringMarketValueRecord.from_rows(rows, 1000), repeat
+    )
+    t_decoded, increment_decoded = timeit(
+        lambda: MapItemStringMarketValueRecord.from_decoded(decoded), repeat
+    )
+    if not dump(expected) == dump(increment) == dump(increment_decoded):
+        sys.exit("results mismatch")
+
+    report(
+        f"aggregate: {n_auctions} auctions, {len(expected)} item strings",
+        [
+            ("heap (rows)", t_heap),
+            ("columnar (rows)", t_columns),
+            ("columnar (decoded)", t_decoded),
+        ],
+    )
+
+
+def mock_records(
+    n_items: int, n_records: int, seed: int = 0
+) -> MapItemStringMarketValueRecords:
+    """db file like records, hourly records of the last day after daily ones"""
+    rnd = random.Random(seed)
+    ts_now = 1_700_000_000
+    timestamps = [ts_now - (n_records - 24 - i) * 86400 for i in range(n_records - 24)]
+    timestamps += [ts_now + i * 3600 for i in range(24)]
+    records = MapItemStringMarketValueRecords()
+    for i in range(n_items):
+        item_string = ItemString(
+            type=ItemStringTypeEnum.ITEM,
+            id=1000 + i,
+            bonuses=tuple(rnd.sample(range(1, 20), 2)) if rnd.random() < 0.3 else None,
+            mods=(9, 70) if rnd.random() < 0.3 else None,
+        )
+        base_price = rnd.randint(100, 1_000_000)
+        records[item_string] = MarketValueRecords(
+            __root__=[
+                MarketValueRecord(
+                    timestamp=ts,
+                    market_value=int(base_price * rnd.uniform(0.9, 1.1)),
+                    num_auctions=rnd.randint(1, 500),
+                    min_buyout=int(base_price * rnd.uniform(0.7, 1)),
+                )
+                for ts in timestamps
+            ]
+        )
+
+    return records
+
+
+def bench_db_format(n_items: int, n_records: int, repeat: int) -> None:
+    records = mock_records(n_items, n_records)
+    expected = records.to_protobuf_bytes()
+    rows = []
+    with tempfile.TemporaryDirectory() as temp:
+        for ext, use_compression, compresslevel in (
+            ("gz", True, 9),
+            ("bin", False, 9),
+            ("pgz", True, config.DEFAULT_DB_PACKED_COMPRESSLEVEL),
+            ("pbin", False, 9),
+        ):
+            file = BinaryFile(
+                os.path.join(temp, f"records.{ext}"), use_compression, compresslevel
+            )
+            t_save, _ = timeit(lambda: records.to_file(file), repeat)
+            t_load, loaded = timeit(
+                lambda: MapItemStringMarketValueRecords.from_file(file), repeat
+            )
+            if loaded.to_protobuf_bytes() != expected:
+                sys.exit(f"records mismatch: {ext}")
+
+            rows.append((ext, t_save, t_load, os.path.getsize(file.file_path)))
+
+    print(f"db_format: {n_items} items x {n_records} records")
+    print(f"  {'format':<8} {'save':>8} {'load':>8} {'size':>12}")
+    for ext, t_save, t_load, size in rows:
+        print(f"  {ext:<8} {t_save:7.3f}s {t_load:7.3f}s {size:12,d}")
+
+
+# (codec, level) pairs, `None` for the codec's default
+CODEC_LEVELS = (
+    ("gzip", 1),
+    ("gzip", 6),
+    ("gzip", 9),
+    ("zlib", None),
+    ("lzma", 1),
+    ("lzma", None),
+    ("zstd", 1),
+    ("zstd", None),
+    ("zstd", 19),
+    ("lz4", None),
+)
+
+
+def bench_codecs(n_items: int, n_records: int, threads: int, repeat: int) -> None:
+    records = mock_records(n_items, n_records)
+    rows = []
+    for fmt, data in (
+        ("protobuf", records.to_protobuf_bytes()),
+        ("packed", records.to_packed_bytes(shuffle=True)),
+    ):
+        for name, level in CODEC_LEVELS:
+            if not CODECS[name].is_available():
+                continue
+
+            for threads_ in sorted({1, threads if CODECS[name].THREADED else 1}):
+                codec = get_codec(name, level, threads=threads_)
+                t_encode, compressed = timeit(lambda: codec.compress(data), repeat)
+                t_decode, decompressed = timeit(
+                    lambda: codec.decompress(compressed), repeat
+                )
+                if decompressed != data:
+                    sys.exit(f"data mismatch: {codec!r}")
+
+                label = f"{name}:{codec.level}"
+                if threads_ > 1:
+                    label += f"x{threads_}"
+                rows.append(
+                    (fmt, label, len(data), len(compressed), t_encode, t_decode)
+                )
+
+    skipped = [name for name, codec in CODECS.items() if not codec.is_available()]
+    print(f"codecs: {n_items} items x {n_records} records")
+    if skipped:
+        print(f"  not installed: {', '.join(skipped)}")
+    print(
+        f"  {'format':<9} {'codec':<10} {'size':>12} {'ratio':>6} "
+        f"{'encode':>11} {'decode':>11}"
+    )
+    for fmt, codec, size, compressed_size, t_encode, t_decode in rows:
+        mb = size / 1e6
+        print(
+            f"  {fmt:<9} {codec:<10} {compressed_size:12,d} "
+            f"{size / compressed_size:6.2f} "
+            f"{mb / t_encode:7.1f}MB/s {mb / t_decode:7.1f}MB/s"
+        )
+
+
+def bench_backends(n_items: int, n_records: int, repeat: int) -> None:
+    records = mock_records(n_items, n_records)
+    ts_now = max(r.timestamp for r in next(iter(records.values()))) + 3600
+    increment = MapItemStringMarketValueRecord()
+    for item_string, item_records in records.items():
+        increment[item_string] = MarketValueRecord(
+            timestamp=ts_now,
+            market_value=item_records[-1].market_value,
+            num_auctions=item_records[-1].num_auctions,
+            min_buyout=item_records[-1].min_buyout,
+        )
+
+    namespace = Namespace.from_str("dynamic-us")
+    expected = records.to_protobuf_bytes()
+    fields = ["itemString", "historical", "marketValue"]
+    rows = []
+    with tempfile.TemporaryDirectory() as temp:
+        for backend in DBHelper.BACKENDS:
+            db_helper = DBHelper(os.path.join(temp, backend), backend=backend)
+            file = db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=1)
+            updater = Updater(None, db_helper)
+            t_save, _ = timeit(lambda: records.to_file(file), repeat)
+            t_load, loaded = timeit(
+                lambda: MapItemStringMarketValueRecords.from_file(file), repeat
+            )
+            if loaded.to_protobuf_bytes() != expected:
+                sys.exit(f"records mismatch: {backend}")
+
+            def update(ts_compressed):
+                # from the same records every run
+                records.to_file(file)
+                ts = time.perf_counter()
+                updater.save_increment(
+                    file, increment, ts_now, ts_compressed=ts_compressed
+                )
+                return time.perf_counter() - ts
+
+            # later updates of a day have nothing to compress, the first one has
+            ts_compressed = MarketValueRecords.get_compress_end_ts(ts_now)
+            t_update = min(update(ts_compressed) for _ in range(repeat))
+            t_compact = min(
+                update(ts_compressed - 86400) for _ in range(repeat)
+            )
+
+            def append():
+                records.to_file(file)
+                ts = time.perf_counter()
+                updater.append_increment(file, increment)
+                return time.perf_counter() - ts
+
+            t_append = min(append() for _ in range(repeat))
+            export_file = TextFile(os.path.join(temp, f"{backend}.lua"))
+
+            def export():
+                export_file.remove()
+                TSMExporter.export_append_data(
+                    export_file,
+                    MapItemStringMarketValueRecords.from_file(file),
+                    fields,
+                    "AUCTIONDB_REGION_STAT",
+                    "US",
+                    ts_now,
+                    ts_now + 600,
+                    should_reset_tsc=True,
+                    market_values={},
+                )
+
+            t_export, _ = timeit(export, repeat)
+            with export_file.open("r") as f:
+                output = f.read()
+
+            rows.append(
+                (
+                    backend,
+                    t_save,
+                    t_load,
+                    t_update,
+                    t_compact,
+                    t_append,
+                    t_export,
+                    output,
+                )
+            )
+
+            db_helper.close()
+
+    if len({row[-1] for row in rows}) != 1:
+        sys.exit("exports mismatch")
+
+    print(f"backends: {n_items} items x {n_records} records")
+    print(
+        f"  {'backend':<8} {'save':>8} {'load':>8} {'update':>8} {'compact':>8} "
+        f"{'append':>8} {'export':>8}"
+    )
+    for backend, *seconds, _ in rows:
+        print(f"  {backend:<8} " + " ".join(f"{t:7.3f}s" for t in seconds))
+
+
+def main(command: str, **kwargs) -> None:
+    {
+        "aggregate": bench_aggregate,
+        "db_format": bench_db_format,
+        "codecs": bench_codecs,
+        "backends": bench_backends,
+    }[command](**kwargs)
+
+
+def parse_args(raw_args):
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_aggregate = subparsers.add_parser(
+        "aggregate",
+        help="Aggregate auctions into market value records, "
+        "`MapItemStringMarketValueRecord.from_rows`.",
+    )
+    parser_aggregate.add_argument("--n_auctions", type=int, default=500_000)
+    parser_aggregate.add_argument("--n_items", type=int, default=20_000)
+    parser_db_format = subparsers.add_parser(
+        "db_format",
+        help="Save and load a db file, protobuf vs packed format.",
+    )
+    parser_db_format.add_argument("--n_items", type=int, default=10_000)
+    parser_db_format.add_argument(
+        "--n_records",
+        type=int,
+        default=84,
+        help="Records per item, 60 daily and 24 hourly ones by default.",
+    )
+    parser_codecs = subparsers.add_parser(
+        "codecs",
+        help="Compression ratio vs. encode / decode throughput of db file codecs.",
+    )
+    parser_codecs.add_argument("--n_items", type=int, default=10_000)
+    parser_codecs.add_argument(
+        "--n_records",
+        type=int,
+        default=84,
+        help="Records per item, 60 daily and 24 hourly ones by default.",
+    )
+    parser_codecs.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Also compress with this many threads, for codecs that can, "
+        "default: number of CPUs.",
+    )
+    parser_backends = subparsers.add_parser(
+        "backends",
+        help="Update (load, merge and save / append) and export of a db file, "
+        "files vs. sqlite backend.",
+    )
+    parser_backends.add_argument("--n_items", type=int, default=10_000)
+    parser_backends.add_argument(
+        "--n_records",
+        type=int,
+        default=84,
+        help="Records per item, 60 daily and 24 hourly ones by default.",
+    )
+    for subparser in subparsers.choices.values():
+        subparser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Report the best of this many runs, default: 3.",
+        )
+
+    return parser.parse_args(raw_args)
+
+
+if __name__ == "__main__":
+    main(**vars(parse_args(sys.argv[1:])))
@@ -5,6 +5,8 @@ import json
 import argparse
 from typing import Dict
 
+from ah.data import BonusesCurves
+
 
 class DataPreprocessor:
     FIELDS_TO_KEEP_BONUSES = {"level", "base_level", "curveId"}
@@ -49,15 +51,18 @@ class DataPreprocessor:
         return new_bonuses
 
     @classmethod
-    def run(cls, data_path: str, output_path: str):
+    def run(cls, data_path: str, output_path: str, precompiled_path: str = None):
         data_bonuses = cls.load_json(os.path.join(data_path, "bonuses.json"))
         data_curves = cls.load_json(os.path.join(data_path, "item-curves.json"))
         bonuses = cls.join_bonuses_and_curves(data_bonuses, data_curves)
         cls.dump_json(output_path, bonuses)
+        # loaded instead of the json, as long as it has the same content
+        if precompiled_path:
+            BonusesCurves.save_arrays(precompiled_path, bonuses, output_path)
 
 
-def main(data_path: str = None, output_path: str = None):
-    DataPreprocessor.run(data_path, output_path)
+def main(data_path: str = None, output_path: str = None, precompiled_path: str = None):
+    DataPreprocessor.run(data_path, output_path, precompiled_path)
 
 
 def parse_args(raw_args):
@@ -69,6 +74,13 @@ def parse_args(raw_args):
         default="./ah/data/bonuses_curves.json",
         type=str,
     )
+    parser.add_argument(
+        "--precompiled_path",
+        help="Path to output precompiled tables (numpy arrays) loaded by `ah.data`, "
+        "empty to skip",
+        default="./ah/data/bonuses_curves.npz",
+        type=str,
+    )
     args = parser.parse_args(raw_args)
     return args
 
@@ -0,0 +1,65 @@
+"""mock data shared by tests"""
+from random import Random
+from typing import Optional
+
+from ah.models import (
+    MapItemStringMarketValueRecords,
+    MarketValueRecords,
+    ItemString,
+    ItemStringTypeEnum,
+)
+from ah.defs import SECONDS_IN
+
+
+def mock_item_string(i: int) -> ItemString:
+    """item `i`, a pet if `i % 5 == 0`, with bonuses if `i % 3 == 0` and
+    modifiers if `i % 4 == 0`
+    """
+    return ItemString(
+        type=ItemStringTypeEnum.PET if i % 5 == 0 else ItemStringTypeEnum.ITEM,
+        id=i,
+        bonuses=(i, i + 1) if i % 3 == 0 else None,
+        mods=(9, 70) if i % 4 == 0 else None,
+    )
+
+
+def mock_records(
+    n_items: int,
+    n_records: Optional[int] = None,
+    ts: int = 1000,
+    seed: Optional[int] = None,
+) -> MapItemStringMarketValueRecords:
+    """records of items `0..n_items - 1` (see `mock_item_string`), item `i` has
+    `n_records` (default: `i % 7 + 1`) records an hour apart from `ts`:
+
+        market_value:   (i + 1) * 10000 - j * 7
+        num_auctions:   j
+        min_buyout:     0 if j is odd, else 2**40 + j
+
+    with `seed`, items have a random number (up to `n_records`) of records of
+    random values, at random times within `n_records` days from `ts`.
+    """
+    rnd = None if seed is None else Random(seed)
+    records = MapItemStringMarketValueRecords()
+    for i in range(n_items):
+        n = i % 7 + 1 if n_records is None else n_records
+        if rnd is None:
+            records[mock_item_string(i)] = MarketValueRecords.from_columns(
+                [ts + j * 3600 for j in range(n)],
+                [(i + 1) * 10000 - j * 7 for j in range(n)],
+                list(range(n)),
+                [0 if j % 2 else 2**40 + j for j in range(n)],
+            )
+            continue
+
+        timestamps = sorted(
+            rnd.sample(range(ts, ts + n * SECONDS_IN.DAY), rnd.randint(0, n))
+        )
+        records[mock_item_string(i)] = MarketValueRecords.from_columns(
+            timestamps,
+            [rnd.randint(1, 10**9) for _ in timestamps],
+            [rnd.randint(1, 100) for _ in timestamps],
+            [rnd.randint(0, 10**9) for _ in timestamps],
+        )
+
+    return records
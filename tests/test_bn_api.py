@@ -0,0 +1,263 @@
+from unittest import TestCase
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+import threading
+import asyncio
+import json
+import gzip
+
+from requests.exceptions import HTTPError, RetryError
+
+from ah.api import AsyncBNAPI, BNAPI
+from ah.vendors.blizzardapi import aio_api
+from ah.cache import Cache
+from ah.models import Namespace
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """a stand-in for Blizzard's API, serves a fake connected realm 1"""
+
+    protocol_version = "HTTP/1.1"
+    # shared among handler instances, reset in `setUp`
+    hits = Counter()
+    n_throttle = 0
+    # "Last-Modified" of auctions
+    last_modified = 1000
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(
+        self, data, status=200, chunked=False, compress=False, headers=None
+    ):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if compress:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(body), 7):
+                chunk = body[i : i + 7]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        self.hits[url.path] += 1
+        if url.path == "/token" and self.headers["Authorization"]:
+            self._send_json({"access_token": "token"})
+        else:
+            self._send_json({}, status=401)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.hits[url.path] += 1
+        if url.path.startswith("/moved/"):
+            self.send_response(301)
+            self.send_header("Location", self.path[len("/moved") :])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        elif query.get("access_token") != ["token"]:
+            self._send_json({}, status=401)
+
+        elif url.path == "/data/wow/connected-realm/index":
+            self._send_json(
+                {"connected_realms": [{"href": "/data/wow/connected-realm/1"}]}
+            )
+
+        elif url.path == "/data/wow/connected-realm/1":
+            self._send_json({"id": 1, "realms": []}, chunked=True)
+
+        elif url.path.startswith("/data/wow/connected-realm/1/auctions"):
+            since = self.headers["If-Modified-Since"]
+            if since and parsedate_to_datetime(since).timestamp() >= self.last_modified:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            self._send_json(
+                {"auctions": [{"id": 1, "item": {"id": 123}}], "path": url.path},
+                compress=True,
+                headers={"Last-Modified": formatdate(self.last_modified, usegmt=True)},
+            )
+
+        elif url.path == "/data/wow/auctions/commodities":
+            if self.n_throttle > 0:
+                type(self).n_throttle -= 1
+                self._send_json({}, status=429)
+            else:
+                self._send_json({"auctions": []}, chunked=True, compress=True)
+
+        else:
+            self._send_json({}, status=404)
+
+
+class TestAsyncBNAPI(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever)
+        cls.server_thread.daemon = True
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandInHandler.hits = Counter()
+        StandInHandler.n_throttle = 0
+        StandInHandler.last_modified = 1000
+        self.temp = TemporaryDirectory()
+        self.cache = Cache(self.temp.name)
+        self.namespace = Namespace.from_str("dynamic-us")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def get_bn_api(self, **kwargs):
+        if aio_api.aiohttp is None:
+            self.skipTest("requires aiohttp")
+
+        bn_api = AsyncBNAPI("id", "secret", self.cache, **kwargs)
+        host = "http://%s:%d" % self.server.server_address
+        bn_api._api._api_url = host + "{1}"
+        bn_api._api._oauth_url = host + "{0}"
+        bn_api._api._retry_backoff_factor = 0
+        return bn_api
+
+    def test_endpoints(self):
+        async def run():
+            async with self.get_bn_api() as bn_api:
+                index = await bn_api.get_connected_realms_index(self.namespace)
+                cr = await bn_api.get_connected_realm(self.namespace, 1)
+                auctions = await bn_api.get_auctions(
+                    self.namespace, 1, auction_house_id=2
+                )
+                commodities = await bn_api.get_commodities(self.namespace)
+                return index, cr, auctions, commodities
+
+        index, cr, auctions, commodities = asyncio.run(run())
+        self.assertEqual(1, len(index["connected_realms"]))
+        self.assertEqual({"id": 1, "realms": []}, cr)
+        self.assertEqual("/data/wow/connected-realm/1/auctions/2", auctions["path"])
+        self.assertEqual({"auctions": []}, commodities)
+        self.assertEqual(1, StandInHandler.hits["/token"])
+
+    def test_in_flight(self):
+        n = 20
+
+        async def run():
+            async with self.get_bn_api(max_connections=8) as bn_api:
+                return await asyncio.gather(
+                    *(
+                        bn_api.get_auctions(self.namespace, 1, auction_house_id=i)
+                        for i in range(1, n + 1)
+                    )
+                )
+
+        resps = asyncio.run(run())
+        self.assertListEqual(
+            [f"/data/wow/connected-realm/1/auctions/{i}" for i in range(1, n + 1)],
+            [resp["path"] for resp in resps],
+        )
+        # token requested once, shared by all requests
+        self.assertEqual(1, StandInHandler.hits["/token"])
+
+    def test_cache(self):
+        async def run():
+            async with self.get_bn_api() as bn_api:
+                for _ in range(3):
+                    await bn_api.get_auctions(self.namespace, 1)
+
+        asyncio.run(run())
+        self.assertEqual(1, StandInHandler.hits["/data/wow/connected-realm/1/auctions"])
+        # same key as `BNAPI.get_auctions`
+        key = {"fname": "get_auctions", "args": (self.namespace, 1), "kwargs": {}}
+        self.assertIsNotNone(self.cache.get(key))
+
+    def test_errors(self):
+        async def get_connected_realm(bn_api):
+            async with bn_api:
+                return await bn_api.get_connected_realm(self.namespace, 2)
+
+        async def get_commodities(bn_api):
+            async with bn_api:
+                return await bn_api.get_commodities(self.namespace)
+
+        self.assertRaises(
+            HTTPError, asyncio.run, get_connected_realm(self.get_bn_api())
+        )
+
+        # recovers within retries
+        StandInHandler.n_throttle = 2
+        resp = asyncio.run(get_commodities(self.get_bn_api()))
+        self.assertEqual({"auctions": []}, resp)
+
+        self.cache.purge()
+        StandInHandler.n_throttle = 100
+        self.assertRaises(RetryError, asyncio.run, get_commodities(self.get_bn_api()))
+
+    def test_redirect(self):
+        async def run(bn_api):
+            async with bn_api:
+                return await bn_api.get_connected_realm(self.namespace, 1)
+
+        bn_api = self.get_bn_api()
+        bn_api._api._api_url = "http://%s:%d/moved{1}" % self.server.server_address
+        self.assertEqual({"id": 1, "realms": []}, asyncio.run(run(bn_api)))
+        self.assertEqual(1, StandInHandler.hits["/moved/data/wow/connected-realm/1"])
+
+    def test_no_aiohttp(self):
+        with patch.object(aio_api, "aiohttp", None):
+            self.assertRaises(ImportError, AsyncBNAPI, "id", "secret", self.cache)
+
+    def test_if_modified_since(self):
+        async def run(**kwargs):
+            async with self.get_bn_api() as bn_api:
+                return await bn_api.get_auctions(self.namespace, 1, **kwargs)
+
+        # "Last-Modified" becomes the timestamp
+        self.assertEqual(1000, asyncio.run(run())["timestamp"])
+        self.assertIsNone(asyncio.run(run(if_modified_since=1000)))
+        StandInHandler.last_modified = 2000
+        self.assertEqual(2000, asyncio.run(run(if_modified_since=1000))["timestamp"])
+
+        # sync client
+        StandInHandler.last_modified = 1000
+        self.cache.purge()
+        host = "http://%s:%d" % self.server.server_address
+        bn_api = BNAPI("id", "secret", self.cache)
+        bn_api._api.wow.game_data._api_url = host + "{1}"
+        bn_api._api.wow.game_data._oauth_url = host + "{0}"
+        self.assertEqual(1000, bn_api.get_auctions(self.namespace, 1)["timestamp"])
+        self.assertIsNone(
+            bn_api.get_auctions(self.namespace, 1, if_modified_since=1000)
+        )
+        StandInHandler.last_modified = 2000
+        resp = bn_api.get_auctions(self.namespace, 1, if_modified_since=1000)
+        self.assertEqual(2000, resp["timestamp"])
+
+    def test_stream_commodities(self):
+        host = "http://%s:%d" % self.server.server_address
+        bn_api = BNAPI("id", "secret", self.cache)
+        bn_api._api.wow.game_data._api_url = host + "{1}"
+        bn_api._api.wow.game_data._oauth_url = host + "{0}"
+        resp = bn_api.stream_commodities(self.namespace)
+        self.assertListEqual([], list(resp["auctions"]))
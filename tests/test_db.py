@@ -7,11 +7,15 @@ import gzip
 from ah.errors import DownloadError
 from ah.db import DBHelper, GithubFileForker
 from ah.updater import Updater
+from ah.storage import BinaryFile
+from ah.models.packed import PackedItemDBReader
 from ah.models import (
     MapItemStringMarketValueRecord,
     MapItemStringMarketValueRecords,
     MarketValueRecord,
+    MarketValueRecords,
     ItemString,
+    ItemStringTable,
     ItemStringTypeEnum,
     Namespace,
     DBTypeEnum,
@@ -22,6 +26,7 @@ from ah.models import (
     FactionEnum,
     Meta,
 )
+from tests.helpers import mock_records
 
 
 class DummyGHAPI:
@@ -459,3 +464,186 @@ class TestAuctionDB(TestCase):
             fn = self.make_db_file(db_helper, region, crid)
             expected.add(fn)
         self.assertEqual(set(db_helper.list_file()), expected)
+
+    def test_packed(self):
+        db_path = self.tmp_dir.name
+        records = mock_records(20, 30)
+        # an empty entry, skipped by both formats
+        records[
+            ItemString(type=ItemStringTypeEnum.ITEM, id=99, bonuses=None, mods=None)
+        ] = MarketValueRecords()
+        expected = records.to_protobuf_bytes()
+        data = records.to_packed_bytes()
+        self.assertTrue(data.startswith(b"AHPK"))
+        for data in (data, expected):
+            loaded = MapItemStringMarketValueRecords.from_bytes(data)
+            self.assertEqual(expected, loaded.to_protobuf_bytes())
+
+        empty = MapItemStringMarketValueRecords().to_packed_bytes()
+        self.assertEqual(0, len(MapItemStringMarketValueRecords.from_bytes(empty)))
+
+        # format follows file extension, reading detects either format
+        for file_name, use_compression in (
+            ("records.pgz", True),
+            ("records.pbin", False),
+            ("records.gz", True),
+        ):
+            file = BinaryFile(f"{db_path}/{file_name}", use_compression)
+            records.to_file(file)
+            with open(file.file_path, "rb") as f:
+                data = f.read()
+            if use_compression:
+                data = gzip.decompress(data)
+            self.assertEqual(
+                file_name.endswith(("pgz", "pbin")), data.startswith(b"AHPK")
+            )
+            loaded = MapItemStringMarketValueRecords.from_file(file)
+            self.assertEqual(expected, loaded.to_protobuf_bytes())
+
+    def test_packed_reader(self):
+        db_path = self.tmp_dir.name
+        records = mock_records(20, 30)
+        records[
+            ItemString(type=ItemStringTypeEnum.ITEM, id=3, bonuses=None, mods=None)
+        ] = MarketValueRecords.from_columns([1000], [10], [1], [0])
+        file = BinaryFile(f"{db_path}/records.pbin")
+        records.to_file(file)
+        with PackedItemDBReader(file.file_path) as reader:
+            self.assertEqual(len(records), len(reader))
+            self.assertListEqual([], reader.find(0, 1000))
+            # item 3 with bonuses and without
+            indices = reader.find(0, 3)
+            self.assertEqual(2, len(indices))
+            self.assertListEqual(
+                [(0, 3, (3, 4), ()), (0, 3, (), ())],
+                [reader.get_item(index) for index in indices],
+            )
+            columns = reader.get_records(indices[0], ts_from=1000 + 25 * 3600)
+            self.assertListEqual(
+                [1000 + j * 3600 for j in range(25, 30)],
+                columns["timestamps"].tolist(),
+            )
+            self.assertListEqual(
+                [40000 - j * 7 for j in range(25, 30)],
+                columns["market_values"].tolist(),
+            )
+            self.assertListEqual(
+                [0 if j % 2 else 2**40 + j for j in range(25, 30)],
+                columns["min_buyouts"].tolist(),
+            )
+
+        for file_name, use_compression in (
+            ("records.pbin", False),
+            ("records.pgz", True),
+            ("records.gz", True),
+        ):
+            file = BinaryFile(f"{db_path}/{file_name}", use_compression)
+            records.to_file(file)
+            for id_, ts_from in ((3, None), (5, 1000 + 10 * 3600), (1000, None)):
+                expected = records.query(id_)
+                if ts_from is not None:
+                    for item_records in expected.values():
+                        item_records.remove_expired(ts_from)
+                result = MapItemStringMarketValueRecords.query_file(
+                    file, id_, ts_from=ts_from
+                )
+                self.assertEqual(
+                    expected.to_protobuf_bytes(), result.to_protobuf_bytes()
+                )
+
+        # appended segments are merged
+        segment = MapItemStringMarketValueRecords()
+        for item_string in list(records.query(3).keys()):
+            segment[item_string] = MarketValueRecords.from_columns(
+                [1000 + 30 * 3600], [1], [2], [3]
+            )
+        file = BinaryFile(f"{db_path}/records.pbin")
+        records.to_file(file)
+        segment.append_file(file)
+        records.extend(segment)
+        for id_ in (3, 5):
+            result = MapItemStringMarketValueRecords.query_file(file, id_)
+            self.assertEqual(
+                records.query(id_).to_protobuf_bytes(), result.to_protobuf_bytes()
+            )
+        self.assertEqual(
+            records.to_protobuf_bytes(),
+            MapItemStringMarketValueRecords.from_file(file).to_protobuf_bytes(),
+        )
+
+        # shuffled, i.e. written for compression, can't be mapped
+        with open(f"{db_path}/records.pgz", "rb") as f:
+            data = gzip.decompress(f.read())
+        with open(f"{db_path}/shuffled.pbin", "wb") as f:
+            f.write(data)
+        self.assertRaises(ValueError, PackedItemDBReader, f"{db_path}/shuffled.pbin")
+
+    def test_item_string_table(self):
+        db_path = self.tmp_dir.name
+        records = mock_records(20, 3)
+        files = []
+        for file_name in ("records.gz", "records.pbin"):
+            file = BinaryFile(f"{db_path}/{file_name}", file_name.endswith("gz"))
+            records.to_file(file)
+            files.append(file)
+
+        # appended segment repeats item strings of the packed base
+        segment = records.query(3)
+        segment.append_file(files[1])
+        expected = records.to_protobuf_bytes()
+
+        item_strings = ItemStringTable()
+        loaded = [
+            MapItemStringMarketValueRecords.from_file(file, item_strings=item_strings)
+            for file in files
+        ]
+        self.assertEqual(len(records), len(item_strings))
+        self.assertEqual(expected, loaded[0].to_protobuf_bytes())
+        for a, b in zip(loaded[0], loaded[1]):
+            self.assertIs(a, b)
+
+        # not shared unless loaded with the same table
+        loaded = MapItemStringMarketValueRecords.from_file(files[0])
+        self.assertEqual(expected, loaded.to_protobuf_bytes())
+        for a, b in zip(loaded, item_strings.values()):
+            self.assertEqual(a, b)
+            self.assertIsNot(a, b)
+
+        pb = ItemString(
+            type=ItemStringTypeEnum.PET, id=3, bonuses=None, mods=None
+        ).to_protobuf()
+        pb.type = 5
+        self.assertRaises(ValueError, ItemString.from_protobuf, pb)
+        self.assertRaises(ValueError, ItemString.from_protobuf, pb, item_strings)
+
+    def test_packed_db_helper(self):
+        namespace = Namespace(
+            category=NameSpaceCategoriesEnum.DYNAMIC,
+            game_version=GameVersionEnum.RETAIL,
+            region="us",
+        )
+        db_helper = DBHelper(self.tmp_dir.name)
+        packed_db_helper = DBHelper(self.tmp_dir.name, use_packed=True)
+        file = packed_db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=1)
+        self.assertEqual("dynamic-us_auctions_1.pgz", file.file_name)
+        self.assertTrue(DBFileName.from_str(file.file_name).is_packed())
+        self.assertEqual(
+            "dynamic-us_auctions_1.gz",
+            db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=1).file_name,
+        )
+
+        # existing files keep their format
+        file.touch()
+        self.assertEqual(
+            "dynamic-us_auctions_1.pgz",
+            db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=1).file_name,
+        )
+        db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=2).touch()
+        self.assertEqual(
+            "dynamic-us_auctions_2.gz",
+            packed_db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=2).file_name,
+        )
+        self.assertSetEqual(
+            {"dynamic-us_auctions_1.pgz", "dynamic-us_auctions_2.gz"},
+            set(db_helper.list_file()),
+        )
@@ -0,0 +1,39 @@
+from unittest import TestCase
+import tempfile
+
+from ah.tsm_exporter import TSMExporter
+from ah.storage import TextFile
+from ah.defs import SECONDS_IN
+from tests.helpers import mock_records
+
+
+class TestTSMExporter(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_market_values(self):
+        records = mock_records(50, 70, ts=0, seed=0)
+        outputs = []
+        for market_values in (None, {}):
+            file = TextFile(f"{self.tmp_dir.name}/{market_values is None}.lua")
+            for export in TSMExporter.REGION_AUCTIONS_COMMODITIES_EXPORTS:
+                TSMExporter.export_append_data(
+                    file,
+                    records,
+                    export["fields"],
+                    export["type"],
+                    "US",
+                    69 * SECONDS_IN.DAY + 100,
+                    69 * SECONDS_IN.DAY + 1000,
+                    should_reset_tsc=True,
+                    market_values=market_values,
+                )
+            with file.open("r", encoding="utf-8") as f:
+                outputs.append(f.read())
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(2, outputs[0].count("LoadData"))
+        self.assertEqual(len(records), len(market_values))
@@ -0,0 +1,40 @@
+from unittest import TestCase
+import json
+
+from ah.jsonstream import iter_json_array
+
+
+class TestJsonStream(TestCase):
+    @classmethod
+    def split(cls, data: bytes, size: int):
+        return [data[i : i + size] for i in range(0, len(data), size)]
+
+    def test_iter_json_array(self):
+        auctions = [
+            {"id": i, "item": {"id": i % 7, "name": '€ "quoted" ]}'}, "n": [i, i]}
+            for i in range(50)
+        ]
+        doc = {
+            "_links": {"self": {"href": "https://host/data/wow/auctions/commodities"}},
+            "auctions": auctions,
+        }
+        for indent in (None, 2):
+            data = json.dumps(doc, indent=indent, ensure_ascii=False).encode()
+            # split at every possible size, multi-byte characters included
+            for size in (1, 2, 3, 7, 64, len(data)):
+                self.assertListEqual(
+                    auctions, list(iter_json_array(self.split(data, size), "auctions"))
+                )
+
+    def test_edge(self):
+        self.assertListEqual(
+            [], list(iter_json_array([b'{"auctions": []}'], "auctions"))
+        )
+        self.assertRaises(
+            ValueError, list, iter_json_array([b'{"_links": {}}'], "auctions")
+        )
+        self.assertRaises(
+            ValueError,
+            list,
+            iter_json_array([b'{"auctions": [{"id": 1}, {"id":'], "auctions"),
+        )
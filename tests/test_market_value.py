@@ -1,4 +1,8 @@
 from unittest import TestCase
+import random
+
+import numpy as np
+
 from ah.models import MapItemStringMarketValueRecord
 
 
@@ -77,3 +81,46 @@ class TestMarketValue(TestCase):
         expected = 1
         actual = MapItemStringMarketValueRecord.calc_market_value(7, price_groups)
         self.assertAlmostEqual(expected, actual)
+
+    def test_market_values_batch(self):
+        """`calc_market_values` matches `calc_market_value` for every item"""
+        items = [
+            (24, [(5, 1), (13, 2), (15, 3), (16, 1), (17, 2), (19, 1), (20, 6)]),
+            (7, [(1, 1), (1.1, 6)]),
+            (2, [(4, 1), (4.7, 1)]),
+            (2, [(10, 1), (100, 1)]),
+            (1, [(4, 1)]),
+            (7, [(1, 1), (2, 6)]),
+            # `hi` is 0, sampled quantity is at least 1
+            (3, [(10, 3)]),
+            # quantity is not all in price groups
+            (100, [(10, 5), (11, 50)]),
+        ]
+        rnd = random.Random(0)
+        for _ in range(2000):
+            price_groups = sorted(
+                (rnd.choice([100, 110, 121, 150, 300, rnd.randint(1, 10000)]), q)
+                for q in rnd.choices([1, 1, 2, 5, 20, 200], k=rnd.randint(1, 30))
+            )
+            items.append((sum(q for _, q in price_groups), price_groups))
+
+        starts = np.cumsum([0] + [len(groups) for _, groups in items[:-1]])
+        prices = [p for _, groups in items for p, _ in groups]
+        quantities = [q for _, groups in items for _, q in groups]
+        actual = MapItemStringMarketValueRecord.calc_market_values(
+            np.array([n for n, _ in items]),
+            starts,
+            np.array(prices),
+            np.array(quantities),
+        )
+        self.assertEqual(len(items), len(actual))
+        self.assertAlmostEqual(14.5, actual[0])
+        for (n, price_groups), value in zip(items, actual):
+            expected = MapItemStringMarketValueRecord.calc_market_value(
+                n, price_groups
+            )
+            self.assertAlmostEqual(expected, value)
+
+        self.assertEqual(
+            0, len(MapItemStringMarketValueRecord.calc_market_values([], [], [], []))
+        )
@@ -1,6 +1,10 @@
 from unittest import TestCase
+import tempfile
 import random
+import json
+import os
 
+from ah.data import BonusesCurves
 from ah.models import (
     ItemString,
     ItemStringTypeEnum,
@@ -309,3 +313,100 @@ class TestModels(TestCase):
             )
         )
         self.assertEqual(i.to_str(), ret)
+
+    def test_memo(self):
+        bonuses = [8851, 8852, 8801]
+        mods = [{"type": 29, "value": 36}, {"type": 9, "value": 70}]
+        ItemString.clear_memo()
+        a = ItemString.from_auction_item_fields(201937, None, bonuses, mods)
+        b = ItemString.from_auction_item_fields(201937, None, list(bonuses), mods)
+        self.assertIs(a, b)
+        info = ItemString.memo_info()
+        self.assertEqual((1, 1), (info.hits, info.misses))
+        # different order of bonuses may be a different item level
+        ItemString.from_auction_item_fields(201937, None, bonuses[::-1], mods)
+        self.assertEqual(2, ItemString.memo_info().misses)
+
+        # dropped once bonuses are replaced
+        map_bonuses = ItemString.MAP_BONUSES
+        try:
+            ItemString.set_map_bonuses({})
+            self.assertEqual(0, ItemString.memo_info().currsize)
+            c = ItemString.from_auction_item_fields(201937, None, bonuses, mods)
+            self.assertEqual("i:201937::0:2:9:70:29:36", c.to_str())
+            self.assertNotEqual(a, c)
+            # replaced directly
+            ItemString.MAP_BONUSES = map_bonuses
+            self.assertEqual(
+                a, ItemString.from_auction_item_fields(201937, None, bonuses, mods)
+            )
+            self.assertEqual(1, ItemString.memo_info().misses)
+        finally:
+            ItemString.set_map_bonuses(map_bonuses)
+
+    def test_map_bonuses(self):
+        bonuses = {
+            "1": {},
+            "3": {"level": -5},
+            "2": {"base_level": 200},
+            "10": {"curveId": 7, "points": [[1, 10], [60, 200], [70, 300]]},
+            "11": {"curveId": 8, "points": [[70, 400]]},
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "bonuses_curves.json")
+            npz_path = os.path.join(tmp_dir, "bonuses_curves.npz")
+            with open(json_path, "w") as f:
+                json.dump(bonuses, f)
+
+            # json only
+            map_bonuses = BonusesCurves(json_path, npz_path)
+            self.assertFalse(map_bonuses.is_loaded)
+            self.assertIn(3, map_bonuses)
+            self.assertTrue(map_bonuses.is_loaded)
+            expected = {
+                1: {},
+                2: {"base_level": 200},
+                3: {"level": -5},
+                10: {"curveId": 7, "points": [(1, 10), (60, 200), (70, 300)]},
+                11: {"curveId": 8, "points": [(70, 400)]},
+            }
+            self.assertDictEqual(expected, dict(map_bonuses))
+
+            # precompiled
+            BonusesCurves.save_arrays(npz_path, bonuses, json_path)
+            with open(json_path, "w") as f:
+                json.dump({k: bonuses[k] for k in ("1", "2")}, f)
+
+            map_bonuses = BonusesCurves(json_path, npz_path)
+            self.assertEqual(2, len(map_bonuses))
+            # same size, other content
+            BonusesCurves.save_arrays(npz_path, bonuses, json_path)
+            with open(json_path) as f:
+                data = f.read()
+
+            size = os.path.getsize(json_path)
+            with open(json_path, "w") as f:
+                f.write(data.replace('"base_level": 200', '"base_level": 210'))
+
+            self.assertEqual(size, os.path.getsize(json_path))
+            map_bonuses = BonusesCurves(json_path, npz_path)
+            self.assertDictEqual({"base_level": 210}, map_bonuses[2])
+            BonusesCurves.save_arrays(npz_path, bonuses, json_path)
+            map_bonuses = BonusesCurves(json_path, npz_path)
+            self.assertDictEqual(expected, dict(map_bonuses))
+            self.assertNotIn(4, map_bonuses)
+            self.assertRaises(KeyError, map_bonuses.__getitem__, 4)
+
+        # shipped tables, same as the json
+        map_bonuses = BonusesCurves()
+        self.assertIsNotNone(map_bonuses._load_npz())
+        with open(map_bonuses.json_path) as f:
+            data = json.load(f)
+
+        self.assertEqual(len(data), len(map_bonuses))
+        for bonus_id in random.sample(list(data), 200):
+            entry = dict(map_bonuses[int(bonus_id)])
+            if "points" in entry:
+                entry["points"] = list(map(list, entry["points"]))
+
+            self.assertDictEqual(data[bonus_id], entry)
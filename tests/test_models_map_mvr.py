@@ -1,6 +1,9 @@
 from unittest import TestCase
+from heapq import heappush, heappop
 import random
 
+import numpy as np
+
 from ah.models import (
     MapItemStringMarketValueRecord,
     AuctionItem,
@@ -12,6 +15,8 @@ from ah.models import (
     GameVersionEnum,
     ItemString,
     ItemStringTypeEnum,
+    DecodedAuctions,
+    MarketValueRecord,
 )
 
 
@@ -178,6 +183,217 @@ class TestModels(TestCase):
             self.assertEqual(record.num_auctions, expected[item_id][1])
             self.assertEqual(record.min_buyout, min_price)
 
+    def test_from_commodities(self):
+        """same increment as `from_response`, commodities with repeated prices
+        included
+        """
+        random.seed(7)
+        commodities = [
+            {
+                "id": i,
+                "item": {"id": random.randint(1, 30)},
+                "quantity": random.randint(1, 50),
+                "unit_price": random.choice([100, 105, 110, 130, 200, 1000])
+                * random.randint(1, 3),
+                "time_left": "VERY_LONG",
+            }
+            for i in range(3000)
+        ]
+        resp = CommoditiesResponse.model_validate(
+            {"_links": {}, "auctions": commodities, "timestamp": 1000}
+        )
+        expected = MapItemStringMarketValueRecord.from_response(resp)
+        increment = MapItemStringMarketValueRecord.from_commodities(
+            iter(commodities), 1000
+        )
+        self.assertEqual(30, len(expected))
+        self.assertDictEqual(self.dump(expected), self.dump(increment))
+
+    @classmethod
+    def mock_raw_auctions(cls, n, game_version=GameVersionEnum.RETAIL):
+        """raw (json) auctions with bonuses, modifiers, pets and bid-only ones"""
+        is_classic = game_version != GameVersionEnum.RETAIL
+        auctions = []
+        for i in range(n):
+            item = {"id": random.randint(1, 20), "context": 1}
+            if random.random() < 0.1:
+                item.update(
+                    pet_breed_id=1,
+                    pet_level=25,
+                    pet_quality_id=3,
+                    pet_species_id=random.randint(1, 5),
+                )
+            if random.random() < 0.3:
+                item["bonus_lists"] = random.sample([1, 2, 3, 4, 5, 6], 2)
+            if random.random() < 0.3:
+                item["modifiers"] = [
+                    {"type": 9, "value": random.choice([60, 70])},
+                    {"type": random.choice([28, 29]), "value": 1},
+                ]
+
+            quantity = random.randint(1, 20)
+            price = random.randint(100, 1000) * (quantity if is_classic else 1)
+            auction = {
+                "id": i,
+                "item": item,
+                "quantity": quantity,
+                "time_left": "LONG",
+            }
+            if is_classic:
+                is_bid_only = random.random() < 0.2
+                auction["bid"] = price
+                auction["buyout"] = 0 if is_bid_only else price
+            elif random.random() < 0.2:
+                auction["bid"] = price
+            else:
+                auction["buyout"] = price
+            auctions.append(auction)
+
+        return auctions
+
+    def test_from_decoded(self):
+        """same increment as `from_response`"""
+        random.seed(8)
+        for game_version in (GameVersionEnum.RETAIL, GameVersionEnum.CLASSIC):
+            raw = {
+                "_links": {},
+                "connected_realm": {},
+                "auctions": self.mock_raw_auctions(2000, game_version),
+                "timestamp": 1000,
+            }
+            expected = MapItemStringMarketValueRecord.from_response(
+                AuctionsResponse.model_validate(raw), game_version
+            )
+            decoded = DecodedAuctions.from_raw(raw, game_version=game_version)
+            self.assertEqual(2000, len(decoded))
+            self.assertEqual(0, decoded.n_rejected)
+            increment = MapItemStringMarketValueRecord.from_decoded(decoded)
+            self.assertDictEqual(self.dump(expected), self.dump(increment))
+
+        commodities = [
+            {
+                "id": i,
+                "item": {"id": random.randint(1, 30)},
+                "quantity": random.randint(1, 50),
+                "unit_price": random.randint(100, 200),
+                "time_left": "VERY_LONG",
+            }
+            for i in range(1000)
+        ]
+        raw = {"_links": {}, "auctions": commodities, "timestamp": 1000}
+        expected = MapItemStringMarketValueRecord.from_response(
+            CommoditiesResponse.model_validate(raw)
+        )
+        increment = MapItemStringMarketValueRecord.from_decoded(
+            DecodedAuctions.from_raw(raw, is_commodities=True)
+        )
+        self.assertDictEqual(self.dump(expected), self.dump(increment))
+
+    def test_from_raw_rejected(self):
+        random.seed(9)
+        valid = self.mock_raw_auctions(200)
+        invalid = [
+            # no bid or buyout
+            {"id": 1, "item": {"id": 1}, "quantity": 1, "time_left": "LONG"},
+            # missing pet field
+            {
+                "id": 2,
+                "item": {"id": 1, "pet_species_id": 1},
+                "buyout": 100,
+                "quantity": 1,
+                "time_left": "LONG",
+            },
+            # missing quantity / item
+            {"id": 3, "item": {"id": 1}, "buyout": 100, "time_left": "LONG"},
+            {"id": 4, "buyout": 100, "quantity": 1, "time_left": "LONG"},
+            # invalid quantity / price
+            {"id": 5, "item": {"id": 1}, "buyout": 100, "quantity": 0},
+            {"id": 6, "item": {"id": 1}, "buyout": "100", "quantity": 1},
+        ]
+        auctions = valid + invalid
+        random.shuffle(auctions)
+        decoded = DecodedAuctions.from_raw({"auctions": auctions, "timestamp": 1000})
+        self.assertEqual(len(valid), len(decoded))
+        self.assertEqual(len(invalid), decoded.n_rejected)
+
+        expected = MapItemStringMarketValueRecord.from_response(
+            AuctionsResponse.model_validate(
+                {"_links": {}, "auctions": valid, "timestamp": 1000}
+            )
+        )
+        increment = MapItemStringMarketValueRecord.from_decoded(decoded)
+        self.assertDictEqual(self.dump(expected), self.dump(increment))
+
+    @classmethod
+    def dump(cls, increment):
+        """`MarketValueRecord` compares timestamps only"""
+        return {
+            item_string: (
+                record.timestamp,
+                record.market_value,
+                record.num_auctions,
+                record.min_buyout,
+            )
+            for item_string, record in increment.items()
+        }
+
+    @classmethod
+    def from_rows_heap(cls, rows, timestamp):
+        """the row by row (heap) aggregation `from_columns` replaced"""
+        obj = MapItemStringMarketValueRecord()
+        temp = {}
+        for item_string, price, quantity, buyout in rows:
+            if item_string not in temp:
+                temp[item_string] = [0, float("inf"), []]
+
+            temp[item_string][0] += quantity
+            if buyout and buyout < temp[item_string][1]:
+                temp[item_string][1] = buyout
+
+            heappush(temp[item_string][2], (price, quantity))
+
+        for item_string, (total, min_buyout, heap) in temp.items():
+            market_value = MapItemStringMarketValueRecord.calc_market_value(
+                total, (heappop(heap) for _ in range(len(heap)))
+            )
+            if market_value:
+                obj[item_string] = MarketValueRecord(
+                    timestamp=timestamp,
+                    market_value=np.int64(market_value + 0.5),
+                    num_auctions=total,
+                    min_buyout=0 if min_buyout == float("inf") else min_buyout,
+                )
+
+        return obj
+
+    def test_from_columns(self):
+        """same records as the row by row aggregation, auctions sharing prices
+        (in different quantities) and bid-only ones included
+        """
+        random.seed(10)
+        item_strings = [
+            ItemString(type=ItemStringTypeEnum.ITEM, id=i, bonuses=None, mods=None)
+            for i in range(50)
+        ]
+        rows = []
+        for _ in range(20000):
+            price = random.choice([100, 105, 110, 130, 200, 1000])
+            rows.append(
+                (
+                    random.choice(item_strings),
+                    price * random.randint(1, 3),
+                    random.randint(1, 20),
+                    random.choice([0, price]),
+                )
+            )
+
+        expected = self.from_rows_heap(rows, 1000)
+        increment = MapItemStringMarketValueRecord.from_rows(rows, 1000)
+        self.assertEqual(50, len(expected))
+        self.assertDictEqual(self.dump(expected), self.dump(increment))
+
+        self.assertEqual(0, len(MapItemStringMarketValueRecord.from_rows([], 1000)))
+
     def test_edge(self):
         obj = {
             "_links": {},
@@ -1,4 +1,6 @@
 from unittest import TestCase
+from copy import deepcopy
+
 from tests.test_models_mvrs import TestModels as TestModelsMVRs
 
 from ah.models import (
@@ -10,6 +12,7 @@ from ah.models import (
     ItemStringTypeEnum,
 )
 from ah.defs import SECONDS_IN
+from ah.errors import CompressTsError
 
 
 class TestModels(TestCase):
@@ -86,20 +89,12 @@ class TestModels(TestCase):
         self.assertEqual(s_na_rec, N_RECORDS_PER_ITEM * N_ITEMS)
         self.assertEqual(s_na_ent, N_ITEMS)
 
-        # assert not in order
+        # records are kept in order, sorting changes nothing
         for records in db.values():
-            temp = None
-            ordered = True
-            for i in range(N_RECORDS_PER_ITEM - 1):
-                comp = records[i].timestamp < records[i + 1].timestamp
-                if temp is None:
-                    temp = comp
-                elif temp != comp:
-                    ordered = False
-                    break
-            self.assertFalse(ordered)
+            self.assertListEqual(
+                list(range(N_RECORDS_PER_ITEM)), records.timestamps.tolist()
+            )
 
-        # sort by timestamp, assert in order
         db.sort()
         for records in db.values():
             self.assertEqual(len(records), N_RECORDS_PER_ITEM)
@@ -112,19 +107,11 @@ class TestModels(TestCase):
             records.__root__[N_RECORDS_PER_ITEM // 2 :]
             + records.__root__[: N_RECORDS_PER_ITEM // 2]
         )
-        # assert not in order
-        temp = None
-        ordered = True
+        # assert in order
         for i in range(N_RECORDS_PER_ITEM - 1):
-            comp = records[i].timestamp < records[i + 1].timestamp
-            if temp is None:
-                temp = comp
-            elif temp != comp:
-                ordered = False
-                break
-        self.assertFalse(ordered)
+            self.assertLess(records[i].timestamp, records[i + 1].timestamp)
 
-        # add one more record, sort by timestamp, assert in order
+        # add one more record, assert in order
         record = MarketValueRecord(
             timestamp=100,
             market_value=100,
@@ -343,3 +330,54 @@ class TestModels(TestCase):
                 expected_recent_records,
                 ts_now,
             )
+
+    def test_compression_map(self):
+        db = MapItemStringMarketValueRecords()
+        ts_now = 1680528498 + SECONDS_IN.DAY // 3
+        ts_expires_in = SECONDS_IN.DAY * 60
+        for i in range(10):
+            records, *_ = TestModelsMVRs.generate_records(
+                ts_now, ts_expires_in, n_expired=i, n_recent=i + 1
+            )
+            item_string = ItemString(
+                type=ItemStringTypeEnum.ITEM, id=i, bonuses=None, mods=None
+            )
+            db[item_string] = records
+
+        empty_item_string = ItemString(
+            type=ItemStringTypeEnum.ITEM, id=10, bonuses=None, mods=None
+        )
+        db[empty_item_string] = MarketValueRecords()
+
+        # same as compressing item by item
+        expected = deepcopy(db)
+        n_expected = sum(
+            records.compress(ts_now, ts_expires_in) for records in expected.values()
+        )
+        for _ in range(2):
+            n_removed = db.compress(ts_now, ts_expires_in)
+            self.assertEqual(n_expected, n_removed)
+            self.assertListEqual(list(expected.keys()), list(db.keys()))
+            self.assertEqual(expected.to_protobuf_bytes(), db.to_protobuf_bytes())
+            self.assertFalse(db[empty_item_string])
+            n_expected = 0
+
+        ts_compressed = MarketValueRecords.get_compress_end_ts(ts_now)
+        n_expected = sum(
+            records.remove_expired(ts_compressed - SECONDS_IN.DAY * 10)
+            for records in expected.values()
+        )
+        n_removed = db.remove_expired(ts_compressed - SECONDS_IN.DAY * 10)
+        self.assertEqual(n_expected, n_removed)
+        self.assertEqual(expected.to_protobuf_bytes(), db.to_protobuf_bytes())
+
+        # compressed records should be one per day
+        records = db[next(iter(db.keys()))]
+        records.add(deepcopy(records[0]), sort=True)
+        self.assertRaises(
+            CompressTsError,
+            db.compress,
+            ts_now,
+            ts_expires_in,
+            ts_compressed=ts_compressed,
+        )
@@ -1,12 +1,16 @@
 from unittest import TestCase
 from math import gcd
 from copy import deepcopy
+from random import Random
+
+import numpy as np
 
 from ah.models import (
     MarketValueRecord,
     MarketValueRecords,
 )
 from ah.defs import SECONDS_IN
+from ah.errors import CompressTsError
 
 
 class TestModels(TestCase):
@@ -324,6 +328,50 @@ class TestModels(TestCase):
         avgs_expected = [int((1000 + 1100 * 2) / 3 + 0.5)] + avgs_expected
         self.assertEqual(avgs, avgs_expected)
 
+    def test_average_by_day_min_buyout(self):
+        # day: min buyouts, 0 for no buyout
+        days = {0: [3, 0, 2], 1: [0, 0, 5], 2: [0], 3: [4, 7], 4: [0, 6]}
+        records = MarketValueRecords()
+        for day, min_buyouts in days.items():
+            for i, min_buyout in enumerate(min_buyouts):
+                records.add(
+                    MarketValueRecord(
+                        timestamp=SECONDS_IN.DAY * day + i,
+                        market_value=10 * (i + 1),
+                        num_auctions=i + 1,
+                        min_buyout=min_buyout,
+                    )
+                )
+
+        avgs = MarketValueRecords.average_by_day(
+            records, SECONDS_IN.DAY * len(days), len(days), return_mvr=True
+        )
+        # smallest of the two smallest that isn't 0
+        self.assertListEqual([2, 0, 0, 4, 6], [r.min_buyout for r in avgs])
+        self.assertListEqual([20, 20, 10, 15, 15], [r.market_value for r in avgs])
+        self.assertListEqual([2, 2, 1, 2, 2], [r.num_auctions for r in avgs])
+        self.assertListEqual(
+            [SECONDS_IN.DAY * day + SECONDS_IN.DAY // 2 for day in days],
+            [r.timestamp for r in avgs],
+        )
+
+        # compressed days should have one record each
+        self.assertRaises(
+            CompressTsError,
+            MarketValueRecords.average_by_day,
+            records,
+            SECONDS_IN.DAY * len(days),
+            len(days),
+            ts_compressed=SECONDS_IN.DAY * 2,
+        )
+        avgs = MarketValueRecords.average_by_day(
+            records,
+            SECONDS_IN.DAY * len(days),
+            3,
+            ts_compressed=SECONDS_IN.DAY * 3,
+        )
+        self.assertListEqual([10, 15, 15], avgs)
+
     def test_sort(self):
         RECORDED_DAYS = 20
         RECORDS_PER_DAY = 4
@@ -342,11 +390,17 @@ class TestModels(TestCase):
             records.add(mvr, sort=False)
         wmv = records.get_weighted_market_value(NOW)
 
-        # disrupt the order
+        # disrupt the order, records are kept in order
         size = len(records)
         records.__root__ = records.__root__[size // 2 :] + records.__root__[: size // 2]
-        wmv_false = records.get_weighted_market_value(NOW)
-        self.assertNotEqual(wmv, wmv_false)
+        self.assertEqual(wmv, records.get_weighted_market_value(NOW))
+
+        # added out of order
+        shuffled = MarketValueRecords()
+        for mvr in Random(0).sample(records.__root__, size):
+            shuffled.add(mvr, sort=False)
+        self.assertEqual(records, shuffled)
+        self.assertEqual(wmv, shuffled.get_weighted_market_value(NOW))
 
         # sort
         records.sort()
@@ -453,6 +507,140 @@ class TestModels(TestCase):
             int(weight_lcm * N_DAYS / sum(MarketValueRecords.DAY_WEIGHTS) + 0.5),
         )
 
+    def test_market_values(self):
+        rnd = Random(0)
+        records = MarketValueRecords()
+        for day in range(70):
+            for hour in sorted(rnd.sample(range(24), rnd.randint(0, 6))):
+                records.add(
+                    MarketValueRecord(
+                        timestamp=day * SECONDS_IN.DAY + hour * 3600,
+                        market_value=rnd.randint(1, 10**9),
+                        num_auctions=rnd.randint(1, 100),
+                        min_buyout=rnd.randint(0, 10**9),
+                    )
+                )
+
+        self.assertEqual((0, 0), MarketValueRecords().get_market_values(100))
+        # partly compressed, the same records as the updater leaves them
+        compressed = deepcopy(records)
+        ts_compress_end = 65 * SECONDS_IN.DAY
+        compressed.compress(ts_compress_end, 60 * SECONDS_IN.DAY)
+        for records_, ts_compressed in ((records, 0), (compressed, ts_compress_end)):
+            for ts_now in (
+                64 * SECONDS_IN.DAY,
+                65 * SECONDS_IN.DAY + 1,
+                70 * SECONDS_IN.DAY - 1234,
+                200 * SECONDS_IN.DAY,
+            ):
+                self.assertEqual(
+                    (
+                        records_.get_historical_market_value(ts_now, ts_compressed),
+                        records_.get_weighted_market_value(ts_now, ts_compressed),
+                    ),
+                    records_.get_market_values(ts_now, ts_compressed),
+                )
+
+    def test_array(self):
+        records = MarketValueRecords()
+        record_list = [
+            MarketValueRecord(
+                timestamp=i,
+                market_value=10 * i,
+                num_auctions=100 * i,
+                min_buyout=1000 * i,
+            )
+            for i in range(50)
+        ]
+        for mvr in record_list:
+            records.add(mvr, sort=False)
+
+        self.assertEqual(50, len(records))
+        self.assertGreaterEqual(len(records._array), 50)
+        self.assertEqual(records.DTYPE, records.array.dtype)
+        self.assertListEqual(list(range(0, 500, 10)), records.market_values.tolist())
+        for a, b in zip(record_list, records):
+            self.assertEqual(a.timestamp, b.timestamp)
+            self.assertEqual(a.min_buyout, b.min_buyout)
+            self.assertIsInstance(b.market_value, np.int64)
+
+        self.assertEqual(490, records[-1].market_value)
+        self.assertListEqual(record_list[::-1], list(reversed(records)))
+        self.assertListEqual([20, 30], [r.market_value for r in records[2:4]])
+        self.assertRaises(IndexError, records.__getitem__, 50)
+
+        # records are views, copies of the rows
+        records[0].market_value = np.int64(1)
+        self.assertEqual(0, records[0].market_value)
+        records[0] = MarketValueRecord(
+            timestamp=0, market_value=1, num_auctions=0, min_buyout=0
+        )
+        self.assertEqual(1, records[0].market_value)
+        self.assertEqual(records, MarketValueRecords(__root__=records.__root__))
+        self.assertEqual(records, deepcopy(records))
+
+        self.assertEqual(490, records.pop().market_value)
+        self.assertEqual(1, records.pop(0).market_value)
+        self.assertEqual(48, len(records))
+        self.assertEqual(10, records[0].market_value)
+
+        other = MarketValueRecords.from_columns([50, 60], [1, 2], [3, 4], [5, 6])
+        records.extend(other)
+        self.assertEqual(50, len(records))
+        self.assertEqual(2, records[-1].market_value)
+        records.empty()
+        self.assertFalse(records)
+
+    def test_sorted(self):
+        records = MarketValueRecords()
+        for i in range(50):
+            records.add(
+                MarketValueRecord(
+                    timestamp=i % 5, market_value=i, num_auctions=0, min_buyout=0
+                )
+            )
+
+        # inserted after records with the same timestamp, like a stable sort
+        self.assertListEqual(
+            sorted(range(50), key=lambda i: i % 5), records.market_values.tolist()
+        )
+        # moved by timestamp
+        records[0] = MarketValueRecord(
+            timestamp=3, market_value=100, num_auctions=0, min_buyout=0
+        )
+        self.assertListEqual([3, 3, 4], records.timestamps[-12:-9].tolist())
+        self.assertEqual(100, records[-11].market_value)
+
+        # merged
+        other = MarketValueRecords.from_columns(
+            [4, 2, 0], [200, 201, 202], [0] * 3, [0] * 3
+        )
+        self.assertListEqual([0, 2, 4], other.timestamps.tolist())
+        records.extend(other)
+        self.assertEqual(53, len(records))
+        self.assertTrue(np.all(np.diff(records.timestamps) >= 0))
+        self.assertListEqual(
+            [202, 201, 200], [r.market_value for r in records if r.market_value >= 200]
+        )
+
+        self.assertEqual(10, records.bisect(1))
+        self.assertEqual(20, records.bisect(1, right=True))
+        between = records.records_between(1, 3)
+        self.assertListEqual([1] * 10 + [2] * 11, between.timestamps.tolist())
+        self.assertEqual(0, len(records.records_between(5, 10)))
+
+        self.assertEqual(4, records.recent().timestamp)
+        self.assertEqual(200, records.recent(4).market_value)
+        self.assertIsNone(records.recent(5))
+        self.assertIsNone(MarketValueRecords().recent())
+
+        self.assertEqual(0, records.truncate_before(0))
+        self.assertEqual(20, records.truncate_before(2))
+        self.assertEqual(33, len(records))
+        self.assertEqual(2, records[0].timestamp)
+        self.assertEqual(33, records.truncate_before(10))
+        self.assertFalse(records)
+
     def test_expired(self):
         records = MarketValueRecords()
         record_list = (
@@ -0,0 +1,186 @@
+from unittest import TestCase
+from unittest.mock import patch
+from collections import Counter
+import tempfile
+import os
+
+from ah.packfile import Packfile, PackMemberFile, pack, unpack, parse_args
+from ah.db import DBHelper, GithubFileForker
+from ah.models import (
+    MapItemStringMarketValueRecords,
+    MarketValueRecords,
+    ItemString,
+    ItemStringTypeEnum,
+    Namespace,
+    DBTypeEnum,
+    Meta,
+)
+from tests.helpers import mock_records
+
+
+class PackGHAPI:
+    """releases one packfile per namespace, and no loose files"""
+
+    def __init__(self, packs):
+        self.packs = packs
+        self.hits = Counter()
+
+    def get_assets_uri(self, owner, repo, tag=None):
+        return {name: f"https://example.com/{name}" for name in self.packs}
+
+    def get_asset(self, url):
+        name = url.rpartition("/")[2]
+        self.hits[name] += 1
+        return self.packs[name]
+
+
+class TestPackfile(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.namespace = Namespace.from_str("dynamic-us")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_db(self, db_path):
+        """files of realm 1, 2 and meta, returns records of realm 1, 2"""
+        db_helper = DBHelper(db_path)
+        records = {}
+        for crid in (1, 2):
+            records[crid] = mock_records(crid * 10)
+            file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=crid)
+            records[crid].to_file(file)
+
+        meta = Meta()
+        meta.set_update_ts(100, 200)
+        meta.to_file(db_helper.get_file(self.namespace, DBTypeEnum.META))
+        return records
+
+    def test_build(self):
+        members = [("a.gz", b"foo"), ("b.json", b""), ("c.bin", bytes(range(256)))]
+        path = f"{self.tmp_dir.name}/test.pack"
+        Packfile.write(path, members)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        for packfile in (Packfile(path), Packfile(data=data)):
+            self.assertListEqual(["a.gz", "b.json", "c.bin"], packfile.names())
+            self.assertIn("a.gz", packfile)
+            self.assertNotIn("d.gz", packfile)
+            self.assertListEqual(members, list(packfile.iter_members()))
+            self.assertRaises(KeyError, packfile.read, "d.gz")
+
+        # corrupted member
+        data = data.replace(b"foo", b"fOo")
+        self.assertRaises(ValueError, Packfile(data=data).read, "a.gz")
+        self.assertEqual(b"", Packfile(data=data).read("b.json"))
+        self.assertRaises(ValueError, Packfile(data=b"AHPK" + data[4:]).names)
+
+    def test_db_helper(self):
+        db_path = self.tmp_dir.name
+        records = self.make_db(db_path)
+        self.assertListEqual([f"{db_path}/dynamic-us.pack"], pack(db_path, remove=True))
+        self.assertListEqual(["dynamic-us.pack"], os.listdir(db_path))
+
+        db_helper = DBHelper(db_path)
+        meta_file = db_helper.get_file(self.namespace, DBTypeEnum.META)
+        self.assertIsInstance(meta_file, PackMemberFile)
+        self.assertEqual((100, 200), Meta.from_file(meta_file).get_update_ts())
+        for crid in (1, 2):
+            file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=crid)
+            self.assertIsInstance(file, PackMemberFile)
+            self.assertTrue(file.exists())
+            self.assertEqual(
+                records[crid].to_protobuf_bytes(),
+                MapItemStringMarketValueRecords.from_file(file).to_protobuf_bytes(),
+            )
+
+        file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=3)
+        self.assertNotIsInstance(file, PackMemberFile)
+        self.assertFalse(file.exists())
+
+        # written as loose files, which take precedence over members
+        file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=1)
+        mock_records(5).to_file(file)
+        self.assertTrue(file.is_loose())
+        file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=1)
+        self.assertEqual(5, len(MapItemStringMarketValueRecords.from_file(file)))
+
+        # repacked with the loose file, other members kept
+        pack(db_path, remove=True)
+        self.assertListEqual(["dynamic-us.pack"], os.listdir(db_path))
+        for crid, n in ((1, 5), (2, 20)):
+            file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=crid)
+            self.assertEqual(n, len(MapItemStringMarketValueRecords.from_file(file)))
+
+        out_path = f"{db_path}/out"
+        os.makedirs(out_path)
+        unpack([f"{db_path}/dynamic-us.pack"], out_path)
+        self.assertSetEqual(
+            {
+                "dynamic-us_auctions_1.gz",
+                "dynamic-us_auctions_2.gz",
+                "dynamic-us_meta.json",
+            },
+            set(os.listdir(out_path)),
+        )
+
+    def test_append(self):
+        for use_compression in (True, False):
+            db_path = f"{self.tmp_dir.name}/{use_compression}"
+            with patch.object(DBHelper, "USE_COMPRESSION", use_compression):
+                records = self.make_db(db_path)
+                pack(db_path, remove=True)
+                file = DBHelper(db_path).get_file(
+                    self.namespace, DBTypeEnum.AUCTIONS, crid=1
+                )
+
+            self.assertFalse(file.is_loose())
+            segment = MapItemStringMarketValueRecords()
+            item_string = ItemString(
+                type=ItemStringTypeEnum.ITEM, id=100, bonuses=None, mods=None
+            )
+            segment[item_string] = MarketValueRecords.from_columns(
+                [2000], [1], [1], [0]
+            )
+            segment.append_file(file)
+            self.assertTrue(file.is_loose())
+            loaded = MapItemStringMarketValueRecords.from_file(file)
+            self.assertEqual(11, len(loaded))
+            for item_string, mvrs in records[1].items():
+                self.assertEqual(mvrs, loaded[item_string])
+
+    def test_fork(self):
+        src_path = f"{self.tmp_dir.name}/src"
+        os.makedirs(src_path)
+        records = self.make_db(src_path)
+        pack_path = pack(src_path)[0]
+        with open(pack_path, "rb") as f:
+            gh_api = PackGHAPI({"dynamic-us.pack": f.read()})
+
+        forker = GithubFileForker("https://github.com/user/repo", gh_api)
+        db_helper = DBHelper(f"{self.tmp_dir.name}/dst")
+        meta = Meta.from_file(
+            db_helper.get_file(self.namespace, DBTypeEnum.META), forker=forker
+        )
+        self.assertEqual((100, 200), meta.get_update_ts())
+        for crid in (1, 2, 3):
+            file = db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=crid)
+            loaded = MapItemStringMarketValueRecords.from_file(file, forker=forker)
+            self.assertEqual(crid * 10 if crid < 3 else 0, len(loaded))
+            if crid < 3:
+                self.assertEqual(
+                    records[crid].to_protobuf_bytes(), loaded.to_protobuf_bytes()
+                )
+
+        # one download for the whole region
+        self.assertEqual({"dynamic-us.pack": 1}, dict(gh_api.hits))
+
+    def test_parse_args(self):
+        args = parse_args(["pack", "--remove", "dynamic-us"])
+        self.assertEqual("pack", args.command)
+        self.assertTrue(args.remove)
+        self.assertListEqual(["dynamic-us"], args.namespaces)
+        args = parse_args(["unpack", "--out_path", "out", "a.pack", "b.pack"])
+        self.assertListEqual(["a.pack", "b.pack"], args.pack_paths)
+        self.assertEqual("out", args.out_path)
@@ -0,0 +1,86 @@
+from unittest import TestCase
+import threading
+import time
+
+from ah.pipeline import Pipeline, Stage
+
+
+class TestPipeline(TestCase):
+    def test_run(self):
+        pipeline = Pipeline(
+            [
+                Stage("add", lambda x: x + 1),
+                Stage("mul", lambda x: x * 10),
+            ]
+        )
+        self.assertListEqual([10, 20, 30], pipeline.run([0, 1, 2]))
+        self.assertEqual(3, pipeline.stages[0].n_items)
+        self.assertEqual(3, pipeline.stages[1].n_items)
+        # pipeline is reusable
+        self.assertListEqual([], pipeline.run([]))
+
+    def test_workers(self):
+        n_active = 0
+        max_active = 0
+        lock = threading.Lock()
+
+        def slow(x):
+            nonlocal n_active, max_active
+            with lock:
+                n_active += 1
+                max_active = max(max_active, n_active)
+            time.sleep(0.02)
+            with lock:
+                n_active -= 1
+            return x
+
+        pipeline = Pipeline(
+            [Stage("slow", slow, workers=4), Stage("identity", lambda x: x)],
+            maxsize=2,
+        )
+        results = pipeline.run(range(20))
+        self.assertListEqual(list(range(20)), sorted(results))
+        self.assertLessEqual(max_active, 4)
+        self.assertGreater(max_active, 1)
+
+    def test_bounded(self):
+        """upstream stops pulling items when downstream is stuck"""
+        n_fed = 0
+        release = threading.Event()
+
+        def items():
+            nonlocal n_fed
+            for i in range(100):
+                n_fed += 1
+                yield i
+
+        def stuck(x):
+            release.wait()
+            return x
+
+        pipeline = Pipeline(
+            [Stage("a", lambda x: x), Stage("stuck", stuck)], maxsize=1
+        )
+        thread = threading.Thread(target=pipeline.run, args=(items(),))
+        thread.start()
+        time.sleep(0.3)
+        # 1 in "stuck", 1 in its queue, 1 in "a", 1 in its queue, 1 in feeder
+        self.assertLessEqual(n_fed, 5)
+        release.set()
+        thread.join()
+        self.assertEqual(100, n_fed)
+
+    def test_error(self):
+        def fail(x):
+            if x == 3:
+                raise ValueError("boom")
+            return x
+
+        pipeline = Pipeline([Stage("fail", fail), Stage("identity", lambda x: x)])
+        self.assertRaises(ValueError, pipeline.run, range(100))
+
+        def items():
+            yield 1
+            raise KeyError("feed")
+
+        self.assertRaises(KeyError, pipeline.run, items())
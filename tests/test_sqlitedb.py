@@ -0,0 +1,243 @@
+from unittest import TestCase
+from unittest import mock
+import threading
+import tempfile
+import random
+import gzip
+
+from ah.sqlitedb import SqliteDB, SqliteDBFile, SqliteMetaFile
+from ah.db import DBHelper, GithubFileForker
+from ah.updater import Updater
+from ah.models import (
+    MapItemStringMarketValueRecord,
+    MapItemStringMarketValueRecords,
+    MarketValueRecord,
+    MarketValueRecords,
+    Namespace,
+    DBTypeEnum,
+    Meta,
+)
+from ah.defs import SECONDS_IN
+from tests.helpers import mock_item_string, mock_records
+
+
+class AssetsGHAPI:
+    def __init__(self, assets):
+        self.assets = assets
+
+    def get_assets_uri(self, owner, repo, tag=None):
+        return {name: f"https://example.com/{name}" for name in self.assets}
+
+    def get_asset(self, url):
+        return self.assets[url.rpartition("/")[2]]
+
+
+class TestSqliteDB(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.namespace = Namespace.from_str("dynamic-us")
+        self.db_helper = DBHelper(self.tmp_dir.name, backend="sqlite")
+
+    def tearDown(self):
+        self.db_helper.sqlite_db.close()
+        self.tmp_dir.cleanup()
+
+    def test_records(self):
+        file = self.db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=1)
+        self.assertIsInstance(file, SqliteDBFile)
+        self.assertFalse(file.exists())
+        self.assertEqual(0, len(MapItemStringMarketValueRecords.from_file(file)))
+
+        records = mock_records(30)
+        records.to_file(file)
+        self.assertTrue(file.exists())
+        loaded = MapItemStringMarketValueRecords.from_file(file)
+        self.assertEqual(records.to_protobuf_bytes(), loaded.to_protobuf_bytes())
+
+        # appended segments are added to the items' records, new items last
+        segment = mock_records(35, ts=100000)
+        segment.append_file(file)
+        records.extend(segment)
+        loaded = MapItemStringMarketValueRecords.from_file(file)
+        self.assertEqual(records.to_protobuf_bytes(), loaded.to_protobuf_bytes())
+        result = MapItemStringMarketValueRecords.query_file(file, 3, ts_from=100000)
+        self.assertListEqual(list(segment.query(3).keys()), list(result.keys()))
+
+        # rewritten as a whole, other files untouched
+        other = self.db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=2)
+        mock_records(3).to_file(other)
+        records = mock_records(10)
+        records.to_file(file)
+        loaded = MapItemStringMarketValueRecords.from_file(file)
+        self.assertEqual(records.to_protobuf_bytes(), loaded.to_protobuf_bytes())
+        self.assertEqual(3, len(MapItemStringMarketValueRecords.from_file(other)))
+
+        file.remove()
+        self.assertFalse(file.exists())
+        self.assertTrue(other.exists())
+        self.assertListEqual(
+            ["dynamic-us_auctions_2"], self.db_helper.sqlite_db.names()
+        )
+
+        # touched, empty, existing files kept as they are
+        file.touch()
+        self.assertTrue(file.exists())
+        self.assertEqual(0, len(MapItemStringMarketValueRecords.from_file(file)))
+        other.touch()
+        self.assertEqual(3, len(MapItemStringMarketValueRecords.from_file(other)))
+
+    def test_update_rows(self):
+        """same records as the files backend, without rewriting the file"""
+        files_helper = DBHelper(self.tmp_dir.name + "/files")
+        files = [
+            helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=1)
+            for helper in (files_helper, self.db_helper)
+        ]
+        updaters = [Updater({}, helper) for helper in (files_helper, self.db_helper)]
+        for file in files:
+            mock_records(30, 10, ts=10 * SECONDS_IN.DAY, seed=0).to_file(file)
+
+        rnd = random.Random(0)
+        ts = ts_compressed = 20 * SECONDS_IN.DAY
+        with mock.patch.object(SqliteDB, "_delete_items", side_effect=AssertionError):
+            for _ in range(40):
+                ts += rnd.choice([3600, 5 * 3600, 2 * SECONDS_IN.DAY])
+                increment = MapItemStringMarketValueRecord(
+                    __root__={
+                        mock_item_string(i): MarketValueRecord(
+                            timestamp=ts,
+                            market_value=rnd.randint(1, 10**6),
+                            num_auctions=rnd.randint(1, 50),
+                            min_buyout=rnd.randint(0, 10**6),
+                        )
+                        for i in rnd.sample(range(40), 20)
+                    }
+                )
+                for updater, file in zip(updaters, files):
+                    updater.save_increment(
+                        file, increment, ts, ts_compressed=ts_compressed
+                    )
+                ts_compressed = MarketValueRecords.get_compress_end_ts(ts)
+                expected, loaded = (
+                    {
+                        item_string: item_records.array.tolist()
+                        for item_string, item_records in (
+                            MapItemStringMarketValueRecords.from_file(file).items()
+                        )
+                        if len(item_records)
+                    }
+                    for file in files
+                )
+                self.assertDictEqual(expected, loaded)
+
+        # expired records are deleted, with items left without any
+        file = files[1]
+        self.assertGreater(file.remove_expired(ts + 1), 0)
+        self.assertEqual(0, len(MapItemStringMarketValueRecords.from_file(file)))
+        self.assertEqual(0, len(self.db_helper.sqlite_db.read(file.file_name).item_ids))
+        self.assertEqual(0, file.remove_expired(ts + 1))
+
+    def test_query(self):
+        file = self.db_helper.get_file(self.namespace, DBTypeEnum.AUCTIONS, crid=1)
+        records = mock_records(30, 10, seed=1)
+        records.to_file(file)
+        for id_ in (0, 3, 12, 50):
+            for ts_from in (None, 1000, 5 * SECONDS_IN.DAY):
+                with self.subTest(id_=id_, ts_from=ts_from), mock.patch.object(
+                    SqliteDBFile, "open", side_effect=AssertionError
+                ):
+                    result = MapItemStringMarketValueRecords.query_file(
+                        file, id_, ts_from=ts_from
+                    )
+                    expected = {
+                        item_string: [
+                            row
+                            for row in item_records.array.tolist()
+                            if ts_from is None or row[0] >= ts_from
+                        ]
+                        for item_string, item_records in records.query(id_).items()
+                    }
+                    self.assertDictEqual(
+                        {k: v for k, v in expected.items() if v},
+                        {k: v.array.tolist() for k, v in result.items() if len(v)},
+                    )
+
+    def test_meta(self):
+        file = self.db_helper.get_file(self.namespace, DBTypeEnum.META)
+        self.assertIsInstance(file, SqliteMetaFile)
+        self.assertFalse(file.exists())
+        meta = Meta()
+        meta.set_update_ts(100, 200)
+        meta.to_file(file)
+        self.assertTrue(file.exists())
+        self.assertEqual((100, 200), Meta.from_file(file).get_update_ts())
+        file.touch()
+        self.assertEqual((100, 200), Meta.from_file(file).get_update_ts())
+        file.remove()
+        self.assertFalse(file.exists())
+        file.touch()
+        self.assertTrue(file.exists())
+        with file.open("r") as f:
+            self.assertEqual("", f.read())
+
+    def test_fork(self):
+        records = mock_records(20)
+        meta = Meta()
+        meta.set_update_ts(100, 200)
+        gh_api = AssetsGHAPI(
+            {
+                "dynamic-us_auctions_1.gz": gzip.compress(records.to_protobuf_bytes()),
+                "dynamic-us_auctions_2.gz": records.to_packed_bytes(),
+                "dynamic-us_meta.json": b'{"update": {"start_ts": 100, '
+                b'"end_ts": 200}, "connected_realms": {}}',
+            }
+        )
+        forker = GithubFileForker("https://github.com/user/repo", gh_api)
+        for crid in (1, 2):
+            file = self.db_helper.get_file(
+                self.namespace, DBTypeEnum.AUCTIONS, crid=crid
+            )
+            loaded = MapItemStringMarketValueRecords.from_file(file, forker=forker)
+            self.assertEqual(records.to_protobuf_bytes(), loaded.to_protobuf_bytes())
+
+        file = self.db_helper.get_file(self.namespace, DBTypeEnum.META)
+        self.assertEqual(
+            (100, 200), Meta.from_file(file, forker=forker).get_update_ts()
+        )
+
+    def test_threads(self):
+        """one connection per thread, all closed at once"""
+        records = mock_records(10)
+        errors = []
+
+        def save(crid):
+            try:
+                file = self.db_helper.get_file(
+                    self.namespace, DBTypeEnum.AUCTIONS, crid=crid
+                )
+                records.to_file(file)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save, args=(crid,)) for crid in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual([], errors)
+        self.assertEqual(8, len(self.db_helper.sqlite_db._connections))
+        self.db_helper.close()
+        self.assertEqual(0, len(self.db_helper.sqlite_db._connections))
+        db = SqliteDB(SqliteDB.get_file_path(self.tmp_dir.name))
+        self.assertEqual(8, len(db.names()))
+        for crid in range(8):
+            self.assertEqual(
+                records.to_packed().timestamps.tolist(),
+                db.read(f"dynamic-us_auctions_{crid}.gz").timestamps.tolist(),
+            )
+        db.close()
+
+    def test_backend(self):
+        self.assertRaises(ValueError, DBHelper, self.tmp_dir.name, backend="foo")
+        self.assertIsNone(DBHelper(self.tmp_dir.name).sqlite_db)
@@ -0,0 +1,134 @@
+from unittest import TestCase, mock
+import tempfile
+import zlib
+import gzip
+import os
+
+from ah.storage import BinaryFile, CODECS, GzipCodec, get_codec, detect_codec
+from ah.db import DBHelper
+from ah.models import (
+    DBTypeEnum,
+    Namespace,
+    MapItemStringMarketValueRecords,
+    MarketValueRecords,
+    ItemString,
+    ItemStringTypeEnum,
+)
+
+
+class TestStorage(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_codecs(self):
+        data = b"".join(b"%d," % i for i in range(10000))
+        for name, codec in CODECS.items():
+            if not codec.is_available():
+                self.assertRaises(ValueError, get_codec, name)
+                continue
+
+            for level in (None, 1):
+                compressed = get_codec(name, level).compress(data)
+                self.assertLess(len(compressed), len(data))
+                self.assertIs(codec, detect_codec(compressed))
+                self.assertEqual(data, codec().decompress(compressed))
+                # concatenated members
+                self.assertEqual(data * 2, codec().decompress(compressed * 2))
+
+        self.assertRaises(ValueError, get_codec, "rar")
+        self.assertIsNone(detect_codec(b"\x0a\x0b"))
+        self.assertIsNone(detect_codec(b""))
+
+    @mock.patch.object(GzipCodec, "BLOCK_SIZE", 10000)
+    def test_gzip_threads(self):
+        data = b"".join(b"%d," % (i % 3000) for i in range(20000))
+        for level in (1, 6, 9):
+            compressed = GzipCodec(level, threads=4).compress(data)
+            # one gzip member, readable by any gzip reader
+            obj = zlib.decompressobj(31)
+            self.assertEqual(data, obj.decompress(compressed))
+            self.assertTrue(obj.eof)
+            self.assertEqual(b"", obj.unused_data)
+            self.assertEqual(data, gzip.decompress(compressed))
+            # blocks see the window of the block before, unlike separate members
+            independent = sum(
+                len(gzip.compress(data[i : i + 10000], level))
+                for i in range(0, len(data), 10000)
+            )
+            self.assertLess(len(compressed), independent)
+
+        # small data, and the boundary of blocks
+        for data in (b"", b"x" * 10000, b"x" * 20001):
+            compressed = GzipCodec(threads=4).compress(data)
+            self.assertEqual(data, gzip.decompress(compressed))
+
+        file = BinaryFile(f"{self.tmp_dir.name}/threads.gz", True, threads=4)
+        with file.open("wb") as f:
+            f.write(data)
+        with file.open("ab") as f:
+            f.write(data)
+        with file.open("rb") as f:
+            self.assertEqual(data * 2, f.read())
+
+    def test_binary_file(self):
+        for name, codec in CODECS.items():
+            if not codec.is_available():
+                continue
+
+            file = BinaryFile(f"{self.tmp_dir.name}/{name}.gz", True, codec=name)
+            with file.open("wb") as f:
+                f.write(b"foo")
+            with file.open("ab") as f:
+                f.write(b"bar")
+            with open(file.file_path, "rb") as f:
+                self.assertIs(codec, detect_codec(f.read()))
+            # read by any codec
+            file = BinaryFile(file.file_path, True)
+            with file.open("rb") as f:
+                self.assertEqual(b"foobar", f.read())
+
+            # appended members keep the file's codec
+            file = BinaryFile(file.file_path, True, codec="lzma")
+            with file.open("ab") as f:
+                f.write(b"baz")
+            with file.open("rb") as f:
+                self.assertEqual(b"foobarbaz", f.read())
+
+        # nothing written if the `with` block failed
+        file = BinaryFile(f"{self.tmp_dir.name}/failed.gz", True)
+        with self.assertRaises(RuntimeError):
+            with file.open("wb") as f:
+                f.write(b"foo")
+                raise RuntimeError
+
+        self.assertFalse(file.exists())
+
+        with open(file.file_path, "wb") as f:
+            f.write(b"not compressed")
+        self.assertRaises(ValueError, file.open, "rb")
+
+    def test_db_helper_codec(self):
+        namespace = Namespace.from_str("dynamic-us")
+        records = MapItemStringMarketValueRecords()
+        records[
+            ItemString(type=ItemStringTypeEnum.ITEM, id=1, bonuses=None, mods=None)
+        ] = MarketValueRecords.from_columns([1000, 2000], [10, 20], [1, 2], [0, 5])
+        for use_packed in (False, True):
+            db_path = f"{self.tmp_dir.name}/{use_packed}"
+            file = DBHelper(
+                db_path, use_packed=use_packed, codec="lzma", compresslevel=1
+            ).get_file(namespace, DBTypeEnum.AUCTIONS, crid=1)
+            self.assertEqual(("lzma", 1), (file.codec, file.compresslevel))
+            records.to_file(file)
+            self.assertTrue(os.path.exists(file.file_path))
+            # a reader on the default codec
+            file = DBHelper(db_path).get_file(namespace, DBTypeEnum.AUCTIONS, crid=1)
+            self.assertEqual(
+                records.to_protobuf_bytes(),
+                MapItemStringMarketValueRecords.from_file(file).to_protobuf_bytes(),
+            )
+
+        self.assertRaises(ValueError, DBHelper, self.tmp_dir.name, codec="rar")
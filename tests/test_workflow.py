@@ -29,6 +29,20 @@ from ah.storage import BinaryFile
 
 
 class DummyAPIWrapper:
+    def __init__(self, last_modified=None):
+        # "Last-Modified" of all snapshots, `None` for no such header
+        self.last_modified = last_modified
+
+    def conditional(self, resp, if_modified_since):
+        if self.last_modified is None:
+            return resp
+
+        if if_modified_since is not None and self.last_modified <= if_modified_since:
+            return None
+
+        resp["timestamp"] = self.last_modified
+        return resp
+
     def get_connected_realms_index(self, region):
         return {
             "connected_realms": [
@@ -82,8 +96,14 @@ class DummyAPIWrapper:
             ],
         }
 
-    def get_auctions(self, region, connected_realm_id, auction_house_id=None):
-        return {
+    def get_auctions(
+        self,
+        region,
+        connected_realm_id,
+        auction_house_id=None,
+        if_modified_since=None,
+    ):
+        resp = {
             "_links": {},
             "connected_realm": {},
             "commodities": {},
@@ -104,9 +124,10 @@ class DummyAPIWrapper:
                 },
             ],
         }
+        return self.conditional(resp, if_modified_since)
 
-    def get_commodities(self, region):
-        return {
+    def get_commodities(self, region, if_modified_since=None):
+        resp = {
             "_links": {},
             "auctions": [
                 {
@@ -125,6 +146,14 @@ class DummyAPIWrapper:
                 },
             ],
         }
+        return self.conditional(resp, if_modified_since)
+
+    def stream_commodities(self, region, if_modified_since=None):
+        resp = self.get_commodities(region, if_modified_since=if_modified_since)
+        if resp is not None:
+            resp["auctions"] = iter(resp["auctions"])
+
+        return resp
 
 
 class TestWorkflow(TestCase):
@@ -333,18 +362,387 @@ class TestWorkflow(TestCase):
             }
             self.assertSetEqual(expected, files)
 
+    @mock.patch("time.time", return_value=1000)
+    def test_updater_workers(self, *args):
+        """updating with a worker pool (or pipeline, fast decoder) should yield
+        the same db files as updating realms one after another.
+        """
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper()
+        modes = {
+            "serial": {"workers": 1},
+            "workers": {"workers": 4},
+            "pipeline": {"workers": 2, "pipeline": True},
+            "processes": {"workers": 2, "processes": 2},
+            "fast": {"decoder": "fast"},
+            "fast_pipeline": {"workers": 2, "pipeline": True, "decoder": "fast"},
+            "fast_processes": {"workers": 2, "processes": 2, "decoder": "fast"},
+        }
+        with temp:
+            for mode, kwargs in modes.items():
+                updater_main(
+                    db_path=f"{temp.name}/{mode}",
+                    game_version=GameVersionEnum.CLASSIC,
+                    region="us",
+                    bn_api=bn_api,
+                    **kwargs,
+                )
+
+            files = set(os.listdir(f"{temp.name}/serial"))
+            # (realm 1, realm 2) x (alliance, horde) + meta
+            self.assertEqual(5, len(files))
+            for mode in modes:
+                self.assertSetEqual(files, set(os.listdir(f"{temp.name}/{mode}")))
+
+            for file_name in files:
+                if file_name.endswith(".json"):
+                    continue
+
+                records = [
+                    MapItemStringMarketValueRecords.from_file(
+                        BinaryFile(f"{temp.name}/{mode}/{file_name}", True)
+                    ).to_protobuf_bytes()
+                    for mode in modes
+                ]
+                self.assertEqual(1, len(set(records)))
+
+    @mock.patch("time.time", return_value=1000)
+    def test_updater_targets(self, *args):
+        """one run updating multiple targets should yield the same db files as
+        separate runs.
+        """
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper()
+        targets = [
+            (GameVersionEnum.CLASSIC, RegionEnum.US),
+            (GameVersionEnum.RETAIL, RegionEnum.US),
+        ]
+        with temp:
+            for game_version, region in targets:
+                updater_main(
+                    db_path=f"{temp.name}/separate",
+                    game_version=game_version,
+                    region=region,
+                    bn_api=bn_api,
+                )
+
+            updater_main(
+                db_path=f"{temp.name}/single",
+                targets=targets,
+                target_workers=2,
+                bn_api=bn_api,
+            )
+            files = set(os.listdir(f"{temp.name}/separate"))
+            self.assertSetEqual(files, set(os.listdir(f"{temp.name}/single")))
+            for file_name in files:
+                if file_name.endswith(".json"):
+                    continue
+
+                records = [
+                    MapItemStringMarketValueRecords.from_file(
+                        BinaryFile(f"{temp.name}/{mode}/{file_name}", True)
+                    ).to_protobuf_bytes()
+                    for mode in ("separate", "single")
+                ]
+                self.assertEqual(records[0], records[1])
+
+    @mock.patch("time.time", return_value=1000)
+    def test_updater_stream_commodities(self, *args):
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper()
+        with temp:
+            for mode in ("default", "stream"):
+                updater_main(
+                    db_path=f"{temp.name}/{mode}",
+                    game_version=GameVersionEnum.RETAIL,
+                    region=RegionEnum.US,
+                    stream_commodities=mode == "stream",
+                    bn_api=bn_api,
+                )
+
+            records = [
+                MapItemStringMarketValueRecords.from_file(
+                    BinaryFile(f"{temp.name}/{mode}/dynamic-us_commodities.gz", True)
+                )
+                for mode in ("default", "stream")
+            ]
+            self.assertEqual(1, len(records[0]))
+            self.assertEqual(
+                records[0].to_protobuf_bytes(), records[1].to_protobuf_bytes()
+            )
+
+    @mock.patch("time.time", return_value=1000)
+    def test_updater_packed(self, *args):
+        """db files in the packed format hold the same records"""
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper()
+        with temp:
+            for mode in ("protobuf", "packed"):
+                updater_main(
+                    db_path=f"{temp.name}/{mode}",
+                    game_version=GameVersionEnum.RETAIL,
+                    region=RegionEnum.US,
+                    packed=mode == "packed",
+                    bn_api=bn_api,
+                )
+
+            files = sorted(os.listdir(f"{temp.name}/packed"))
+            self.assertListEqual(
+                [
+                    "dynamic-us_auctions_1.pgz",
+                    "dynamic-us_auctions_2.pgz",
+                    "dynamic-us_commodities.pgz",
+                    "dynamic-us_meta.json",
+                ],
+                files,
+            )
+            for file_name in files[:-1]:
+                records = [
+                    MapItemStringMarketValueRecords.from_file(
+                        BinaryFile(f"{temp.name}/{mode}/{file_name}", True)
+                    ).to_protobuf_bytes()
+                    for mode, file_name in (
+                        ("protobuf", file_name.replace(".pgz", ".gz")),
+                        ("packed", file_name),
+                    )
+                ]
+                self.assertEqual(records[0], records[1])
+
+    @mock.patch("time.time", return_value=1000)
+    def test_update_and_export_sqlite(self, *args):
+        """the sqlite backend holds the same records, and exports the same"""
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper()
+        with temp:
+            wow_base = f"{temp.name}/wow"
+            ensure_path(f"{wow_base}/_retail_")
+            lua_path = (
+                f"{wow_base}/_retail_/Interface/AddOns/"
+                "TradeSkillMaster_AppHelper/AppData.lua"
+            )
+            contents = []
+            for backend in ("files", "sqlite"):
+                for segments in (False, True):
+                    updater_main(
+                        db_path=f"{temp.name}/{backend}",
+                        game_version=GameVersionEnum.RETAIL,
+                        region=RegionEnum.US,
+                        segments=segments,
+                        db_backend=backend,
+                        bn_api=bn_api,
+                    )
+
+                args = exporter_parse_args(
+                    [
+                        "--db_path",
+                        f"{temp.name}/{backend}",
+                        "--warcraft_base",
+                        wow_base,
+                        "--db_backend",
+                        backend,
+                        "us",
+                        "realm11",
+                    ]
+                )
+                exporter_main(**vars(args))
+                with open(lua_path) as f:
+                    contents.append(f.read())
+
+            self.assertListEqual(["db.sqlite3"], os.listdir(f"{temp.name}/sqlite"))
+            self.assertIn("AUCTIONDB_REGION_STAT", contents[0])
+            self.assertEqual(contents[0], contents[1])
+            db_helpers = [
+                DBHelper(f"{temp.name}/{backend}", backend=backend)
+                for backend in ("files", "sqlite")
+            ]
+            namespace = Namespace.from_str("dynamic-us")
+            for crid in (None, 1, 2):
+                db_type = DBTypeEnum.AUCTIONS if crid else DBTypeEnum.COMMODITIES
+                records = [
+                    MapItemStringMarketValueRecords.from_file(
+                        db_helper.get_file(namespace, db_type, crid=crid)
+                    ).to_protobuf_bytes()
+                    for db_helper in db_helpers
+                ]
+                self.assertEqual(records[0], records[1])
+
+    @mock.patch("time.time")
+    def test_updater_segments(self, m_time):
+        """appending segments and compacting them daily should yield the same
+        records as rewriting db files on every update.
+        """
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper()
+        modes = {
+            "rewrite": {},
+            "segments": {"segments": True},
+            "segments_packed": {"segments": True, "packed": True},
+            "segments_processes": {"segments": True, "workers": 2, "processes": 2},
+        }
+        ts_day = 19000 * SECONDS_IN.DAY
+        with temp:
+            for ts, is_compacted in (
+                (ts_day + 3600, True),
+                (ts_day + 3 * 3600, False),
+                (ts_day + 5 * 3600, False),
+                # first update of the next UTC day
+                (ts_day + SECONDS_IN.DAY + 3600, True),
+                (ts_day + SECONDS_IN.DAY + 3 * 3600, False),
+            ):
+                m_time.return_value = ts
+                for mode, kwargs in modes.items():
+                    updater_main(
+                        db_path=f"{temp.name}/{mode}",
+                        game_version=GameVersionEnum.RETAIL,
+                        region=RegionEnum.US,
+                        bn_api=bn_api,
+                        **kwargs,
+                    )
+
+                for file_name in (
+                    "dynamic-us_auctions_1.gz",
+                    "dynamic-us_commodities.gz",
+                ):
+                    expected = MapItemStringMarketValueRecords.from_file(
+                        BinaryFile(f"{temp.name}/rewrite/{file_name}", True)
+                    ).to_protobuf_bytes()
+                    for mode in modes:
+                        if mode == "segments_packed":
+                            file_name_ = file_name.replace(".gz", ".pgz")
+                        else:
+                            file_name_ = file_name
+                        file = BinaryFile(f"{temp.name}/{mode}/{file_name_}", True)
+                        records = MapItemStringMarketValueRecords.from_file(file)
+                        self.assertEqual(expected, records.to_protobuf_bytes())
+                        if mode == "segments":
+                            with file.open("rb") as f:
+                                data = f.read()
+                            # segments repeat items
+                            self.assertEqual(is_compacted, data == expected)
+
+            # forced
+            updater_main(
+                db_path=f"{temp.name}/segments",
+                game_version=GameVersionEnum.RETAIL,
+                region=RegionEnum.US,
+                bn_api=bn_api,
+                segments=True,
+                compact=True,
+            )
+            file = BinaryFile(f"{temp.name}/segments/dynamic-us_commodities.gz", True)
+            with file.open("rb") as f:
+                data = f.read()
+            self.assertEqual(
+                MapItemStringMarketValueRecords.from_file(file).to_protobuf_bytes(),
+                data,
+            )
+
+    @mock.patch("time.time")
+    def test_updater_if_modified_since(self, m_time):
+        """realms are skipped if the snapshot was not modified since last update,
+        records are stamped with the snapshot's "Last-Modified" otherwise.
+        """
+        temp = TemporaryDirectory()
+        bn_api = DummyAPIWrapper(last_modified=900)
+        namespace = Namespace.from_str("dynamic-us")
+        kwargs = {
+            "db_path": temp.name,
+            "game_version": namespace.game_version,
+            "region": namespace.region,
+            "bn_api": bn_api,
+        }
+        db_helper = DBHelper(temp.name)
+        meta_file = db_helper.get_file(namespace, DBTypeEnum.META)
+        file = db_helper.get_file(namespace, DBTypeEnum.AUCTIONS, crid=1)
+        item_string = ItemString(
+            type=ItemStringTypeEnum.ITEM, id=123, bonuses=None, mods=None
+        )
+
+        def get_timestamps():
+            records = MapItemStringMarketValueRecords.from_file(file)
+            return [record.timestamp for record in records[item_string]]
+
+        with temp:
+            # first update, meta knows nothing about the snapshots yet
+            m_time.return_value = 1000
+            updater_main(**kwargs)
+            self.assertListEqual([1000], get_timestamps())
+            meta = Meta.from_file(meta_file)
+            self.assertEqual(1000, meta.get_last_modified(1))
+            self.assertEqual(1000, meta.get_last_modified())
+
+            # not modified, nothing saved
+            m_time.return_value = 2000
+            updater_main(**kwargs)
+            self.assertListEqual([1000], get_timestamps())
+            meta = Meta.from_file(meta_file)
+            self.assertEqual(1000, meta.get_last_modified(1))
+            self.assertEqual(2000, meta.get_update_ts()[0])
+
+            # new snapshot
+            m_time.return_value = 3000
+            bn_api.last_modified = 2500
+            updater_main(**kwargs)
+            self.assertListEqual([1000, 2500], get_timestamps())
+            meta = Meta.from_file(meta_file)
+            self.assertEqual(2500, meta.get_last_modified(1))
+            self.assertEqual(2500, meta.get_last_modified(2))
+            self.assertEqual(2500, meta.get_last_modified())
+
     def test_updater_parse_args(self):
         raw_args = [
             "--db_path",
             "db",
             "--game_version",
             "classic",
+            "--workers",
+            "8",
             "us",
         ]
         args = updater_parse_args(raw_args)
-        self.assertEqual(args.region, RegionEnum.US)
+        self.assertListEqual(args.targets, [(GameVersionEnum.CLASSIC, RegionEnum.US)])
         self.assertEqual(args.db_path, "db")
         self.assertEqual(args.game_version, GameVersionEnum.CLASSIC)
+        self.assertEqual(args.workers, 8)
+        self.assertFalse(args.pipeline)
+        self.assertEqual(args.processes, 0)
+        self.assertRaises(
+            ValueError,
+            updater_parse_args,
+            ["--processes", "2", "--pipeline", "us"],
+        )
+        self.assertRaises(ValueError, updater_parse_args, ["--workers", "0", "us"])
+        self.assertEqual("files", args.db_backend)
+        self.assertRaises(
+            ValueError,
+            updater_parse_args,
+            ["--processes", "2", "--db_backend", "sqlite", "us"],
+        )
+
+        args = updater_parse_args(["us", "classic_era:eu", "classic:tw", "us"])
+        self.assertListEqual(
+            args.targets,
+            [
+                (GameVersionEnum.RETAIL, RegionEnum.US),
+                (GameVersionEnum.CLASSIC_ERA, RegionEnum.EU),
+                (GameVersionEnum.CLASSIC, RegionEnum.TW),
+            ],
+        )
+        self.assertEqual(args.target_workers, 1)
+        self.assertFalse(args.stream_commodities)
+        self.assertEqual(args.decoder, "strict")
+        self.assertFalse(args.packed)
+        self.assertFalse(args.segments)
+        self.assertFalse(args.compact)
+        self.assertEqual("gzip", args.codec)
+        self.assertIsNone(args.compresslevel)
+        self.assertEqual(1, args.compress_threads)
+        args = updater_parse_args(["--decoder", "fast", "us"])
+        self.assertEqual(args.decoder, "fast")
+        args = updater_parse_args(["--codec", "lzma", "--compresslevel", "1", "us"])
+        self.assertEqual(("lzma", 1), (args.codec, args.compresslevel))
+        self.assertRaises(ValueError, updater_parse_args, ["classic:xx"])
+        self.assertRaises(ValueError, updater_parse_args, ["wotlk:us"])
 
     def test_exporter_parse_args(self):
         wow_folders = [